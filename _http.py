@@ -0,0 +1,41 @@
+"""
+Shared HTTP setup for the API test scripts
+Keep-alive sessions with retries, pointed at the local API server
+"""
+
+import socket
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def resolve_host(host='localhost'):
+    """Resolve a host name once rather than on every new connection (the name itself if that fails)"""
+    try:
+        return socket.gethostbyname(host)
+    except socket.gaierror:
+        return host
+
+
+def port_open(host, port, timeout=0.5):
+    """Whether anything accepts TCP connections on host:port - much cheaper than an HTTP request"""
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+def create_session(pool_maxsize=16):
+    """
+    Session for talking to one host: a single connection pool, and retries with
+    backoff (0.2s, 0.4s, 0.8s) on connection errors and 502/503/504 responses
+    Only GETs are retried after a request was sent, so trades and callbacks are never duplicated
+    """
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                  allowed_methods=('GET',))
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize,
+                                         pool_block=False, max_retries=retry))
+    return session
@@ -0,0 +1,276 @@
+"""
+Shared helpers for the API test scripts
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Fast JSON parsing of API responses - falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Streaming JSON parsing of large responses - they are parsed whole if not available
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Optional JIT compilation of the forecast classification loop - plain Python if not available
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function as plain Python"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Per-thread output buffers, so tests running in parallel don't interleave their prints
+_output = threading.local()
+_output_lock = threading.Lock()
+
+
+class _ThreadStdout:
+    """sys.stdout stand-in that writes to the current thread's buffer, if it has one"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write(self, text):
+        return getattr(_output, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        getattr(_output, 'buffer', self.stream).flush()
+
+
+@contextlib.contextmanager
+def buffered_output():
+    """Collect this thread's prints and write them out in one go at the end (also usable as a decorator)"""
+    with _output_lock:
+        if not isinstance(sys.stdout, _ThreadStdout):
+            sys.stdout = _ThreadStdout(sys.stdout)
+        stream = sys.stdout.stream
+    _output.buffer = io.StringIO()
+    try:
+        yield
+    finally:
+        text = _output.buffer.getvalue()
+        del _output.buffer
+        with _output_lock:
+            stream.write(text)
+            stream.flush()
+
+
+@contextlib.contextmanager
+def buffered_stdout(size=1 << 16):
+    """Send prints through a large write buffer on the real stdout, flushed as it fills and when the block ends"""
+    original = sys.stdout
+    try:
+        fd = original.fileno()
+    except (AttributeError, OSError):
+        yield  # not backed by a file descriptor (e.g. captured output) - leave it alone
+        return
+    original.flush()
+    with open(fd, 'w', buffering=size, encoding=original.encoding, errors=original.errors, closefd=False) as out:
+        sys.stdout = out
+        try:
+            yield
+        finally:
+            sys.stdout = original
+
+
+def rjson(response):
+    """Parsed JSON body of a response"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+
+# Bodies at least this large are parsed item by item when ijson is installed
+STREAM_THRESHOLD = 64 * 1024
+
+
+def json_array(response, key):
+    """
+    Iterator over the items of the top-level array response[key]
+    Large bodies are parsed one item at a time rather than into one big document
+    """
+    if IJSON_AVAILABLE and len(response.content) >= STREAM_THRESHOLD:
+        return ijson.items(io.BytesIO(response.content), f'{key}.item', use_float=True)
+    return iter(rjson(response).get(key, []))
+
+
+def json_items(response):
+    """
+    Top-level (key, value) pairs of a JSON object response
+    Bodies of a stream=True response that are large (or of unknown size) are read one pair at a time
+    """
+    size = int(response.headers.get('Content-Length') or 0)
+    if IJSON_AVAILABLE and (size == 0 or size >= STREAM_THRESHOLD):
+        response.raw.decode_content = True  # let urllib3 undo any gzip
+        return ijson.kvitems(response.raw, '', use_float=True)
+    return rjson(response).items()
+
+
+# Trading action codes returned by classify_net_energy
+SELL, BUY, HOLD = 0, 1, 2
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def classify_net_energy(prod, cons):
+        """Action code per hour: SELL on any surplus, BUY on a deficit over 1 kWh, HOLD otherwise"""
+        out = np.empty(prod.size, np.int8)
+        for i in range(prod.size):
+            net = prod[i] - cons[i]
+            out[i] = SELL if net > 0 else (BUY if net < -1 else HOLD)
+        return out
+else:
+    def classify_net_energy(prod, cons):
+        """NumPy equivalent of the compiled classification loop"""
+        net = prod - cons
+        return np.select([net > 0, net < -1], [SELL, BUY], HOLD).astype(np.int8)
+
+
+# Client-side response cache: seconds a successful GET is reused, by endpoint (others aren't cached)
+CACHE_TTLS = {'predict': 300, 'forecast': 3600, 'analytics': 60}
+CACHE_DIR = '.wattchain_cache'  # kept on disk so repeated runs can skip the slow server round-trips
+CACHE_ENABLED = os.environ.get('WATTCHAIN_TEST_CACHE', '0') == '1'
+
+_responses = {}
+
+
+class CachedResponse:
+    """Status and body of a cached GET, in place of the requests.Response it came from"""
+    
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+    
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+def _cache_key(url, params):
+    return hashlib.blake2b(url.encode() + json.dumps(params, sort_keys=True).encode(),
+                           digest_size=16).hexdigest()
+
+
+def cached_get(session, url, params=None, timeout=10):
+    """
+    session.get, reusing a successful response for its endpoint's TTL (see CACHE_TTLS)
+    Off unless WATTCHAIN_TEST_CACHE=1, so by default every run tests the live server
+    """
+    ttl = CACHE_TTLS.get(url.rstrip('/').rsplit('/', 1)[-1])
+    if not CACHE_ENABLED or ttl is None:
+        return session.get(url, params=params, timeout=timeout)
+    
+    key = _cache_key(url, params or {})
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+    now = time.time()
+    cached = _responses.get(key)
+    if cached is None:
+        try:
+            with open(path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            pass
+    if cached and now - cached['time'] < ttl:
+        _responses[key] = cached
+        # One write per line, so notes from parallel requests don't interleave
+        sys.stdout.write(f"💾 Cached response ({now - cached['time']:.0f}s old): {url} {params or ''}\n")
+        return CachedResponse(cached['status_code'], cached['body'].encode('utf-8'))
+    
+    response = session.get(url, params=params, timeout=timeout)
+    if response.status_code == 200:
+        cached = {'time': now, 'status_code': response.status_code, 'body': response.text}
+        _responses[key] = cached
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(cached, f)
+        except OSError:
+            pass  # the in-memory copy still serves this run
+    return response
+
+
+# slots=True needs Python 3.10; older interpreters get regular dict-backed instances
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_SLOTS)
+class PredictResult:
+    """One household's /api/predict response"""
+    production: float = 0.0
+    consumption: float = 0.0
+    net: float = 0.0
+    recommendation: str = 'UNKNOWN'
+    confidence: float = 0.0
+    market: dict = field(default_factory=dict)
+    trading_advice: dict = field(default_factory=dict)
+    weather: dict = field(default_factory=dict)
+    
+    @classmethod
+    def from_json(cls, data):
+        g = data.get
+        return cls(production=g('predicted_production', 0), consumption=g('predicted_consumption', 0),
+                   net=g('net_energy', 0), recommendation=g('recommendation', 'UNKNOWN'),
+                   confidence=g('confidence', 0), market=g('market_conditions') or {},
+                   trading_advice=g('trading_advice') or {}, weather=g('weather_data') or {})
+
+
+@dataclass(frozen=True, **_SLOTS)
+class AnalyticsResult:
+    """The system-wide fields of an /api/analytics response"""
+    total_households: object = 'N/A'
+    active_households: object = 'N/A'
+    total_generation: object = 'N/A'
+    total_consumption: object = 'N/A'
+    market_price: object = 'N/A'
+    network_performance: dict = field(default_factory=dict)
+    households: dict = field(default_factory=dict)
+    household_data: dict = field(default_factory=dict)
+    
+    @classmethod
+    def from_json(cls, data):
+        g = data.get
+        return cls(total_households=g('total_households', 'N/A'), active_households=g('active_households', 'N/A'),
+                   total_generation=g('total_generation', 'N/A'), total_consumption=g('total_consumption', 'N/A'),
+                   market_price=g('current_market_price', 'N/A'),
+                   network_performance=g('network_performance') or {}, households=g('households') or {},
+                   household_data=g('household_data') or {})
+
+
+def predict(session, base_url, household_id, timeout=10):
+    """GET /api/predict for one household (through the response cache)"""
+    return cached_get(session, f"{base_url}/predict", params={"household_id": household_id}, timeout=timeout)
+
+
+def forecast(session, base_url, household_id, hours=24, timeout=15):
+    """GET /api/forecast for one household (through the response cache)"""
+    return cached_get(session, f"{base_url}/forecast", params={"household_id": household_id, "hours": hours},
+                      timeout=timeout)
+
+
+def analytics(session, base_url, household_id=None, timeout=10):
+    """GET /api/analytics, optionally for one household (through the response cache)"""
+    params = {"household_id": household_id} if household_id else None
+    return cached_get(session, f"{base_url}/analytics", params=params, timeout=timeout)
@@ -395,9 +395,46 @@ class EnergyTradingAI:
             
         return "; ".join(reasons) if reasons else f"Standard {decision} conditions"
 
+def _to_epoch(timestamp):
+    """Unix epoch seconds for an ISO timestamp (local time unless it carries an offset)"""
+    return int(datetime.fromisoformat(str(timestamp).replace('Z', '+00:00')).timestamp())
+
 class DatabaseManager:
     """Handles data storage and retrieval"""
     
+    # Tables and their schemas
+    TABLE_SCHEMAS = {
+        'energy_data': '''
+            CREATE TABLE IF NOT EXISTS energy_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                temperature REAL,
+                sunlight_hours REAL,
+                cloud_percentage REAL,
+                solar_generation REAL,
+                consumption REAL,
+                surplus_deficit REAL,
+                ai_decision TEXT,
+                confidence REAL,
+                reasoning TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        'trades': '''
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                trade_type TEXT,
+                amount REAL,
+                price REAL,
+                total_value REAL,
+                status TEXT,
+                tx_hash TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        '''
+    }
+    
     def __init__(self, db_path='energy_trading.db'):
         self.db_path = db_path
         self.init_database()
@@ -408,36 +445,11 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS energy_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    temperature REAL,
-                    sunlight_hours REAL,
-                    cloud_percentage REAL,
-                    solar_generation REAL,
-                    consumption REAL,
-                    surplus_deficit REAL,
-                    ai_decision TEXT,
-                    confidence REAL,
-                    reasoning TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS trades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    trade_type TEXT,
-                    amount REAL,
-                    price REAL,
-                    total_value REAL,
-                    status TEXT,
-                    tx_hash TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            # Timestamps are unix epoch seconds, the schema src/database/db_manager.py
+            # uses for the same database file
+            for table, create_sql in self.TABLE_SCHEMAS.items():
+                self._migrate_epoch_timestamps(cursor, table, create_sql)
+                cursor.execute(create_sql)
             
             # Create indexes for better performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_energy_timestamp ON energy_data(timestamp)')
@@ -451,6 +463,28 @@ class DatabaseManager:
             logger.error(f"Database initialization error: {e}")
             raise
     
+    @staticmethod
+    def _migrate_epoch_timestamps(cursor, table, create_sql):
+        """Rebuild a table that still stores ISO TEXT timestamps with INTEGER epochs"""
+        columns = cursor.execute(f'PRAGMA table_info({table})').fetchall()
+        column_types = {column[1]: column[2].upper() for column in columns}
+        if column_types.get('timestamp', 'INTEGER') == 'INTEGER':
+            return
+        
+        # Stored ISO values are local time; 'utc' converts them before %s
+        select = ', '.join(
+            f"CAST(strftime('%s', {name}, 'utc') AS INTEGER)" if name == 'timestamp' else name
+            for name in column_types
+        )
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_iso_backup')
+        cursor.execute(create_sql)
+        cursor.execute(f'''
+            INSERT INTO {table} ({', '.join(column_types)})
+            SELECT {select} FROM {table}_iso_backup
+        ''')
+        cursor.execute(f'DROP TABLE {table}_iso_backup')
+        logger.info(f"Migrated {table} timestamps to unix epochs")
+    
     def store_prediction(self, weather_data, iot_data, prediction):
         """Store prediction data"""
         try:
@@ -464,7 +498,7 @@ class DatabaseManager:
                  ai_decision, confidence, reasoning)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
-                prediction['timestamp'],
+                _to_epoch(prediction['timestamp']),
                 weather_data['temperature'],
                 weather_data['sunlight_hours'],
                 weather_data['cloud_percentage'],
@@ -489,14 +523,19 @@ class DatabaseManager:
             
             query = '''
                 SELECT * FROM energy_data 
-                WHERE datetime(timestamp) > datetime('now', '-{} hours')
+                WHERE timestamp > ?
                 ORDER BY timestamp DESC
                 LIMIT 100
-            '''.format(hours)
+            '''
             
-            df = pd.read_sql_query(query, conn)
+            df = pd.read_sql_query(query, conn, params=(int(time.time()) - hours * 3600,))
             conn.close()
-            return df.to_dict('records')
+            
+            # Keep the API returning ISO timestamps
+            records = df.to_dict('records')
+            for record in records:
+                record['timestamp'] = datetime.fromtimestamp(int(record['timestamp'])).isoformat()
+            return records
             
         except Exception as e:
             logger.error(f"Error retrieving recent data: {e}")
@@ -512,7 +551,7 @@ class DatabaseManager:
                 INSERT INTO trades (timestamp, trade_type, amount, price, total_value, status, tx_hash)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
-                trade_data['timestamp'],
+                _to_epoch(trade_data['timestamp']),
                 trade_data['type'],
                 trade_data['amount'],
                 trade_data['price'],
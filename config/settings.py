@@ -12,6 +12,7 @@ class Settings:
     
     # Database
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'energy_trading.db')
+    ARCHIVE_PATH = os.getenv('ARCHIVE_PATH', 'archive/energy_data')  # Parquet archive of aged rows
     
     # Weather API (Open-Meteo - free, no API key required)
     WEATHER_API_BASE_URL = "https://api.open-meteo.com/v1"
@@ -34,9 +35,13 @@ class Settings:
     MIN_SAMPLES_SPLIT = 5
     MIN_SAMPLES_LEAF = 2
     
+    # Use Intel scikit-learn extensions (sklearnex) when installed
+    USE_SKLEARNEX = os.getenv('USE_SKLEARNEX', 'true').lower() == 'true'
+    
     # IoT Simulation
     BASE_SOLAR_GENERATION = 5.0  # kWh
     BASE_CONSUMPTION = 3.0  # kWh
+    JIT_WARMUP = os.getenv('JIT_WARMUP', 'true').lower() == 'true'  # Compile IoT kernels at import
     
     # Energy Trading
     ENERGY_PRICE_KWH = 0.12  # KES per kWh
@@ -58,6 +63,9 @@ class Settings:
     # Payment callback URL (update with your actual domain)
     PAYMENT_CALLBACK_URL = os.getenv('PAYMENT_CALLBACK_URL', 'http://localhost:5000/api/payment/callback')
     
+    # Shared payment store and weather cache for multi-worker deployments (empty = in-process memory)
+    REDIS_URL = os.getenv('REDIS_URL', '')
+    
     # Logging
     LOG_LEVEL = 'INFO'
     LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
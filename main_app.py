@@ -246,6 +246,7 @@ def home():
             'GET /api/history - Get historical data',
             'GET /api/analytics - Get comprehensive analytics',
             'POST /api/execute_trade - Execute energy trade',
+            'POST /api/execute_trade_batch - Execute several energy trades',
             'GET /api/households - Get IoT network status',
             'GET /api/alerts - Get active weather alerts',
             'GET /api/status - System status'
@@ -462,71 +463,140 @@ def get_alerts():
         logger.error(f"Alerts error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def _parse_trade(data):
+    """Validate a trade request; returns (trade_type, amount, price) or raises ValueError with the error message"""
+    for field in ['type', 'amount', 'price']:
+        if field not in data:
+            raise ValueError(f'Missing field: {field}')
+    
+    trade_type = data['type'].upper()
+    try:
+        amount = float(data['amount'])
+        price = float(data['price'])
+    except (TypeError, ValueError):
+        raise ValueError('Invalid number format')
+    
+    # Validate trade type
+    if trade_type not in ['BUY', 'SELL']:
+        raise ValueError('Invalid trade type')
+    
+    # Validate amounts
+    if amount <= 0 or price <= 0:
+        raise ValueError('Amount and price must be positive')
+    
+    return trade_type, amount, price
+
+def _execute_trade(data, trade_type, amount, price):
+    """Execute a validated trade and its M-Pesa payment; returns (API response, trade record to store)"""
+    phone = data.get('phone', '+254700000000')
+    household_id = data.get('household', 'default')
+    
+    # Execute blockchain trade
+    trade = blockchain.execute_trade(trade_type, amount, price)
+    
+    # Process M-Pesa payment with energy trading details
+    payment_kwargs = {
+        'amount_kwh': amount,
+        'price_per_kwh': price,
+        'seller_phone': data.get('seller_phone', '+254700000000'),  # Default seller phone
+        'buyer_phone': phone
+    }
+    
+    payment = mpesa.process_payment(phone, amount * price, trade['id'], **payment_kwargs)
+    
+    trade_data = {
+        **trade,
+        'payment_method': 'mpesa',
+        'payment_tx_id': payment['tx_id'],
+        'payment_status': payment['status']
+    }
+    
+    response = {
+        'trade': trade,
+        'payment': payment,
+        'household_id': household_id,
+        'total_value': round(amount * price, 2),
+        'status': 'success'
+    }
+    
+    return response, trade_data
+
 @app.route('/api/execute_trade', methods=['POST'])
 def execute_trade():
     """Execute energy trade with enhanced validation"""
     try:
         data = request.get_json()
         
-        # Validate input
-        required_fields = ['type', 'amount', 'price']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'status': 'error', 'message': f'Missing field: {field}'}), 400
-        
-        trade_type = data['type'].upper()
-        amount = float(data['amount'])
-        price = float(data['price'])
-        phone = data.get('phone', '+254700000000')
-        household_id = data.get('household', 'default')
-        
-        # Validate trade type
-        if trade_type not in ['BUY', 'SELL']:
-            return jsonify({'status': 'error', 'message': 'Invalid trade type'}), 400
-        
-        # Validate amounts
-        if amount <= 0 or price <= 0:
-            return jsonify({'status': 'error', 'message': 'Amount and price must be positive'}), 400
-        
-        # Execute blockchain trade
-        trade = blockchain.execute_trade(trade_type, amount, price)
-        
-        # Process M-Pesa payment with energy trading details
-        payment_kwargs = {
-            'amount_kwh': amount,
-            'price_per_kwh': price,
-            'seller_phone': data.get('seller_phone', '+254700000000'),  # Default seller phone
-            'buyer_phone': phone
-        }
+        try:
+            trade_type, amount, price = _parse_trade(data)
+        except ValueError as e:
+            logger.error(f"Validation error: {e}")
+            return jsonify({'status': 'error', 'message': str(e)}), 400
         
-        payment = mpesa.process_payment(phone, amount * price, trade['id'], **payment_kwargs)
+        response, trade_data = _execute_trade(data, trade_type, amount, price)
         
         # Store trade in database
-        trade_data = {
-            **trade,
-            'payment_method': 'mpesa',
-            'payment_tx_id': payment['tx_id'],
-            'payment_status': payment['status']
-        }
-        db_manager.store_trade(trade_data, household_id)
-        
-        response = {
-            'trade': trade,
-            'payment': payment,
-            'household_id': household_id,
-            'total_value': round(amount * price, 2),
-            'status': 'success'
-        }
+        db_manager.store_trade(trade_data, response['household_id'])
         
         return jsonify(response)
         
-    except ValueError as e:
-        logger.error(f"Validation error: {e}")
-        return jsonify({'status': 'error', 'message': 'Invalid number format'}), 400
     except Exception as e:
         logger.error(f"Trade execution error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/execute_trade_batch', methods=['POST'])
+def execute_trade_batch():
+    """Execute several energy trades in one request, storing them in one transaction per household"""
+    try:
+        data = request.get_json()
+        trades = data.get('trades') if isinstance(data, dict) else None
+        if not isinstance(trades, list) or not trades:
+            return jsonify({'status': 'error', 'message': 'Field trades must be a non-empty list'}), 400
+        
+        # Validate every trade before executing any
+        parsed = []
+        for i, trade_request in enumerate(trades, 1):
+            try:
+                parsed.append(_parse_trade(trade_request))
+            except ValueError as e:
+                logger.error(f"Validation error in trade {i}: {e}")
+                return jsonify({'status': 'error', 'message': f'Trade {i}: {e}'}), 400
+        
+        # A failed trade doesn't stop the others; every executed (and paid) trade is stored
+        results = []
+        trades_by_household = {}
+        try:
+            for i, (trade_request, (trade_type, amount, price)) in enumerate(zip(trades, parsed), 1):
+                try:
+                    response, trade_data = _execute_trade(trade_request, trade_type, amount, price)
+                except Exception as e:
+                    logger.error(f"Trade {i} of batch failed: {e}")
+                    results.append({'status': 'error', 'message': str(e)})
+                    continue
+                results.append(response)
+                trades_by_household.setdefault(response['household_id'], []).append(trade_data)
+        finally:
+            # Store trades in database
+            for household_id, household_trades in trades_by_household.items():
+                db_manager.store_trades_many(household_trades, household_id)
+        
+        executed = sum(len(household_trades) for household_trades in trades_by_household.values())
+        if executed == len(results):
+            status = 'success'
+        else:
+            status = 'partial' if executed else 'error'
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'executed': executed,
+            'status': status
+        }), 200 if executed else 500
+        
+    except Exception as e:
+        logger.error(f"Trade batch execution error: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get comprehensive system status"""
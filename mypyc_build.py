@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Optional ahead-of-time compilation of the M-Pesa hot paths with mypyc
+Compiles src/payments/mpesa_daraja.py (STK payload building, callback parsing)
+into a C extension that sits next to the .py file and is imported in its place
+
+Usage:
+    pip install mypy
+    python mypyc_build.py build_ext --inplace
+
+Delete the generated .so/.pyd files to go back to the pure-Python module
+"""
+
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name='wattchain-mpesa-compiled',
+    ext_modules=mypycify([
+        '--ignore-missing-imports',
+        '--follow-imports=silent',
+        'src/payments/mpesa_daraja.py',
+    ]),
+)
@@ -14,6 +14,19 @@ load_dotenv()
 # Add src path for imports
 sys.path.append('src')
 
+
+def _norm_mpesa(result):
+    """Canonicalize snake_case / Daraja CamelCase result keys in one pass"""
+    response_code = result.get('response_code') or result.get('ResponseCode')
+    return {
+        'response_code': response_code,
+        'response_description': result.get('response_description') or result.get('ResponseDescription'),
+        'checkout_request_id': result.get('checkout_request_id') or result.get('CheckoutRequestID'),
+        'merchant_request_id': result.get('merchant_request_id') or result.get('MerchantRequestID'),
+        'success': result.get('success') == True or response_code == '0'
+    }
+
+
 try:
     from payments.mpesa_daraja import MPesaDarajaAPI
     
@@ -59,18 +72,17 @@ try:
     
     print(f"\nFull Result: {result}")
     
-    print("\nSTK Push Result:")
-    print(f"   Status: {result.get('response_code', result.get('ResponseCode', 'Unknown'))}")
-    print(f"   Message: {result.get('response_description', result.get('ResponseDescription', 'No message'))}")
+    # Normalize either response format once
+    normalized = _norm_mpesa(result)
     
-    # Check for success using either format
-    success_code = result.get('response_code') == '0' or result.get('ResponseCode') == '0'
-    is_success = result.get('success') == True or success_code
+    print("\nSTK Push Result:")
+    print(f"   Status: {normalized['response_code'] or 'Unknown'}")
+    print(f"   Message: {normalized['response_description'] or 'No message'}")
     
-    if is_success:
+    if normalized['success']:
         print("   STK Push initiated successfully!")
-        print(f"   Transaction ID: {result.get('checkout_request_id', result.get('CheckoutRequestID', 'N/A'))}")
-        print(f"   Merchant Request ID: {result.get('merchant_request_id', result.get('MerchantRequestID', 'N/A'))}")
+        print(f"   Transaction ID: {normalized['checkout_request_id'] or 'N/A'}")
+        print(f"   Merchant Request ID: {normalized['merchant_request_id'] or 'N/A'}")
         
         print("\nNext steps:")
         print(f"   1. Check your phone ({phone_number}) for M-Pesa prompt")
@@ -79,8 +91,8 @@ try:
         
     else:
         print("   STK Push failed!")
-        print(f"   Error Code: {result.get('ResponseCode', 'Unknown')}")
-        print(f"   Error Message: {result.get('ResponseDescription', 'Unknown error')}")
+        print(f"   Error Code: {normalized['response_code'] or 'Unknown'}")
+        print(f"   Error Message: {normalized['response_description'] or 'Unknown error'}")
         
         # Additional debugging
         if 'errorCode' in result:
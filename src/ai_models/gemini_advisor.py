@@ -10,24 +10,137 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 import os
 import re
+import threading
+from dataclasses import dataclass
+from importlib.util import find_spec
 
-# Try to import Gemini - graceful fallback if not available
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    genai = None
+from config.settings import settings
 
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import pandas as pd
-import joblib
 
-from config.settings import settings
+def _module_available(name: str) -> bool:
+    """Check whether an optional module is installed without importing it"""
+    try:
+        return find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Heavy optional dependencies (Gemini SDK, Numba) are only detected here and
+# imported on first use so that importing this module stays cheap
+GEMINI_AVAILABLE = _module_available('google.generativeai')
+NUMBA_AVAILABLE = _module_available('numba')
+genai = None
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class _Context:
+    """Clock and price snapshot shared by every step of one recommendation"""
+    now: datetime
+    hour: int
+    energy_price: float
+    
+    @classmethod
+    def capture(cls) -> '_Context':
+        now = datetime.now()
+        return cls(now=now, hour=now.hour, energy_price=settings.ENERGY_PRICE_KWH)
+
+# Static part of every Gemini prompt, appended after the per-request context
+_STATIC_OBJECTIVES_AND_SCHEMA = """TRADING OBJECTIVES:
+1. Maximize revenue from excess solar generation
+2. Minimize costs when purchasing energy
+3. Consider weather forecasts for strategic timing
+4. Account for typical household consumption patterns
+5. Factor in grid demand and pricing patterns
+
+REQUIRED OUTPUT:
+Based on the provided data, give a comprehensive solar energy trading recommendation.
+Consider all factors: weather conditions, energy surplus/deficit, time of day, and market context.
+
+Please provide your analysis in JSON format with these fields:
+- decision: "BUY", "SELL", or "HOLD"
+- confidence: confidence percentage (0-100)
+- reasoning: detailed explanation
+- financial_impact: expected revenue/cost impact
+- risk_level: "LOW", "MEDIUM", or "HIGH"
+- optimal_timing: when to execute the trade
+
+Focus on practical advice for a Kenyan household with solar panels.
+"""
+_JSON_DECODER = json.JSONDecoder()
+_DECISION_PATTERN = re.compile(r'\b(SELL|BUY|HOLD)\b', re.IGNORECASE)
+_CONFIDENCE_PATTERN = re.compile(r'(\d+)%')
+
+
+def _predict_forest(features, feat, thr, cl, cr, val):
+    """Average the class-1 leaf probability of every tree for one sample"""
+    n_trees = feat.shape[0]
+    total = 0.0
+    for t in range(n_trees):
+        node = 0
+        while cl[t, node] != -1:
+            if features[feat[t, node]] <= thr[t, node]:
+                node = cl[t, node]
+            else:
+                node = cr[t, node]
+        total += val[t, node]
+    return total / n_trees
+
+
+_forest_kernel = None
+_sklearnex_checked = False
+
+
+def _first_long_sentences(text: str, count: int = 3, min_length: int = 50) -> List[str]:
+    """Return the first `count` '. '-separated sentences longer than `min_length`,
+    scanning only as far as needed instead of splitting the whole text"""
+    sentences = []
+    start = 0
+    while len(sentences) < count:
+        end = text.find('. ', start)
+        sentence = text[start:] if end < 0 else text[start:end]
+        if len(sentence) > min_length:
+            sentences.append(sentence)
+        if end < 0:
+            break
+        start = end + 2
+    return sentences
+
+
+def _load_genai():
+    """Import the Gemini SDK on first use"""
+    global genai
+    if genai is None:
+        import google.generativeai as genai_module
+        genai = genai_module
+    return genai
+
+
+def _enable_sklearnex():
+    """Route RandomForest through Intel's oneDAL backend when sklearnex is installed"""
+    global _sklearnex_checked
+    if _sklearnex_checked:
+        return
+    _sklearnex_checked = True
+    
+    try:
+        from sklearnex import patch_sklearn
+        patch_sklearn('random_forest_classifier')
+        logger.info("Intel scikit-learn extensions enabled for backup model")
+    except ImportError:
+        pass
+
+
+def _get_forest_kernel():
+    """JIT-compile _predict_forest with Numba on first use"""
+    global _forest_kernel
+    if _forest_kernel is None:
+        from numba import njit
+        _forest_kernel = njit(cache=True)(_predict_forest)
+    return _forest_kernel
+
+
 class GeminiEnergyAdvisor:
     """
     Google Gemini-powered energy trading advisor
@@ -36,39 +149,55 @@ class GeminiEnergyAdvisor:
     
     def __init__(self, api_key: str = None):
         self.api_key = api_key or settings.GEMINI_API_KEY
-        self.model = None
+        self._model = None
         self.backup_model = None
+        self._model_lock = threading.Lock()
         
-        if GEMINI_AVAILABLE and self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-pro')
-                logger.info("Gemini AI model initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini AI: {e}")
-                self.model = None
-        else:
+        # Gemini is configured lazily on first access to self.model
+        self._gemini_pending = bool(GEMINI_AVAILABLE and self.api_key)
+        if not self._gemini_pending:
             logger.warning("Gemini API not available - using backup model only")
         
         # Initialize backup traditional ML model
         self._init_backup_model()
     
-    def _init_backup_model(self):
-        """Initialize backup Random Forest model"""
+    @property
+    def model(self):
+        """Gemini model, created on first access so the SDK import is deferred"""
+        if self._gemini_pending:
+            with self._model_lock:
+                if self._gemini_pending:
+                    self._model = self._init_gemini_model()
+                    self._gemini_pending = False
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+    
+    def _init_gemini_model(self):
+        """Import and configure the Gemini SDK"""
         try:
-            self.backup_model = RandomForestClassifier(
-                n_estimators=settings.N_ESTIMATORS,
-                max_depth=settings.MAX_DEPTH,
-                min_samples_split=settings.MIN_SAMPLES_SPLIT,
-                min_samples_leaf=settings.MIN_SAMPLES_LEAF,
-                random_state=settings.RANDOM_STATE,
-                class_weight='balanced'
-            )
-            self.scaler = StandardScaler()
-            self.is_backup_trained = False
-            logger.info("Backup ML model initialized")
+            _load_genai().configure(api_key=self.api_key)
+            model = genai.GenerativeModel('gemini-pro')
+            logger.info("Gemini AI model initialized successfully")
+            return model
         except Exception as e:
-            logger.error(f"Failed to initialize backup model: {e}")
+            logger.error(f"Failed to initialize Gemini AI: {e}")
+            return None
+    
+    def _init_backup_model(self):
+        """Initialize backup Random Forest model state (built on first training)"""
+        self.backup_model = None
+        self.scaler = None
+        self.is_backup_trained = False
+        self._forest = None
+        self._forest_kernel = None
+        self._scale_mean = None
+        self._scale_std = None
+        # Per-thread feature buffers - the API server handles requests concurrently
+        self._buffers = threading.local()
+        logger.info("Backup ML model initialized")
     
     def get_trading_recommendation(self, weather_data: Dict[str, Any], 
                                  iot_data: Dict[str, Any], 
@@ -81,26 +210,28 @@ class GeminiEnergyAdvisor:
             iot_data: IoT sensor data from smart meters
             historical_data: Historical trading and energy data
         """
+        ctx = _Context.capture()
         try:
             if self.model and self.api_key:
                 # Use Gemini for intelligent analysis
-                return self._get_gemini_recommendation(weather_data, iot_data, historical_data)
+                return self._get_gemini_recommendation(weather_data, iot_data, historical_data, ctx)
             else:
                 # Fallback to traditional ML
                 logger.warning("Using backup ML model - Gemini unavailable")
-                return self._get_backup_recommendation(weather_data, iot_data)
+                return self._get_backup_recommendation(weather_data, iot_data, ctx)
                 
         except Exception as e:
             logger.error(f"Error getting trading recommendation: {e}")
-            return self._get_emergency_recommendation(iot_data)
+            return self._get_emergency_recommendation(iot_data, ctx)
     
     def _prepare_analysis_context(self, weather_data: Dict[str, Any], 
                                 iot_data: Dict[str, Any], 
-                                historical_data: List[Dict[str, Any]] = None) -> str:
+                                historical_data: List[Dict[str, Any]] = None,
+                                ctx: _Context = None) -> str:
         """Prepare comprehensive context for Gemini analysis"""
-        
-        current_time = datetime.now()
-        hour = current_time.hour
+        ctx = ctx or _Context.capture()
+        current_time = ctx.now
+        hour = ctx.hour
         
         # Determine time factor
         if 10 <= hour <= 16:
@@ -133,7 +264,7 @@ class GeminiEnergyAdvisor:
             f"- Panel Current: {iot_data.get('panel_current', 'N/A')} A",
             "",
             "MARKET CONTEXT:",
-            f"- Energy Price: {settings.ENERGY_PRICE_KWH} KES per kWh",
+            f"- Energy Price: {ctx.energy_price} KES per kWh",
             f"- Time of Day Factor: {time_factor}",
             ""
         ]
@@ -148,57 +279,30 @@ class GeminiEnergyAdvisor:
                 ""
             ])
         
-        # Add objectives and requirements
-        context_parts.extend([
-            "TRADING OBJECTIVES:",
-            "1. Maximize revenue from excess solar generation",
-            "2. Minimize costs when purchasing energy", 
-            "3. Consider weather forecasts for strategic timing",
-            "4. Account for typical household consumption patterns",
-            "5. Factor in grid demand and pricing patterns",
-            "",
-            "REQUIRED OUTPUT:",
-            "Please provide a trading recommendation with detailed analysis."
-        ])
-        
         return "\n".join(context_parts)
     
     def _get_gemini_recommendation(self, weather_data: Dict[str, Any], 
                                  iot_data: Dict[str, Any],
-                                 historical_data: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+                                 historical_data: List[Dict[str, Any]] = None,
+                                 ctx: _Context = None) -> Dict[str, Any]:
         """Get recommendation from Gemini AI"""
+        ctx = ctx or _Context.capture()
         try:
-            context = self._prepare_analysis_context(weather_data, iot_data, historical_data)
+            context = self._prepare_analysis_context(weather_data, iot_data, historical_data, ctx)
             
-            prompt = f"""
-{context}
-
-Based on the above data, provide a comprehensive solar energy trading recommendation.
-Consider all factors: weather conditions, energy surplus/deficit, time of day, and market context.
-
-Please provide your analysis in JSON format with these fields:
-- decision: "BUY", "SELL", or "HOLD"
-- confidence: confidence percentage (0-100)
-- reasoning: detailed explanation
-- financial_impact: expected revenue/cost impact
-- risk_level: "LOW", "MEDIUM", or "HIGH"
-- optimal_timing: when to execute the trade
-
-Focus on practical advice for a Kenyan household with solar panels.
-"""
+            prompt = f"{context}\n\n{_STATIC_OBJECTIVES_AND_SCHEMA}"
             
             response = self.model.generate_content(prompt)
             
             if response and response.text:
                 # Try to parse JSON response
                 try:
-                    # Extract JSON from response
-                    json_start = response.text.find('{')
-                    json_end = response.text.rfind('}') + 1
+                    # Decode the first JSON object in place - no slicing or rescanning
+                    response_text = response.text
+                    json_start = response_text.find('{')
                     
-                    if json_start >= 0 and json_end > json_start:
-                        json_text = response.text[json_start:json_end]
-                        gemini_analysis = json.loads(json_text)
+                    if json_start >= 0:
+                        gemini_analysis, _ = _JSON_DECODER.raw_decode(response_text, json_start)
                     else:
                         # Fallback: parse structured text response
                         gemini_analysis = self._parse_text_response(response.text)
@@ -211,7 +315,7 @@ Focus on practical advice for a Kenyan household with solar panels.
                         'financial_impact': gemini_analysis.get('financial_impact', 'Estimated neutral impact'),
                         'risk_level': gemini_analysis.get('risk_level', 'MEDIUM'),
                         'optimal_timing': gemini_analysis.get('optimal_timing', 'Immediate execution recommended'),
-                        'timestamp': datetime.now().isoformat(),
+                        'timestamp': ctx.now.isoformat(),
                         'ai_model': 'gemini-pro',
                         'data_quality': 'high'
                     }
@@ -243,54 +347,42 @@ Focus on practical advice for a Kenyan household with solar panels.
                     logger.info(f"Raw Gemini response: {response.text[:500]}")
                     
                     # Create structured response from text
-                    return self._create_fallback_gemini_response(response.text, weather_data, iot_data)
+                    return self._create_fallback_gemini_response(response.text, weather_data, iot_data, ctx)
             
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
         
         # Fallback to backup model
-        return self._get_backup_recommendation(weather_data, iot_data)
+        return self._get_backup_recommendation(weather_data, iot_data, ctx)
     
     def _parse_text_response(self, text: str) -> Dict[str, Any]:
         """Parse unstructured Gemini text response"""
         analysis = {}
         
-        text_upper = text.upper()
-        
-        # Extract decision
-        if 'SELL' in text_upper:
-            analysis['decision'] = 'SELL'
-        elif 'BUY' in text_upper:
-            analysis['decision'] = 'BUY'
-        else:
-            analysis['decision'] = 'HOLD'
+        # Extract decision (first decision keyword wins)
+        decision_match = _DECISION_PATTERN.search(text)
+        analysis['decision'] = decision_match.group(1).upper() if decision_match else 'HOLD'
         
         # Extract confidence (look for percentage)
-        confidence_match = re.search(r'(\d+)%', text)
+        confidence_match = _CONFIDENCE_PATTERN.search(text)
         analysis['confidence'] = int(confidence_match.group(1)) if confidence_match else 70
         
         # Extract reasoning (first substantial paragraph)
-        sentences = text.split('. ')
-        reasoning_sentences = [s for s in sentences if len(s) > 50][:3]
+        reasoning_sentences = _first_long_sentences(text)
         analysis['reasoning'] = '. '.join(reasoning_sentences) if reasoning_sentences else text[:200]
         
         return analysis
     
     def _create_fallback_gemini_response(self, raw_text: str, weather_data: Dict[str, Any], 
-                                       iot_data: Dict[str, Any]) -> Dict[str, Any]:
+                                       iot_data: Dict[str, Any],
+                                       ctx: _Context = None) -> Dict[str, Any]:
         """Create structured response when JSON parsing fails"""
+        ctx = ctx or _Context.capture()
         
         # Extract basic decision from text
-        text_upper = raw_text.upper()
-        if 'SELL' in text_upper:
-            decision = 'SELL'
-            confidence = 75
-        elif 'BUY' in text_upper:
-            decision = 'BUY'
-            confidence = 75
-        else:
-            decision = 'HOLD'
-            confidence = 60
+        decision_match = _DECISION_PATTERN.search(raw_text)
+        decision = decision_match.group(1).upper() if decision_match else 'HOLD'
+        confidence = 60 if decision == 'HOLD' else 75
         
         return {
             'decision': decision,
@@ -299,7 +391,7 @@ Focus on practical advice for a Kenyan household with solar panels.
             'financial_impact': 'Analyze based on current surplus/deficit',
             'risk_level': 'MEDIUM',
             'optimal_timing': 'Consider current market conditions',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': ctx.now.isoformat(),
             'ai_model': 'gemini-pro-fallback',
             'sell_probability': 0.6 if decision == 'SELL' else 0.3,
             'buy_probability': 0.6 if decision == 'BUY' else 0.3,
@@ -307,26 +399,34 @@ Focus on practical advice for a Kenyan household with solar panels.
         }
     
     def _get_backup_recommendation(self, weather_data: Dict[str, Any], 
-                                 iot_data: Dict[str, Any]) -> Dict[str, Any]:
+                                 iot_data: Dict[str, Any],
+                                 ctx: _Context = None) -> Dict[str, Any]:
         """Fallback to traditional ML model"""
+        ctx = ctx or _Context.capture()
         
         if not self.is_backup_trained:
             self._train_backup_model()
         
         try:
-            # Prepare features
-            features = np.array([[
-                weather_data.get('temperature', 25),
-                weather_data.get('sunlight_hours', 6),
-                weather_data.get('cloud_percentage', 50),
-                iot_data.get('surplus_deficit_kwh', iot_data.get('surplus_deficit', 0)),
-                datetime.now().hour
-            ]])
+            # Prepare features in this thread's preallocated buffer
+            features, features_scaled = self._get_feature_buffers()
+            row = features[0]
+            row[0] = weather_data.get('temperature', 25)
+            row[1] = weather_data.get('sunlight_hours', 6)
+            row[2] = weather_data.get('cloud_percentage', 50)
+            row[3] = iot_data.get('surplus_deficit_kwh', iot_data.get('surplus_deficit', 0))
+            row[4] = ctx.hour
             
-            # Scale and predict
-            features_scaled = self.scaler.transform(features)
-            prediction = self.backup_model.predict(features_scaled)[0]
-            probabilities = self.backup_model.predict_proba(features_scaled)[0]
+            # Scale in place (same as StandardScaler.transform) and predict
+            np.subtract(features, self._scale_mean, out=features_scaled)
+            np.divide(features_scaled, self._scale_std, out=features_scaled)
+            if self._forest is not None:
+                sell_prob = self._forest_kernel(features_scaled[0], *self._forest)
+                probabilities = (1.0 - sell_prob, sell_prob)
+                prediction = 1 if sell_prob > 0.5 else 0
+            else:
+                prediction = self.backup_model.predict(features_scaled)[0]
+                probabilities = self.backup_model.predict_proba(features_scaled)[0]
             
             decision = 'SELL' if prediction == 1 else 'BUY'
             confidence = max(probabilities) * 100
@@ -334,11 +434,11 @@ Focus on practical advice for a Kenyan household with solar panels.
             return {
                 'decision': decision,
                 'confidence': round(confidence, 1),
-                'reasoning': self._get_backup_reasoning(weather_data, iot_data, decision),
-                'financial_impact': f"Estimated {abs(iot_data.get('surplus_deficit', 0)) * settings.ENERGY_PRICE_KWH:.2f} KES",
+                'reasoning': self._get_backup_reasoning(weather_data, iot_data, decision, ctx),
+                'financial_impact': f"Estimated {abs(iot_data.get('surplus_deficit', 0)) * ctx.energy_price:.2f} KES",
                 'risk_level': 'LOW',
                 'optimal_timing': 'Immediate execution',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': ctx.now.isoformat(),
                 'ai_model': 'random_forest_backup',
                 'sell_probability': round(probabilities[1], 3),
                 'buy_probability': round(probabilities[0], 3),
@@ -347,38 +447,56 @@ Focus on practical advice for a Kenyan household with solar panels.
             
         except Exception as e:
             logger.error(f"Backup model error: {e}")
-            return self._get_emergency_recommendation(iot_data)
+            return self._get_emergency_recommendation(iot_data, ctx)
     
     def _train_backup_model(self):
         """Train the backup Random Forest model"""
         try:
             logger.info("Training backup ML model...")
             
-            # Generate training data
-            training_data = []
-            for _ in range(settings.TRAINING_SAMPLES):
-                temp = np.random.normal(25, 5)
-                sunlight = max(0, np.random.normal(8, 2))
-                clouds = max(0, min(100, np.random.normal(40, 20)))
-                surplus = np.random.uniform(-3, 4)
-                hour = np.random.randint(0, 24)
-                
-                # Label logic
-                sell_conditions = (surplus > 1 and (clouds < 50 or sunlight > 7) and 6 <= hour <= 18)
-                buy_conditions = (surplus < -0.5 or (clouds > 70 and sunlight < 5) or hour < 6 or hour > 20)
-                
-                label = 1 if sell_conditions else 0
-                
-                training_data.append([temp, sunlight, clouds, surplus, hour, label])
+            # Imported here so that Gemini-only deployments never load them;
+            # sklearnex must patch sklearn before the estimator is imported
+            if settings.USE_SKLEARNEX:
+                _enable_sklearnex()
+            from sklearn.ensemble import RandomForestClassifier
+            from sklearn.preprocessing import StandardScaler
             
-            df = pd.DataFrame(training_data, columns=['temp', 'sunlight', 'clouds', 'surplus', 'hour', 'label'])
+            self.backup_model = RandomForestClassifier(
+                n_estimators=settings.N_ESTIMATORS,
+                max_depth=settings.MAX_DEPTH,
+                min_samples_split=settings.MIN_SAMPLES_SPLIT,
+                min_samples_leaf=settings.MIN_SAMPLES_LEAF,
+                random_state=settings.RANDOM_STATE,
+                class_weight='balanced'
+            )
+            self.scaler = StandardScaler()
             
-            X = df[['temp', 'sunlight', 'clouds', 'surplus', 'hour']]
-            y = df['label']
+            # Generate training data in one vectorized draw per feature
+            rng = np.random.default_rng(settings.RANDOM_STATE)
+            n_samples = settings.TRAINING_SAMPLES
+            temp = rng.normal(25, 5, n_samples)
+            sunlight = np.maximum(0, rng.normal(8, 2, n_samples))
+            clouds = np.clip(rng.normal(40, 20, n_samples), 0, 100)
+            surplus = rng.uniform(-3, 4, n_samples)
+            hour = rng.integers(0, 24, n_samples)
+            
+            # Label logic
+            sell_conditions = (surplus > 1) & ((clouds < 50) | (sunlight > 7)) & (hour >= 6) & (hour <= 18)
+            
+            X = np.column_stack([temp, sunlight, clouds, surplus, hour])
+            y = sell_conditions.astype(np.int64)
             
             # Scale and train
             X_scaled = self.scaler.fit_transform(X)
             self.backup_model.fit(X_scaled, y)
+            self._scale_mean = self.scaler.mean_
+            self._scale_std = self.scaler.scale_
+            
+            if NUMBA_AVAILABLE:
+                self._forest_kernel = _get_forest_kernel()
+                self._forest = self._pack_forest()
+                # Warm up the JIT so the first recommendation is not slow
+                self._forest_kernel(np.asarray(X_scaled[0], dtype=np.float64), *self._forest)
             
             self.is_backup_trained = True
             logger.info("Backup ML model trained successfully")
@@ -386,15 +504,50 @@ Focus on practical advice for a Kenyan household with solar panels.
         except Exception as e:
             logger.error(f"Failed to train backup model: {e}")
     
+    def _get_feature_buffers(self):
+        """Return this thread's (raw, scaled) feature buffers, allocating them once"""
+        buffers = getattr(self._buffers, 'features', None)
+        if buffers is None:
+            buffers = (np.zeros((1, 5)), np.zeros((1, 5)))
+            self._buffers.features = buffers
+        return buffers
+    
+    def _pack_forest(self):
+        """Flatten the trained trees into padded arrays for the JIT kernel"""
+        trees = [est.tree_ for est in self.backup_model.estimators_]
+        n_trees = len(trees)
+        n_nodes = max(tree.node_count for tree in trees)
+        sell_index = list(self.backup_model.classes_).index(1)
+        
+        feat = np.zeros((n_trees, n_nodes), dtype=np.int64)
+        thr = np.zeros((n_trees, n_nodes), dtype=np.float64)
+        cl = np.full((n_trees, n_nodes), -1, dtype=np.int64)
+        cr = np.full((n_trees, n_nodes), -1, dtype=np.int64)
+        val = np.zeros((n_trees, n_nodes), dtype=np.float64)
+        
+        for t, tree in enumerate(trees):
+            count = tree.node_count
+            # Leaves carry feature -2 in sklearn; clamp so indexing stays valid
+            feat[t, :count] = np.maximum(tree.feature, 0)
+            thr[t, :count] = tree.threshold
+            cl[t, :count] = tree.children_left
+            cr[t, :count] = tree.children_right
+            counts = tree.value[:, 0, :]
+            val[t, :count] = counts[:, sell_index] / counts.sum(axis=1)
+        
+        return feat, thr, cl, cr, val
+    
     def _get_backup_reasoning(self, weather_data: Dict[str, Any], 
-                            iot_data: Dict[str, Any], decision: str) -> str:
+                            iot_data: Dict[str, Any], decision: str,
+                            ctx: _Context = None) -> str:
         """Generate reasoning for backup model decision"""
+        ctx = ctx or _Context.capture()
         reasons = []
         
         surplus = iot_data.get('surplus_deficit_kwh', iot_data.get('surplus_deficit', 0))
         clouds = weather_data.get('cloud_percentage', 50)
         temp = weather_data.get('temperature', 25)
-        hour = datetime.now().hour
+        hour = ctx.hour
         
         # Energy balance reasoning
         if surplus > 1.5:
@@ -422,8 +575,10 @@ Focus on practical advice for a Kenyan household with solar panels.
         
         return "; ".join(reasons) if reasons else f"Standard {decision} conditions based on ML analysis"
     
-    def _get_emergency_recommendation(self, iot_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_emergency_recommendation(self, iot_data: Dict[str, Any],
+                                      ctx: _Context = None) -> Dict[str, Any]:
         """Emergency fallback recommendation when all else fails"""
+        ctx = ctx or _Context.capture()
         surplus = iot_data.get('surplus_deficit_kwh', iot_data.get('surplus_deficit', 0))
         decision = 'SELL' if surplus > 0 else 'BUY'
         
@@ -431,10 +586,10 @@ Focus on practical advice for a Kenyan household with solar panels.
             'decision': decision,
             'confidence': 50,
             'reasoning': f"Emergency mode: {decision} based on current surplus/deficit ({surplus:.1f} kWh)",
-            'financial_impact': f"Estimated {abs(surplus) * settings.ENERGY_PRICE_KWH:.2f} KES",
+            'financial_impact': f"Estimated {abs(surplus) * ctx.energy_price:.2f} KES",
             'risk_level': 'HIGH',
             'optimal_timing': 'Immediate - system in emergency mode',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': ctx.now.isoformat(),
             'ai_model': 'emergency_fallback',
             'sell_probability': 0.6 if decision == 'SELL' else 0.4,
             'buy_probability': 0.6 if decision == 'BUY' else 0.4,
@@ -3,17 +3,442 @@ Database Management Module
 Handles data storage and retrieval for the energy trading system
 """
 
+import os
 import sqlite3
 import logging
-import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import time
+import threading
+import atexit
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
 import json
 
 from config.settings import settings
 
+# Optional columnar (Arrow) support for bulk reads - graceful fallback if not available
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+
+try:
+    import adbc_driver_sqlite.dbapi as adbc_sqlite
+    ADBC_AVAILABLE = PYARROW_AVAILABLE
+except ImportError:
+    ADBC_AVAILABLE = False
+    adbc_sqlite = None
+
+# Fast JSON encoding for trade/log payloads - falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# Compact binary encoding for trade/log payload columns - JSON text if not available
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    msgpack = None
+
 logger = logging.getLogger(__name__)
 
+# Applied once to the shared connection: WAL lets readers run alongside the
+# writer and synchronous=NORMAL drops the fsync on every commit
+_CONNECTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_spill=OFF',
+    # Checkpoint every ~1000 pages so bulk cleanup can't balloon the WAL
+    'PRAGMA wal_autocheckpoint=1000',
+]
+
+# Table definitions; timestamps are INTEGER unix epoch seconds
+_TABLE_SCHEMAS = {
+    # Energy data table - stores IoT and weather data with AI predictions
+    'energy_data': '''
+        CREATE TABLE IF NOT EXISTS energy_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            household_id TEXT DEFAULT 'default',
+            
+            -- Weather data
+            temperature REAL,
+            humidity REAL,
+            pressure REAL,
+            wind_speed REAL,
+            cloud_percentage REAL,
+            sunlight_hours REAL,
+            weather_desc TEXT,
+            weather_source TEXT DEFAULT 'simulated',
+            
+            -- IoT/Energy data
+            solar_generation REAL,
+            consumption REAL,
+            surplus_deficit REAL,
+            panel_voltage REAL,
+            panel_current REAL,
+            battery_level INTEGER,
+            device_status TEXT DEFAULT 'online',
+            
+            -- AI prediction data
+            ai_decision TEXT,
+            confidence REAL,
+            reasoning TEXT,
+            ai_model TEXT DEFAULT 'unknown',
+            financial_impact TEXT,
+            risk_level TEXT,
+            optimal_timing TEXT,
+            
+            -- Metadata
+            data_quality TEXT DEFAULT 'good',
+            last_seen INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Trades table - stores executed trades
+    'trades': '''
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            household_id TEXT DEFAULT 'default',
+            trade_type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            price REAL NOT NULL,
+            total_value REAL,
+            status TEXT DEFAULT 'pending',
+            tx_hash TEXT,
+            blockchain_network TEXT DEFAULT 'solana',
+            
+            -- Payment integration
+            payment_method TEXT DEFAULT 'mpesa',
+            payment_tx_id TEXT,
+            payment_status TEXT DEFAULT 'pending',
+            
+            -- Market context
+            market_conditions BLOB,
+            execution_time_ms INTEGER,
+            
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Market data table - stores pricing and market information
+    'market_data': '''
+        CREATE TABLE IF NOT EXISTS market_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            energy_price REAL NOT NULL,
+            grid_demand REAL,
+            supply_available REAL,
+            peak_hours_active BOOLEAN DEFAULT 0,
+            market_sentiment TEXT,
+            price_trend TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # System logs table
+    'system_logs': '''
+        CREATE TABLE IF NOT EXISTS system_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            level TEXT NOT NULL,
+            component TEXT NOT NULL,
+            message TEXT NOT NULL,
+            details BLOB,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Weather alerts table
+    'weather_alerts': '''
+        CREATE TABLE IF NOT EXISTS weather_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            alert_type TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            message TEXT NOT NULL,
+            impact_description TEXT,
+            active BOOLEAN DEFAULT 1,
+            expires_at INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Hourly rollup of energy_data surplus/deficit, maintained on insert
+    'agg_hourly': '''
+        CREATE TABLE IF NOT EXISTS agg_hourly (
+            hour_bucket INTEGER PRIMARY KEY,
+            surplus_sum REAL NOT NULL DEFAULT 0,
+            deficit_sum REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''',
+    # Parquet archive high-water mark: energy rows older than archived_before
+    # are already in the archive and must not be exported again
+    'archive_state': '''
+        CREATE TABLE IF NOT EXISTS archive_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            archived_before INTEGER NOT NULL
+        )
+    ''',
+}
+
+# Columns stored as epoch seconds and returned to callers as ISO strings
+_EPOCH_COLUMNS = ('timestamp', 'expires_at', 'last_seen')
+
+# Opaque payload columns stored as MessagePack BLOBs (JSON text on older rows)
+# and returned to callers decoded
+_PAYLOAD_COLUMNS = {'trades': 'market_conditions', 'system_logs': 'details'}
+
+# Telemetry writes (energy data, system logs) are queued and flushed together
+_FLUSH_INTERVAL_SECONDS = 1.0
+_FLUSH_BATCH_SIZE = 500
+
+# Identical consecutive readings from a household within this window are not
+# stored again; the first row's last_seen is bumped instead
+_DEDUP_WINDOW_SECONDS = 300
+
+_SQL_TOUCH_ENERGY = '''
+    UPDATE energy_data SET last_seen = ?
+    WHERE household_id = ? AND timestamp = ?
+'''
+
+# Old rows are deleted in chunks, one short write transaction each, so
+# cleanup never holds the writer lock for long
+_CLEANUP_CHUNK_SIZE = 10000
+
+# Let SQLite refresh its planner statistics periodically in long-running processes
+_OPTIMIZE_INTERVAL_SECONDS = 4 * 60 * 60
+
+# The fixed SQL text below lets every call hit the connection's statement cache
+_STATEMENT_CACHE_SIZE = 256
+
+_SQL_INSERT_ENERGY = '''
+    INSERT INTO energy_data 
+    (timestamp, household_id, temperature, humidity, pressure, wind_speed,
+     cloud_percentage, sunlight_hours, weather_desc, weather_source,
+     solar_generation, consumption, surplus_deficit, panel_voltage, panel_current,
+     battery_level, device_status, ai_decision, confidence, reasoning,
+     ai_model, financial_impact, risk_level, optimal_timing, data_quality)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_UPSERT_HOURLY = '''
+    INSERT INTO agg_hourly (hour_bucket, surplus_sum, deficit_sum, count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(hour_bucket) DO UPDATE SET
+        surplus_sum = surplus_sum + excluded.surplus_sum,
+        deficit_sum = deficit_sum + excluded.deficit_sum,
+        count = count + excluded.count
+'''
+
+# Seeds agg_hourly from rows stored before the rollup existed
+_SQL_BACKFILL_HOURLY = '''
+    INSERT INTO agg_hourly (hour_bucket, surplus_sum, deficit_sum, count)
+    SELECT timestamp / 3600 * 3600,
+           TOTAL(CASE WHEN surplus_deficit > 0 THEN surplus_deficit END),
+           TOTAL(CASE WHEN surplus_deficit < 0 THEN surplus_deficit END),
+           COUNT(*)
+    FROM energy_data
+    GROUP BY 1
+'''
+
+# Positions of timestamp and surplus_deficit in _SQL_INSERT_ENERGY rows
+_ENERGY_TIMESTAMP_INDEX = 0
+_ENERGY_SURPLUS_INDEX = 12
+
+_SQL_INSERT_TRADE = '''
+    INSERT INTO trades 
+    (timestamp, household_id, trade_type, amount, price, total_value, status, tx_hash,
+     blockchain_network, payment_method, payment_tx_id, payment_status,
+     market_conditions, execution_time_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_INSERT_LOG = '''
+    INSERT INTO system_logs (timestamp, level, component, message, details)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+_SQL_INSERT_ALERT = '''
+    INSERT INTO weather_alerts 
+    (timestamp, alert_type, severity, message, impact_description, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+# Averaged energy_data columns; SUM/COUNT pairs let live and archived data merge
+_AVERAGED_COLUMNS = ('solar_generation', 'consumption', 'surplus_deficit', 'temperature',
+                     'cloud_percentage', 'sunlight_hours', 'confidence')
+_PEAK_COLUMNS = ('solar_generation', 'consumption', 'surplus_deficit')
+
+_SQL_ENERGY_STATS = '''
+    SELECT
+        COUNT(*) AS total_records,
+        {averages},
+        {peaks},
+        COUNT(CASE WHEN cloud_percentage < 30 THEN 1 END) AS clear_days,
+        COUNT(CASE WHEN cloud_percentage > 70 THEN 1 END) AS cloudy_days,
+        COUNT(CASE WHEN ai_decision = 'SELL' THEN 1 END) AS sell_recommendations,
+        COUNT(CASE WHEN ai_decision = 'BUY' THEN 1 END) AS buy_recommendations,
+        COUNT(CASE WHEN ai_decision = 'HOLD' THEN 1 END) AS hold_recommendations
+    FROM energy_data
+    WHERE timestamp > ?
+'''.format(
+    averages=',\n        '.join(f'TOTAL({c}) AS sum_{c}, COUNT({c}) AS count_{c}' for c in _AVERAGED_COLUMNS),
+    peaks=',\n        '.join(f'MAX({c}) AS max_{c}' for c in _PEAK_COLUMNS)
+)
+
+# Surplus/deficit totals come from the hourly rollup rather than a row scan:
+# whole buckets from the first full hour after the cutoff, plus the partial
+# first hour summed from its raw rows (live rows only - once that hour has
+# been archived and cleaned up it no longer contributes)
+_SQL_HOURLY_TOTALS = '''
+    SELECT TOTAL(surplus) AS total_surplus, TOTAL(deficit) AS total_deficit
+    FROM (
+        SELECT surplus_sum AS surplus, deficit_sum AS deficit
+        FROM agg_hourly
+        WHERE hour_bucket >= ?
+        UNION ALL
+        SELECT MAX(surplus_deficit, 0), MIN(surplus_deficit, 0)
+        FROM energy_data
+        WHERE timestamp > ? AND timestamp < ?
+    )
+'''
+
+# Latest row holding a column's peak value
+_SQL_ENERGY_PEAK = '''
+    SELECT timestamp AS peak_timestamp FROM energy_data
+    WHERE timestamp > ? AND {column} IS NOT NULL
+    ORDER BY {column} DESC, timestamp DESC
+    LIMIT 1
+'''
+
+# Peak timestamp key -> column whose maximum it belongs to
+_PEAK_DAYS = {'best_generation_day': 'solar_generation', 'highest_surplus_day': 'surplus_deficit'}
+
+
+def _arrow_energy_stats(table: 'pa.Table') -> Dict[str, Any]:
+    """Compute the _SQL_ENERGY_STATS aggregates (plus peak days) over an Arrow table"""
+    import numpy as np
+    import pyarrow.compute as pc
+    
+    # Materialize each numeric column once as a contiguous float64 array
+    # (nulls -> NaN); every reduction below then runs on that buffer
+    arrays = {
+        column: pc.cast(table[column], pa.float64()).to_numpy()
+        for column in set(_AVERAGED_COLUMNS) | set(_PEAK_COLUMNS)
+    }
+    
+    stats = {'total_records': table.num_rows}
+    for column, values in arrays.items():
+        count = int(np.count_nonzero(~np.isnan(values)))
+        if column in _AVERAGED_COLUMNS:
+            stats[f'sum_{column}'] = float(np.nansum(values))
+            stats[f'count_{column}'] = count
+        if column in _PEAK_COLUMNS:
+            stats[f'max_{column}'] = float(np.nanmax(values)) if count else None
+    
+    # NaN compares False, matching SQL's NULL handling
+    clouds = arrays['cloud_percentage']
+    stats['clear_days'] = int(np.count_nonzero(clouds < 30))
+    stats['cloudy_days'] = int(np.count_nonzero(clouds > 70))
+    
+    decisions = {entry['values']: entry['counts']
+                 for entry in pc.value_counts(table['ai_decision']).to_pylist()}
+    for decision in ('SELL', 'BUY', 'HOLD'):
+        stats[f'{decision.lower()}_recommendations'] = decisions.get(decision, 0)
+    
+    timestamps = table['timestamp'].to_numpy()
+    for key, column in _PEAK_DAYS.items():
+        peak = stats[f'max_{column}']
+        stats[key] = None if peak is None else int(timestamps[arrays[column] == peak].max())
+    return stats
+
+
+def _merge_energy_stats(live: Dict[str, Any], archived: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine two partial energy aggregates computed over disjoint rows"""
+    merged = {}
+    for key, value in live.items():
+        other = archived.get(key)
+        if key.startswith('max_'):
+            present = [v for v in (value, other) if v is not None]
+            merged[key] = max(present) if present else None
+        elif key in _PEAK_DAYS:
+            continue
+        else:
+            merged[key] = (value or 0) + (other or 0)
+    
+    # Peak day comes from whichever side holds the maximum (latest on ties)
+    for key, column in _PEAK_DAYS.items():
+        candidates = [
+            (side[f'max_{column}'], side[key]) for side in (live, archived)
+            if side[f'max_{column}'] is not None and side[key] is not None
+        ]
+        merged[key] = max(candidates)[1] if candidates else None
+    return merged
+
+
+def _hourly_rollup(rows: List[tuple]) -> List[tuple]:
+    """Collapse energy_data insert rows into agg_hourly upsert parameters"""
+    buckets = {}
+    for row in rows:
+        hour = row[_ENERGY_TIMESTAMP_INDEX] // 3600 * 3600
+        surplus = row[_ENERGY_SURPLUS_INDEX] or 0.0
+        bucket = buckets.setdefault(hour, [0.0, 0.0, 0])
+        if surplus > 0:
+            bucket[0] += surplus
+        else:
+            bucket[1] += surplus
+        bucket[2] += 1
+    return [(hour, *bucket) for hour, bucket in buckets.items()]
+
+
+def _dumps(value: Any) -> str:
+    """Serialize a value to JSON text"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass  # Types orjson rejects; let the stdlib decide
+    return json.dumps(value)
+
+
+def _pack(value: Any) -> Any:
+    """Encode a payload column value: MessagePack BLOB, or JSON text without msgpack"""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(value, use_bin_type=True, default=str)
+    return _dumps(value)
+
+
+def _unpack(value: Any) -> Any:
+    """Decode a stored payload column value written by _pack"""
+    if isinstance(value, bytes) and MSGPACK_AVAILABLE:
+        return msgpack.unpackb(value, raw=False)
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _to_epoch(value: Any = None) -> int:
+    """Convert an ISO string, datetime or number to unix epoch seconds (now if None)"""
+    if value is None:
+        return int(time.time())
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp())
+
+
 class EnergyTradingDatabase:
     """
     Enhanced database manager for energy trading data
@@ -21,259 +446,489 @@ class EnergyTradingDatabase:
     
     def __init__(self, db_path: str = None):
         self.db_path = db_path or settings.DATABASE_PATH
-        self.connection = None
+        self.archive_path = settings.ARCHIVE_PATH
+        self._tls = threading.local()
+        self._connections = []  # (owner thread, connection)
+        self._pool_lock = threading.Lock()
+        self._closed = False
+        self._lock = threading.RLock()
+        self._pending_lock = threading.Lock()
+        self._pending_energy = deque()
+        self._pending_logs = deque()
+        self._pending_touches = {}
+        self._last_hash = {}  # household_id -> (reading hash, first stored epoch)
+        self._flush_armed = False
+        self._flush_requested = threading.Event()
+        self._flush_stopped = threading.Event()
+        self._flush_thread = None
+        self._optimize_timer = None
+        self._adbc_connection = None
         self._init_database()
+        self._schedule_optimize()
+        atexit.register(self.close)
     
-    def _init_database(self):
-        """Initialize SQLite database with comprehensive schema"""
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection to the database"""
+        # isolation_level=None: transactions are managed explicitly in _transaction.
+        # check_same_thread=False only so close() can shut down other threads' connections
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=_STATEMENT_CACHE_SIZE)
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _conn(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use
+        
+        With WAL, each thread's reads run in parallel on their own connection;
+        writes still serialize through _transaction.
+        """
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None:
+            with self._pool_lock:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+                # Drop connections left behind by threads that have exited
+                for owner, stale in [entry for entry in self._connections
+                                     if not entry[0].is_alive()]:
+                    self._connections.remove((owner, stale))
+                    stale.close()
+                conn = self._connect()
+                self._connections.append((threading.current_thread(), conn))
+            self._tls.conn = conn
+        return conn
+    
+    def _release_conn(self):
+        """Close the calling thread's connection, e.g. before a worker thread exits"""
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None:
+            return
+        self._tls.conn = None
+        with self._pool_lock:
+            entry = (threading.current_thread(), conn)
+            if entry in self._connections:
+                self._connections.remove(entry)
+                conn.close()
+    
+    def _in_background(self, task):
+        """Wrap a timer task so its short-lived thread releases its connection"""
+        def run():
+            try:
+                task()
+            finally:
+                self._release_conn()
+        return run
+    
+    def _schedule_optimize(self):
+        """Arm the background timer that runs PRAGMA optimize"""
+        self._optimize_timer = threading.Timer(_OPTIMIZE_INTERVAL_SECONDS,
+                                               self._in_background(self._run_optimize))
+        self._optimize_timer.daemon = True
+        self._optimize_timer.start()
+    
+    def _run_optimize(self):
+        """Periodic PRAGMA optimize"""
+        if self._closed:
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Energy data table - stores IoT and weather data with AI predictions
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS energy_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    household_id TEXT DEFAULT 'default',
-                    
-                    -- Weather data
-                    temperature REAL,
-                    humidity REAL,
-                    pressure REAL,
-                    wind_speed REAL,
-                    cloud_percentage REAL,
-                    sunlight_hours REAL,
-                    weather_desc TEXT,
-                    weather_source TEXT DEFAULT 'simulated',
-                    
-                    -- IoT/Energy data
-                    solar_generation REAL,
-                    consumption REAL,
-                    surplus_deficit REAL,
-                    panel_voltage REAL,
-                    panel_current REAL,
-                    battery_level INTEGER,
-                    device_status TEXT DEFAULT 'online',
-                    
-                    -- AI prediction data
-                    ai_decision TEXT,
-                    confidence REAL,
-                    reasoning TEXT,
-                    ai_model TEXT DEFAULT 'unknown',
-                    financial_impact TEXT,
-                    risk_level TEXT,
-                    optimal_timing TEXT,
-                    
-                    -- Metadata
-                    data_quality TEXT DEFAULT 'good',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Trades table - stores executed trades
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS trades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    household_id TEXT DEFAULT 'default',
-                    trade_type TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    price REAL NOT NULL,
-                    total_value REAL,
-                    status TEXT DEFAULT 'pending',
-                    tx_hash TEXT,
-                    blockchain_network TEXT DEFAULT 'solana',
-                    
-                    -- Payment integration
-                    payment_method TEXT DEFAULT 'mpesa',
-                    payment_tx_id TEXT,
-                    payment_status TEXT DEFAULT 'pending',
-                    
-                    -- Market context
-                    market_conditions TEXT,
-                    execution_time_ms INTEGER,
-                    
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Market data table - stores pricing and market information
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS market_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    energy_price REAL NOT NULL,
-                    grid_demand REAL,
-                    supply_available REAL,
-                    peak_hours_active BOOLEAN DEFAULT 0,
-                    market_sentiment TEXT,
-                    price_trend TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            self._conn().execute('PRAGMA optimize')
+        except Exception as e:
+            logger.warning(f"PRAGMA optimize failed: {e}")
+        self._schedule_optimize()
+    
+    def close(self):
+        """Flush queued writes, optimize and close every thread's connection"""
+        if self._optimize_timer is not None:
+            self._optimize_timer.cancel()
+            self._optimize_timer = None
+        self._flush_stopped.set()
+        self._flush_requested.set()
+        
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            try:
+                self._conn().execute('PRAGMA optimize')
+            except Exception as e:
+                logger.warning(f"PRAGMA optimize failed: {e}")
             
-            # System logs table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS system_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    level TEXT NOT NULL,
-                    component TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    details TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            with self._pool_lock:
+                self._closed = True
+                for _, conn in self._connections:
+                    conn.close()
+                self._connections.clear()
+            self._tls = threading.local()
+            if self._adbc_connection is not None:
+                self._adbc_connection.close()
+                self._adbc_connection = None
+    
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements in one write transaction on this thread's connection"""
+        # Writers queue on the lock instead of spinning on SQLITE_BUSY
+        with self._lock:
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+    
+    def _fetch_dicts(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Run a read query on this thread's connection and return rows as dicts"""
+        cursor = self._conn().cursor()
+        cursor.row_factory = sqlite3.Row
+        rows = [dict(row) for row in cursor.execute(query, params)]
+        
+        # Keep the API returning ISO timestamps
+        for row in rows:
+            for column in _EPOCH_COLUMNS:
+                value = row.get(column)
+                if isinstance(value, int):
+                    row[column] = datetime.fromtimestamp(value).isoformat()
+            for column in _PAYLOAD_COLUMNS.values():
+                if row.get(column) is not None:
+                    row[column] = _unpack(row[column])
+        return rows
+    
+    def _fetch_arrow(self, query: str, params: tuple = ()) -> 'pa.Table':
+        """Run a read query and return the result as a pyarrow Table
+        
+        Uses the ADBC SQLite driver, which decodes straight into Arrow columns,
+        and falls back to building the table from this thread's connection.
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow is required for Arrow reads")
+        
+        if ADBC_AVAILABLE:
+            with self._lock:
+                if self._adbc_connection is None:
+                    self._adbc_connection = adbc_sqlite.connect(self.db_path, autocommit=True)
+                with self._adbc_connection.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return cursor.fetch_arrow_table()
+        
+        cursor = self._conn().execute(query, params)
+        names = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        
+        return pa.table({name: [row[i] for row in rows] for i, name in enumerate(names)})
+    
+    def _migrate_epoch_timestamps(self, cursor: sqlite3.Cursor):
+        """Rebuild tables that still store ISO TEXT timestamps with INTEGER epochs"""
+        for table, create_sql in _TABLE_SCHEMAS.items():
+            columns = cursor.execute(f'PRAGMA table_info({table})').fetchall()
+            column_types = {column[1]: column[2].upper() for column in columns}
+            if column_types.get('timestamp', 'INTEGER') == 'INTEGER':
+                continue
             
-            # Weather alerts table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS weather_alerts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    alert_type TEXT NOT NULL,
-                    severity TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    impact_description TEXT,
-                    active BOOLEAN DEFAULT 1,
-                    expires_at TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
+            # Stored ISO values are local time; 'utc' converts them before %s
+            select = ', '.join(
+                f"CAST(strftime('%s', {name}, 'utc') AS INTEGER)" if name in _EPOCH_COLUMNS else name
+                for name in column_types
+            )
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_iso_backup')
+            cursor.execute(create_sql)
+            cursor.execute(f'''
+                INSERT INTO {table} ({', '.join(column_types)})
+                SELECT {select} FROM {table}_iso_backup
             ''')
+            cursor.execute(f'DROP TABLE {table}_iso_backup')
+            logger.info(f"Migrated {table} timestamps to unix epochs")
+    
+    def _migrate_payloads_to_msgpack(self, cursor: sqlite3.Cursor):
+        """Re-encode JSON TEXT payload values as MessagePack BLOBs"""
+        if not MSGPACK_AVAILABLE:
+            return
+        for table, column in _PAYLOAD_COLUMNS.items():
+            rows = cursor.execute(
+                f"SELECT rowid, {column} FROM {table} WHERE typeof({column}) = 'text'"
+            ).fetchall()
+            if not rows:
+                continue
+            cursor.executemany(
+                f'UPDATE {table} SET {column} = ? WHERE rowid = ?',
+                [(_pack(json.loads(value)), rowid) for rowid, value in rows]
+            )
+            logger.info(f"Converted {len(rows)} {table}.{column} values to MessagePack")
+    
+    def _init_database(self):
+        """Initialize SQLite database with comprehensive schema
+        
+        Migrations, tables and indexes are applied in one transaction on this
+        thread's pooled connection, which stays open for runtime use.
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Convert databases created with ISO TEXT timestamps
+                self._migrate_epoch_timestamps(cursor)
+                
+                for create_sql in _TABLE_SCHEMAS.values():
+                    cursor.execute(create_sql)
+                
+                self._migrate_payloads_to_msgpack(cursor)
+                
+                # Columns added after a table was first created
+                energy_columns = {column[1] for column in cursor.execute('PRAGMA table_info(energy_data)')}
+                if 'last_seen' not in energy_columns:
+                    cursor.execute('ALTER TABLE energy_data ADD COLUMN last_seen INTEGER')
+                
+                # Create indexes for better performance
+                indexes = [
+                    'CREATE INDEX IF NOT EXISTS idx_energy_timestamp ON energy_data(timestamp)',
+                    'CREATE INDEX IF NOT EXISTS idx_energy_household ON energy_data(household_id)',
+                    'CREATE INDEX IF NOT EXISTS idx_energy_timestamp_surplus ON energy_data(timestamp, surplus_deficit)',
+                    'CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp)',
+                    'CREATE INDEX IF NOT EXISTS idx_trades_household ON trades(household_id)',
+                    'CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status)',
+                    'CREATE INDEX IF NOT EXISTS idx_market_timestamp ON market_data(timestamp)',
+                    'CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp ON system_logs(timestamp)',
+                    'CREATE INDEX IF NOT EXISTS idx_weather_alerts_active ON weather_alerts(active)',
+                    # Composite indexes covering per-household WHERE + ORDER BY timestamp
+                    'CREATE INDEX IF NOT EXISTS idx_energy_household_ts ON energy_data(household_id, timestamp DESC)',
+                    'CREATE INDEX IF NOT EXISTS idx_trades_household_ts ON trades(household_id, timestamp DESC)',
+                    'CREATE INDEX IF NOT EXISTS idx_weather_alerts_active_expires ON weather_alerts(active, expires_at)',
+                    'CREATE INDEX IF NOT EXISTS idx_energy_ai_decision ON energy_data(ai_decision)',
+                ]
+                
+                for index_sql in indexes:
+                    cursor.execute(index_sql)
+                
+                if cursor.execute('SELECT 1 FROM agg_hourly LIMIT 1').fetchone() is None:
+                    cursor.execute(_SQL_BACKFILL_HOURLY)
             
-            # Create indexes for better performance
-            indexes = [
-                'CREATE INDEX IF NOT EXISTS idx_energy_timestamp ON energy_data(timestamp)',
-                'CREATE INDEX IF NOT EXISTS idx_energy_household ON energy_data(household_id)',
-                'CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp)',
-                'CREATE INDEX IF NOT EXISTS idx_trades_household ON trades(household_id)',
-                'CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status)',
-                'CREATE INDEX IF NOT EXISTS idx_market_timestamp ON market_data(timestamp)',
-                'CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp ON system_logs(timestamp)',
-                'CREATE INDEX IF NOT EXISTS idx_weather_alerts_active ON weather_alerts(active)',
-            ]
-            
-            for index_sql in indexes:
-                cursor.execute(index_sql)
-            
-            conn.commit()
-            conn.close()
+            # Refresh planner statistics so the new indexes get picked; the
+            # analysis limit keeps this cheap on large databases
+            conn.execute('PRAGMA analysis_limit=1000')
+            conn.execute('ANALYZE')
             logger.info(f"Database initialized successfully at {self.db_path}")
             
         except Exception as e:
             logger.error(f"Database initialization error: {e}")
             raise
     
+    def _energy_row(self, weather_data: Dict[str, Any], iot_data: Dict[str, Any],
+                    prediction: Dict[str, Any], household_id: str) -> tuple:
+        """Build the parameter tuple for one energy_data insert"""
+        return (
+            _to_epoch(prediction.get('timestamp')),
+            household_id,
+            weather_data.get('temperature'),
+            weather_data.get('humidity'),
+            weather_data.get('pressure'),
+            weather_data.get('wind_speed'),
+            weather_data.get('cloud_percentage'),
+            weather_data.get('sunlight_hours'),
+            weather_data.get('weather_desc'),
+            weather_data.get('data_source', 'simulated'),
+            iot_data.get('solar_generation_kwh', iot_data.get('solar_generation')),
+            iot_data.get('consumption_kwh', iot_data.get('consumption')),
+            iot_data.get('surplus_deficit_kwh', iot_data.get('surplus_deficit')),
+            iot_data.get('panel_voltage'),
+            iot_data.get('panel_current'),
+            iot_data.get('battery_level'),
+            iot_data.get('device_status', {}).get('online', True),
+            prediction.get('decision'),
+            prediction.get('confidence'),
+            prediction.get('reasoning'),
+            prediction.get('ai_model'),
+            prediction.get('financial_impact'),
+            prediction.get('risk_level'),
+            prediction.get('optimal_timing'),
+            prediction.get('data_quality', 'good')
+        )
+    
+    def _trade_row(self, trade_data: Dict[str, Any], household_id: str) -> tuple:
+        """Build the parameter tuple for one trades insert"""
+        return (
+            _to_epoch(trade_data.get('timestamp')),
+            household_id,
+            trade_data['type'],
+            trade_data['amount'],
+            trade_data['price'],
+            trade_data.get('total_value', trade_data['amount'] * trade_data['price']),
+            trade_data.get('status', 'pending'),
+            trade_data.get('tx_hash', ''),
+            trade_data.get('blockchain_network', 'solana'),
+            trade_data.get('payment_method', 'mpesa'),
+            trade_data.get('payment_tx_id', ''),
+            trade_data.get('payment_status', 'pending'),
+            _pack(trade_data.get('market_conditions', {})),
+            trade_data.get('execution_time_ms', 0)
+        )
+    
+    def _log_row(self, level: str, component: str, message: str,
+                 details: Dict[str, Any] = None) -> tuple:
+        """Build the parameter tuple for one system_logs insert"""
+        return (
+            _to_epoch(),
+            level.upper(),
+            component,
+            message,
+            _pack(details) if details else None
+        )
+    
+    def _arm_flush_timer(self):
+        """Open a flush window if none is pending (caller holds _pending_lock)"""
+        if self._flush_armed:
+            return
+        self._flush_armed = True
+        if self._flush_thread is None:
+            self._flush_thread = threading.Thread(target=self._flush_loop,
+                                                  name='db-flusher', daemon=True)
+            self._flush_thread.start()
+        self._flush_requested.set()
+    
+    def _flush_loop(self):
+        """Long-lived flusher: one thread and one connection for every flush window"""
+        try:
+            while not self._flush_stopped.is_set():
+                self._flush_requested.wait()
+                self._flush_requested.clear()
+                # Wait out the window; close() cuts it short and flushes itself
+                if self._flush_stopped.wait(_FLUSH_INTERVAL_SECONDS):
+                    break
+                self.flush()
+        finally:
+            self._release_conn()
+    
+    def _enqueue(self, queue: deque, row: tuple):
+        """Queue a telemetry row; flush when the batch is full or after the flush window"""
+        with self._pending_lock:
+            queue.append(row)
+            pending = len(self._pending_energy) + len(self._pending_logs)
+            if pending < _FLUSH_BATCH_SIZE:
+                self._arm_flush_timer()
+        
+        if pending >= _FLUSH_BATCH_SIZE:
+            self.flush()
+    
+    def _is_repeat_reading(self, row: tuple) -> bool:
+        """Check whether an energy row repeats its household's last stored reading
+        
+        Repeats within _DEDUP_WINDOW_SECONDS queue a last_seen bump on the
+        stored row instead of a new insert.
+        """
+        household_id, timestamp = row[1], row[_ENERGY_TIMESTAMP_INDEX]
+        reading = hash(row[1:])
+        with self._pending_lock:
+            last = self._last_hash.get(household_id)
+            if last is not None and last[0] == reading and 0 <= timestamp - last[1] < _DEDUP_WINDOW_SECONDS:
+                self._pending_touches[(household_id, last[1])] = timestamp
+                self._arm_flush_timer()
+                return True
+            self._last_hash[household_id] = (reading, timestamp)
+            return False
+    
+    def _insert_energy_rows(self, conn: sqlite3.Connection, rows: List[tuple]):
+        """Insert energy rows and fold them into agg_hourly in the same transaction"""
+        conn.executemany(_SQL_INSERT_ENERGY, rows)
+        conn.executemany(_SQL_UPSERT_HOURLY, _hourly_rollup(rows))
+    
+    def flush(self):
+        """Write all queued energy data and system logs in a single transaction"""
+        with self._lock:
+            with self._pending_lock:
+                energy_rows = list(self._pending_energy)
+                log_rows = list(self._pending_logs)
+                touches = [(seen, household_id, timestamp)
+                           for (household_id, timestamp), seen in self._pending_touches.items()]
+                self._pending_energy.clear()
+                self._pending_logs.clear()
+                self._pending_touches.clear()
+                self._flush_armed = False
+            
+            if not energy_rows and not log_rows and not touches:
+                return
+            
+            try:
+                with self._transaction() as conn:
+                    if energy_rows:
+                        self._insert_energy_rows(conn, energy_rows)
+                    if touches:
+                        conn.executemany(_SQL_TOUCH_ENERGY, touches)
+                    if log_rows:
+                        conn.executemany(_SQL_INSERT_LOG, log_rows)
+            except Exception as e:
+                logger.error(f"Error flushing queued writes ({len(energy_rows)} energy, "
+                             f"{len(log_rows)} log rows): {e}")
+    
     def store_energy_data(self, weather_data: Dict[str, Any], iot_data: Dict[str, Any], 
                          prediction: Dict[str, Any], household_id: str = 'default'):
-        """Store comprehensive energy data including weather, IoT, and AI prediction"""
+        """Queue comprehensive energy data including weather, IoT, and AI prediction"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO energy_data 
-                (timestamp, household_id, temperature, humidity, pressure, wind_speed,
-                 cloud_percentage, sunlight_hours, weather_desc, weather_source,
-                 solar_generation, consumption, surplus_deficit, panel_voltage, panel_current,
-                 battery_level, device_status, ai_decision, confidence, reasoning,
-                 ai_model, financial_impact, risk_level, optimal_timing, data_quality)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                prediction.get('timestamp', datetime.now().isoformat()),
-                household_id,
-                weather_data.get('temperature'),
-                weather_data.get('humidity'),
-                weather_data.get('pressure'),
-                weather_data.get('wind_speed'),
-                weather_data.get('cloud_percentage'),
-                weather_data.get('sunlight_hours'),
-                weather_data.get('weather_desc'),
-                weather_data.get('data_source', 'simulated'),
-                iot_data.get('solar_generation_kwh', iot_data.get('solar_generation')),
-                iot_data.get('consumption_kwh', iot_data.get('consumption')),
-                iot_data.get('surplus_deficit_kwh', iot_data.get('surplus_deficit')),
-                iot_data.get('panel_voltage'),
-                iot_data.get('panel_current'),
-                iot_data.get('battery_level'),
-                iot_data.get('device_status', {}).get('online', True),
-                prediction.get('decision'),
-                prediction.get('confidence'),
-                prediction.get('reasoning'),
-                prediction.get('ai_model'),
-                prediction.get('financial_impact'),
-                prediction.get('risk_level'),
-                prediction.get('optimal_timing'),
-                prediction.get('data_quality', 'good')
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            row = self._energy_row(weather_data, iot_data, prediction, household_id)
+            if not self._is_repeat_reading(row):
+                self._enqueue(self._pending_energy, row)
         except Exception as e:
             logger.error(f"Error storing energy data: {e}")
     
+    def store_energy_data_many(self, records: Iterable[Dict[str, Any]]):
+        """Store many energy records in one transaction
+        
+        Each record is a dict with 'weather_data', 'iot_data', 'prediction'
+        and optionally 'household_id'.
+        """
+        try:
+            rows = [
+                self._energy_row(record['weather_data'], record['iot_data'],
+                                 record['prediction'], record.get('household_id', 'default'))
+                for record in records
+            ]
+            with self._transaction() as conn:
+                self._insert_energy_rows(conn, rows)
+        except Exception as e:
+            logger.error(f"Error storing energy data batch: {e}")
+    
     def store_trade(self, trade_data: Dict[str, Any], household_id: str = 'default'):
         """Store trade execution data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO trades 
-                (timestamp, household_id, trade_type, amount, price, total_value, status, tx_hash,
-                 blockchain_network, payment_method, payment_tx_id, payment_status,
-                 market_conditions, execution_time_ms)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                trade_data.get('timestamp', datetime.now().isoformat()),
-                household_id,
-                trade_data['type'],
-                trade_data['amount'],
-                trade_data['price'],
-                trade_data.get('total_value', trade_data['amount'] * trade_data['price']),
-                trade_data.get('status', 'pending'),
-                trade_data.get('tx_hash', ''),
-                trade_data.get('blockchain_network', 'solana'),
-                trade_data.get('payment_method', 'mpesa'),
-                trade_data.get('payment_tx_id', ''),
-                trade_data.get('payment_status', 'pending'),
-                json.dumps(trade_data.get('market_conditions', {})),
-                trade_data.get('execution_time_ms', 0)
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            with self._transaction() as conn:
+                conn.execute(_SQL_INSERT_TRADE, self._trade_row(trade_data, household_id))
         except Exception as e:
             logger.error(f"Error storing trade: {e}")
     
+    def store_trades_many(self, trades: Iterable[Dict[str, Any]], household_id: str = 'default'):
+        """Store many trades in one transaction"""
+        try:
+            rows = [self._trade_row(trade_data, household_id) for trade_data in trades]
+            with self._transaction() as conn:
+                conn.executemany(_SQL_INSERT_TRADE, rows)
+        except Exception as e:
+            logger.error(f"Error storing trade batch: {e}")
+    
     def get_recent_energy_data(self, hours: int = 24, household_id: str = None) -> List[Dict[str, Any]]:
         """Get recent energy data for analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            # Make queued telemetry visible before reading
+            self.flush()
+            
+            # Compare against a bound epoch cutoff so the timestamp indexes range-scan
+            cutoff = _to_epoch() - hours * 3600
             
             # Build query based on whether household_id is specified
             if household_id:
                 query = '''
                     SELECT * FROM energy_data 
-                    WHERE datetime(timestamp) > datetime('now', '-{} hours')
+                    WHERE timestamp > ?
                     AND household_id = ?
                     ORDER BY timestamp DESC
                     LIMIT 1000
-                '''.format(hours)
-                df = pd.read_sql_query(query, conn, params=[household_id])
+                '''
+                return self._fetch_dicts(query, (cutoff, household_id))
             else:
                 query = '''
                     SELECT * FROM energy_data 
-                    WHERE datetime(timestamp) > datetime('now', '-{} hours')
+                    WHERE timestamp > ?
                     ORDER BY timestamp DESC
                     LIMIT 1000
-                '''.format(hours)
-                df = pd.read_sql_query(query, conn)
-            
-            conn.close()
-            return df.to_dict('records') if not df.empty else []
+                '''
+                return self._fetch_dicts(query, (cutoff,))
             
         except Exception as e:
             logger.error(f"Error retrieving recent energy data: {e}")
@@ -282,80 +937,121 @@ class EnergyTradingDatabase:
     def get_trade_history(self, hours: int = 168, household_id: str = None) -> List[Dict[str, Any]]:
         """Get trade history (default: last week)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            cutoff = _to_epoch() - hours * 3600
             
             if household_id:
                 query = '''
                     SELECT * FROM trades 
-                    WHERE datetime(timestamp) > datetime('now', '-{} hours')
+                    WHERE timestamp > ?
                     AND household_id = ?
                     ORDER BY timestamp DESC
-                '''.format(hours)
-                df = pd.read_sql_query(query, conn, params=[household_id])
+                '''
+                return self._fetch_dicts(query, (cutoff, household_id))
             else:
                 query = '''
                     SELECT * FROM trades 
-                    WHERE datetime(timestamp) > datetime('now', '-{} hours')
+                    WHERE timestamp > ?
                     ORDER BY timestamp DESC
-                '''.format(hours)
-                df = pd.read_sql_query(query, conn)
-            
-            conn.close()
-            return df.to_dict('records') if not df.empty else []
+                '''
+                return self._fetch_dicts(query, (cutoff,))
             
         except Exception as e:
             logger.error(f"Error retrieving trade history: {e}")
             return []
     
+    def get_energy_data_arrow(self, hours: int = 24, household_id: str = None) -> 'pa.Table':
+        """Get recent energy data as a columnar pyarrow Table for bulk consumers
+        
+        Timestamps stay as unix epoch seconds. Requires pyarrow; the
+        adbc_driver_sqlite package makes the read zero-copy into Arrow.
+        """
+        self.flush()
+        cutoff = _to_epoch() - hours * 3600
+        
+        if household_id:
+            return self._fetch_arrow('''
+                SELECT * FROM energy_data
+                WHERE timestamp > ? AND household_id = ?
+                ORDER BY timestamp DESC
+            ''', (cutoff, household_id))
+        return self._fetch_arrow('''
+            SELECT * FROM energy_data
+            WHERE timestamp > ?
+            ORDER BY timestamp DESC
+        ''', (cutoff,))
+    
     def get_energy_analytics(self, days: int = 7) -> Dict[str, Any]:
-        """Get comprehensive energy analytics"""
+        """Get comprehensive energy analytics
+        
+        Rows already moved to the Parquet archive by cleanup_old_data are
+        included when the period reaches past the live retention window.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            # Make queued telemetry visible before reading
+            self.flush()
             
-            # Get energy data for analysis period
-            query = '''
-                SELECT * FROM energy_data 
-                WHERE datetime(timestamp) > datetime('now', '-{} days')
-                ORDER BY timestamp DESC
-            '''.format(days)
+            cutoff = _to_epoch() - days * 86400
+            archived = self._archived_energy_stats(cutoff)
+            
+            # Archived rows a partial cleanup left in SQLite are counted from
+            # the archive only
+            live_cutoff = max(cutoff, self._archived_before() - 1) if archived else cutoff
+            
+            # Aggregate the analysis period inside SQLite
+            stats = self._fetch_dicts(_SQL_ENERGY_STATS, (live_cutoff,))[0]
+            for column, key in (('solar_generation', 'best_generation_day'),
+                                ('surplus_deficit', 'highest_surplus_day')):
+                peak = self._fetch_dicts(_SQL_ENERGY_PEAK.format(column=column), (live_cutoff,))
+                stats[key] = peak[0]['peak_timestamp'] if peak else None
+            
+            if archived:
+                stats = _merge_energy_stats(stats, archived)
             
-            df = pd.read_sql_query(query, conn)
-            conn.close()
+            # agg_hourly also covers archived rows; the bucket holding the
+            # cutoff straddles it, so that hour is summed from raw rows
+            first_bucket = (cutoff // 3600 + 1) * 3600
+            stats.update(self._fetch_dicts(_SQL_HOURLY_TOTALS, (first_bucket, cutoff, first_bucket))[0])
             
-            if df.empty:
+            if not stats['total_records']:
                 return {'status': 'no_data', 'message': 'No data available for analysis'}
             
-            # Calculate analytics
+            def average(column):
+                count = stats[f'count_{column}']
+                return stats[f'sum_{column}'] / count if count else None
+            
+            def iso(epoch):
+                return datetime.fromtimestamp(epoch).isoformat() if epoch is not None else None
+            
             analytics = {
                 'period_days': days,
-                'total_records': len(df),
+                'total_records': stats['total_records'],
                 'energy_stats': {
-                    'avg_solar_generation': df['solar_generation'].mean(),
-                    'max_solar_generation': df['solar_generation'].max(),
-                    'avg_consumption': df['consumption'].mean(),
-                    'max_consumption': df['consumption'].max(),
-                    'avg_surplus_deficit': df['surplus_deficit'].mean(),
-                    'total_surplus': df[df['surplus_deficit'] > 0]['surplus_deficit'].sum(),
-                    'total_deficit': df[df['surplus_deficit'] < 0]['surplus_deficit'].sum()
+                    'avg_solar_generation': average('solar_generation'),
+                    'max_solar_generation': stats['max_solar_generation'],
+                    'avg_consumption': average('consumption'),
+                    'max_consumption': stats['max_consumption'],
+                    'avg_surplus_deficit': average('surplus_deficit'),
+                    'total_surplus': stats['total_surplus'],
+                    'total_deficit': stats['total_deficit']
                 },
                 'weather_impact': {
-                    'avg_temperature': df['temperature'].mean(),
-                    'avg_cloud_coverage': df['cloud_percentage'].mean(),
-                    'avg_sunlight_hours': df['sunlight_hours'].mean(),
-                    'clear_days': len(df[df['cloud_percentage'] < 30]),
-                    'cloudy_days': len(df[df['cloud_percentage'] > 70])
+                    'avg_temperature': average('temperature'),
+                    'avg_cloud_coverage': average('cloud_percentage'),
+                    'avg_sunlight_hours': average('sunlight_hours'),
+                    'clear_days': stats['clear_days'],
+                    'cloudy_days': stats['cloudy_days']
                 },
                 'ai_decisions': {
-                    'sell_recommendations': len(df[df['ai_decision'] == 'SELL']),
-                    'buy_recommendations': len(df[df['ai_decision'] == 'BUY']),
-                    'hold_recommendations': len(df[df['ai_decision'] == 'HOLD']),
-                    'avg_confidence': df['confidence'].mean()
+                    'sell_recommendations': stats['sell_recommendations'],
+                    'buy_recommendations': stats['buy_recommendations'],
+                    'hold_recommendations': stats['hold_recommendations'],
+                    'avg_confidence': average('confidence')
                 },
                 'peak_performance': {
-                    'best_generation_day': df.loc[df['solar_generation'].idxmax()]['timestamp'],
-                    'best_generation_value': df['solar_generation'].max(),
-                    'highest_surplus_day': df.loc[df['surplus_deficit'].idxmax()]['timestamp'],
-                    'highest_surplus_value': df['surplus_deficit'].max()
+                    'best_generation_day': iso(stats['best_generation_day']),
+                    'best_generation_value': stats['max_solar_generation'],
+                    'highest_surplus_day': iso(stats['highest_surplus_day']),
+                    'highest_surplus_value': stats['max_surplus_deficit']
                 },
                 'timestamp': datetime.now().isoformat()
             }
@@ -372,53 +1068,114 @@ class EnergyTradingDatabase:
             logger.error(f"Error calculating energy analytics: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def store_system_log(self, level: str, component: str, message: str, details: Dict[str, Any] = None):
-        """Store system log entry"""
+    def _archived_energy_stats(self, cutoff: int) -> Optional[Dict[str, Any]]:
+        """Aggregate archived Parquet energy rows newer than cutoff, if any"""
+        if not PYARROW_AVAILABLE or not os.path.isdir(self.archive_path):
+            return None
+        
+        import pyarrow.dataset as ds
+        
+        dataset = ds.dataset(self.archive_path, format='parquet', partitioning='hive')
+        # Row-group statistics let the scan skip files entirely older than cutoff
+        table = dataset.to_table(filter=ds.field('timestamp') > cutoff)
+        if table.num_rows == 0:
+            return None
+        return _arrow_energy_stats(table)
+    
+    def _archived_before(self) -> int:
+        """Epoch below which energy rows are already in the Parquet archive"""
+        row = self._conn().execute('SELECT archived_before FROM archive_state WHERE id = 1').fetchone()
+        return row[0] if row else 0
+    
+    def _archive_energy_data(self, cutoff: int) -> int:
+        """Export energy rows older than cutoff to the Parquet archive
+        
+        Only rows past the archived_before high-water mark are exported, so a
+        cleanup interrupted before its deletes finish does not archive the same
+        rows twice. Returns the epoch below which rows may be deleted from SQLite.
+        """
+        if not PYARROW_AVAILABLE:
+            return cutoff
+        
+        archived_before = self._archived_before()
+        if cutoff <= archived_before:
+            return cutoff
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO system_logs (timestamp, level, component, message, details)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                datetime.now().isoformat(),
-                level.upper(),
-                component,
-                message,
-                json.dumps(details) if details else None
-            ))
-            
-            conn.commit()
-            conn.close()
+            import pyarrow.compute as pc
+            import pyarrow.parquet as pq
+            
+            table = self._fetch_arrow('SELECT * FROM energy_data WHERE timestamp >= ? AND timestamp < ?',
+                                      (archived_before, cutoff))
+            if table.num_rows == 0:
+                self._set_archived_before(cutoff)
+                return cutoff
             
+            moments = pc.cast(table['timestamp'], pa.timestamp('s'))
+            table = table.append_column('year', pc.year(moments))
+            table = table.append_column('month', pc.month(moments))
+            pq.write_to_dataset(
+                table,
+                root_path=self.archive_path,
+                partition_cols=['household_id', 'year', 'month'],
+                # Keyed on the archived range: a retry after a failed mark
+                # update overwrites its own files instead of adding copies
+                basename_template=f'energy-{archived_before}-{cutoff}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+                compression='zstd',
+                use_dictionary=True
+            )
+            self._set_archived_before(cutoff)
+            logger.info(f"Archived {table.num_rows} energy records to {self.archive_path}")
+            return cutoff
+        except Exception as e:
+            logger.error(f"Error archiving energy data, keeping unarchived rows in SQLite: {e}")
+            return archived_before
+    
+    def _set_archived_before(self, epoch: int):
+        """Advance the archive high-water mark"""
+        with self._transaction() as conn:
+            conn.execute('''
+                INSERT INTO archive_state (id, archived_before) VALUES (1, ?)
+                ON CONFLICT(id) DO UPDATE SET archived_before = MAX(archived_before, excluded.archived_before)
+            ''', (epoch,))
+    
+    def store_system_log(self, level: str, component: str, message: str, details: Dict[str, Any] = None):
+        """Queue system log entry"""
+        try:
+            self._enqueue(self._pending_logs, self._log_row(level, component, message, details))
         except Exception as e:
             logger.error(f"Error storing system log: {e}")
     
+    def store_system_logs_many(self, entries: Iterable[Dict[str, Any]]):
+        """Store many log entries (dicts of store_system_log arguments) in one transaction"""
+        try:
+            rows = [
+                self._log_row(entry['level'], entry['component'], entry['message'],
+                              entry.get('details'))
+                for entry in entries
+            ]
+            with self._transaction() as conn:
+                conn.executemany(_SQL_INSERT_LOG, rows)
+        except Exception as e:
+            logger.error(f"Error storing system log batch: {e}")
+    
     def store_weather_alert(self, alert_type: str, severity: str, message: str, 
                            impact: str = None, expires_hours: int = 24):
         """Store weather alert"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            expires_at = (datetime.now() + timedelta(hours=expires_hours)).isoformat()
-            
-            cursor.execute('''
-                INSERT INTO weather_alerts 
-                (timestamp, alert_type, severity, message, impact_description, expires_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now().isoformat(),
-                alert_type,
-                severity.upper(),
-                message,
-                impact,
-                expires_at
-            ))
-            
-            conn.commit()
-            conn.close()
+            now = _to_epoch()
+            expires_at = now + expires_hours * 3600
+            
+            with self._transaction() as conn:
+                conn.execute(_SQL_INSERT_ALERT, (
+                    now,
+                    alert_type,
+                    severity.upper(),
+                    message,
+                    impact,
+                    expires_at
+                ))
             
         except Exception as e:
             logger.error(f"Error storing weather alert: {e}")
@@ -426,46 +1183,61 @@ class EnergyTradingDatabase:
     def get_active_alerts(self) -> List[Dict[str, Any]]:
         """Get currently active weather alerts"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            
             query = '''
                 SELECT * FROM weather_alerts 
-                WHERE active = 1 AND datetime(expires_at) > datetime('now')
+                WHERE active = 1 AND expires_at > ?
                 ORDER BY severity DESC, timestamp DESC
             '''
             
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            
-            return df.to_dict('records') if not df.empty else []
+            return self._fetch_dicts(query, (_to_epoch(),))
             
         except Exception as e:
             logger.error(f"Error retrieving active alerts: {e}")
             return []
     
+    def _delete_in_chunks(self, chunk_sql: str, cutoff: int) -> int:
+        """Run a LIMITed DELETE until it stops matching, committing after each chunk"""
+        total = 0
+        while True:
+            with self._transaction() as conn:
+                deleted = conn.execute(chunk_sql, (cutoff,)).rowcount
+            total += deleted
+            if deleted < _CLEANUP_CHUNK_SIZE:
+                return total
+    
     def cleanup_old_data(self, days_to_keep: int = 30):
-        """Clean up old data to maintain database performance"""
+        """Archive and clean up old data to maintain database performance"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cutoff_date = _to_epoch() - days_to_keep * 86400
             
-            cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).isoformat()
+            # Energy rows are kept for long-range analytics in the Parquet
+            # archive; only rows it already holds are deleted
+            energy_cutoff = min(self._archive_energy_data(cutoff_date), cutoff_date)
             
             # Clean up old records from each table
-            tables_to_clean = ['energy_data', 'trades', 'system_logs', 'weather_alerts']
+            tables_to_clean = {
+                'energy_data': energy_cutoff,
+                'trades': cutoff_date,
+                'system_logs': cutoff_date,
+                'weather_alerts': cutoff_date,
+            }
             
-            for table in tables_to_clean:
-                cursor.execute(f'''
-                    DELETE FROM {table} 
-                    WHERE datetime(created_at) < datetime(?)
-                ''', (cutoff_date,))
-                
-                deleted_count = cursor.rowcount
+            for table, table_cutoff in tables_to_clean.items():
+                deleted_count = self._delete_in_chunks(f'''
+                    DELETE FROM {table}
+                    WHERE rowid IN (
+                        SELECT rowid FROM {table} WHERE timestamp < ? LIMIT {_CLEANUP_CHUNK_SIZE}
+                    )
+                ''', table_cutoff)
                 if deleted_count > 0:
                     logger.info(f"Cleaned up {deleted_count} old records from {table}")
             
-            conn.commit()
-            conn.close()
+            # Without an archive the rollup would outlive its rows; drop whole
+            # hours that are now gone
+            if not PYARROW_AVAILABLE:
+                with self._transaction() as conn:
+                    conn.execute('DELETE FROM agg_hourly WHERE hour_bucket + 3600 <= ?',
+                                 (cutoff_date,))
             
             logger.info(f"Database cleanup completed, kept data from last {days_to_keep} days")
             
@@ -5,10 +5,14 @@ Provides M-Pesa Daraja API integration with STK Push functionality
 
 from .mpesa_daraja import MPesaDarajaAPI, EnergyTradingMPesa
 from .payment_integrator import PaymentIntegrator, get_payment_integrator
+from .payment_store import MemoryPaymentStore, RedisPaymentStore, create_payment_store
 
 __all__ = [
     'MPesaDarajaAPI',
     'EnergyTradingMPesa', 
     'PaymentIntegrator',
-    'get_payment_integrator'
+    'get_payment_integrator',
+    'MemoryPaymentStore',
+    'RedisPaymentStore',
+    'create_payment_store'
 ]
\ No newline at end of file
@@ -4,15 +4,63 @@ Implements STK Push for secure payment processing in the energy trading ecosyste
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import re
 import base64
 import time
+import threading
+import asyncio
+import functools
 from datetime import datetime
-from typing import Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 import logging
 
+from .payment_store import create_payment_store
+
+# Non-blocking HTTP for the async client methods - they run the sync methods in a thread if not available
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Fast JSON for request bodies and responses - falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Kenyan mobile number as 0XXXXXXXXX, 254XXXXXXXXX, +254XXXXXXXXX or the bare 9 digits
+_PHONE_RE = re.compile(r'^(?:\+?254|0)?(\d{9})$')
+
+
+def _dumps(data: Dict) -> bytes:
+    """Serialize a request body to JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def _loads(data: Union[bytes, bytearray, memoryview]) -> Dict:
+    """Parse a JSON response or callback body"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def normalize_phone(phone_number: str) -> Optional[str]:
+    """Phone number in the 254XXXXXXXXX format M-Pesa expects, or None if it is not valid"""
+    match = _PHONE_RE.match(phone_number)
+    return '254' + match.group(1) if match else None
+
+
 class MPesaDarajaAPI:
     """
     M-Pesa Daraja API client with STK Push integration
@@ -44,6 +92,8 @@ class MPesaDarajaAPI:
         self.stk_query_url = f'{self.base_url}/mpesa/stkpushquery/v1/query'
         
         # Sandbox test credentials (for testing only)
+        self.business_shortcode: Optional[str]
+        self.lipa_na_mpesa_online_passkey: Optional[str]
         if environment == 'sandbox':
             self.business_shortcode = '174379'  # Sandbox shortcode
             self.lipa_na_mpesa_online_passkey = 'bfb279f9aa9bdbcf158e97dd71a467cd2e0c893059b10f78e6b72ada1ed2c919'
@@ -52,68 +102,217 @@ class MPesaDarajaAPI:
             # Production values (to be configured)
             self.business_shortcode = None  # Your production shortcode
             self.lipa_na_mpesa_online_passkey = None  # Your production passkey
-            
-        self.access_token = None
-        self.token_expiry = None
+        
+        # Only the timestamp part of the STK password changes between requests
+        self._password_prefix: Optional[bytes]
+        if self.business_shortcode and self.lipa_na_mpesa_online_passkey:
+            self._password_prefix = (self.business_shortcode + self.lipa_na_mpesa_online_passkey).encode('ascii')
+        else:
+            self._password_prefix = None
+        
+        # Last formatted request timestamp as (epoch second, YYYYMMDDHHMMSS)
+        self._ts_cache = (0, '')
+        
+        # Fixed parts of the STK Push and query bodies; each request copies and fills in the rest
+        self._stk_template: Dict[str, Any] = {
+            'BusinessShortCode': self.business_shortcode,
+            'TransactionType': 'CustomerPayBillOnline',
+            'PartyB': self.business_shortcode
+        }
+        self._stk_query_template: Dict[str, Any] = {'BusinessShortCode': self.business_shortcode}
+            
+        self.access_token: Optional[str] = None
+        self.token_expiry: Optional[float] = None
+        self._token_lock = threading.Lock()
+        # Per event loop, like the aiohttp sessions below
+        self._token_async_locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+        # (token, request headers built for it)
+        self._bearer: Tuple[Optional[str], Optional[Dict[str, str]]] = (None, None)
+        
+        # Basic auth for token requests - the credentials are fixed for the client's lifetime
+        auth_b64 = base64.b64encode(f'{consumer_key}:{consumer_secret}'.encode('ascii')).decode('ascii')
+        self._basic_auth_headers = {
+            'Authorization': f'Basic {auth_b64}',
+            'Content-Type': 'application/json'
+        }
+        
+        # Pooled keep-alive connections for the sync methods. Retries cover connection errors
+        # and, for the token GET only, 5xx responses - urllib3 never re-sends a POST on status
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50,
+                              max_retries=Retry(total=3, backoff_factor=0.3,
+                                                status_forcelist=[500, 502, 503, 504]))
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        
+        # aiohttp sessions for the async methods, one per event loop: a session only works in the
+        # loop it was created in, and callers using asyncio.run() get a new loop for every call
+        self._sessions: Dict[asyncio.AbstractEventLoop, 'aiohttp.ClientSession'] = {}
         
         logger.info(f"M-Pesa Daraja API initialized for {environment} environment")
     
+    def close(self):
+        """Close pooled HTTP connections used by the sync methods"""
+        self._http.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    async def _get_session(self) -> 'aiohttp.ClientSession':
+        """aiohttp session with a pooled connector for the running event loop"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            self._forget_closed_loops()
+            connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75)
+            session = self._sessions[loop] = aiohttp.ClientSession(connector=connector,
+                                                                   timeout=aiohttp.ClientTimeout(total=10))
+        return session
+    
+    def _forget_closed_loops(self):
+        """Drop sessions and locks left behind by event loops that have since closed"""
+        for per_loop in (self._sessions, self._token_async_locks):
+            for loop in [loop for loop in list(per_loop) if loop.is_closed()]:
+                per_loop.pop(loop, None)
+    
+    async def aclose(self):
+        """Close the aiohttp session the async methods use in the running event loop"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+    
+    async def _run_sync(self, func, *args, **kwargs):
+        """Run a blocking client method in the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
     def _get_access_token(self) -> Optional[str]:
         """
         Get access token from M-Pesa API
         Tokens are valid for 1 hour, so we cache and reuse them
         """
         # Check if we have a valid token
-        if self.access_token and self.token_expiry and time.time() < self.token_expiry:
-            return self.access_token
-            
-        try:
-            # Create basic auth string
-            auth_string = f'{self.consumer_key}:{self.consumer_secret}'
-            auth_bytes = auth_string.encode('ascii')
-            auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
-            
+        token = self._cached_token()
+        if token:
+            return token
+        
+        # One caller refreshes; concurrent callers wait for it and reuse its token
+        with self._token_lock:
+            token = self._cached_token()
+            if token:
+                return token
+            
+            try:
+                response = self._http.get(self.auth_url, headers=self._basic_auth_headers)
+                response.raise_for_status()
+                
+                return self._store_token(_loads(response.content))
+                
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to get M-Pesa access token: {e}")
+                return None
+            except (KeyError, ValueError) as e:
+                logger.error(f"Invalid token response format: {e}")
+                return None
+    
+    async def _get_access_token_async(self) -> Optional[str]:
+        """Async version of _get_access_token, sharing the cached token"""
+        token = self._cached_token()
+        if token:
+            return token
+        
+        if not AIOHTTP_AVAILABLE:
+            return await self._run_sync(self._get_access_token)
+        
+        token_lock = self._token_async_locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+        
+        async with token_lock:
+            token = self._cached_token()
+            if token:
+                return token
+            
+            try:
+                session = await self._get_session()
+                async with session.get(self.auth_url, headers=self._basic_auth_headers) as response:
+                    response.raise_for_status()
+                    token_data = _loads(await response.read())
+                
+                return self._store_token(token_data)
+                
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Failed to get M-Pesa access token: {e}")
+                return None
+            except (KeyError, ValueError) as e:
+                logger.error(f"Invalid token response format: {e}")
+                return None
+    
+    def _cached_token(self) -> Optional[str]:
+        """The cached access token, if it has not expired"""
+        token, expiry = self.access_token, self.token_expiry
+        if token and expiry and time.time() < expiry:
+            return token
+        return None
+    
+    def _bearer_headers(self, token: str) -> Dict[str, str]:
+        """Request headers for an access token, rebuilt only when the token changes"""
+        cached_token, headers = self._bearer
+        if headers is None or token != cached_token:
             headers = {
-                'Authorization': f'Basic {auth_b64}',
+                'Authorization': f'Bearer {token}',
                 'Content-Type': 'application/json'
             }
-            
-            response = requests.get(self.auth_url, headers=headers)
-            response.raise_for_status()
-            
-            token_data = response.json()
-            self.access_token = token_data['access_token']
-            # Set expiry time (tokens last 1 hour, we refresh 5 minutes early)
-            self.token_expiry = time.time() + (int(token_data['expires_in']) - 300)
-            
-            logger.info("Successfully obtained M-Pesa access token")
-            return self.access_token
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to get M-Pesa access token: {e}")
-            return None
-        except KeyError as e:
-            logger.error(f"Invalid token response format: {e}")
-            return None
+            self._bearer = (token, headers)
+        return headers
+    
+    def _store_token(self, token_data: Dict) -> str:
+        """Cache an access token from the OAuth response"""
+        token: str = token_data['access_token']
+        self.access_token = token
+        # Set expiry time (tokens last 1 hour, we refresh 5 minutes early)
+        self.token_expiry = time.time() + (int(token_data['expires_in']) - 300)
+        
+        logger.info("Successfully obtained M-Pesa access token")
+        return token
+    
+    def _timestamp(self) -> str:
+        """Request timestamp (YYYYMMDDHHMMSS), formatted once per wall-clock second"""
+        now = int(time.time())
+        cached_at, formatted = self._ts_cache
+        if now == cached_at:
+            return formatted
+        formatted = time.strftime('%Y%m%d%H%M%S', time.localtime(now))
+        self._ts_cache = (now, formatted)
+        return formatted
     
-    def _generate_password(self, shortcode: str, passkey: str, timestamp: str) -> str:
+    def _generate_password(self, timestamp: str) -> str:
         """Generate the password for STK push"""
-        password_str = f'{shortcode}{passkey}{timestamp}'
-        password_bytes = password_str.encode('ascii')
-        return base64.b64encode(password_bytes).decode('ascii')
+        prefix = self._password_prefix
+        if prefix is None:
+            # Shortcode/passkey not known at init (production) - build from the current values
+            prefix = f'{self.business_shortcode}{self.lipa_na_mpesa_online_passkey}'.encode('ascii')
+        return base64.b64encode(prefix + timestamp.encode('ascii')).decode('ascii')
     
     def initiate_stk_push(self, 
                          phone_number: str, 
-                         amount: float, 
+                         amount: int, 
                          account_reference: str,
                          transaction_desc: str = "Energy Trading Payment",
-                         callback_url: str = None) -> Dict:
+                         callback_url: Optional[str] = None) -> Dict:
         """
         Initiate STK Push payment
         
         Args:
             phone_number: Customer phone number (254XXXXXXXXX format)
-            amount: Amount to be paid (minimum 1 KES)
+            amount: Whole KES amount to be paid (minimum 1 KES)
             account_reference: Reference for the payment (e.g., trade ID)
             transaction_desc: Description of the transaction
             callback_url: URL to receive payment confirmation
@@ -122,6 +321,11 @@ class MPesaDarajaAPI:
             Dict containing STK push response
         """
         try:
+            # Format phone number (ensure it is 254XXXXXXXXX)
+            msisdn = normalize_phone(phone_number)
+            if not msisdn:
+                return self._invalid_phone_result(phone_number)
+            
             # Get access token
             token = self._get_access_token()
             if not token:
@@ -131,77 +335,77 @@ class MPesaDarajaAPI:
                     'error_code': 'TOKEN_ERROR'
                 }
             
-            # Format phone number (ensure it starts with 254)
-            if phone_number.startswith('0'):
-                phone_number = '254' + phone_number[1:]
-            elif phone_number.startswith('+254'):
-                phone_number = phone_number[1:]
-            elif not phone_number.startswith('254'):
-                phone_number = '254' + phone_number
-            
-            # Generate timestamp and password
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            password = self._generate_password(
-                self.business_shortcode,
-                self.lipa_na_mpesa_online_passkey,
-                timestamp
-            )
-            
-            # Default callback URL if not provided
-            if not callback_url:
-                callback_url = 'https://mydomain.com/path'  # You'll need to update this
-            
-            # STK Push payload
-            payload = {
-                'BusinessShortCode': self.business_shortcode,
-                'Password': password,
-                'Timestamp': timestamp,
-                'TransactionType': 'CustomerPayBillOnline',
-                'Amount': int(amount),  # M-Pesa expects integer amount
-                'PartyA': phone_number,
-                'PartyB': self.business_shortcode,
-                'PhoneNumber': phone_number,
-                'CallBackURL': callback_url,
-                'AccountReference': account_reference,
-                'TransactionDesc': transaction_desc
-            }
+            payload = self._stk_push_payload(msisdn, amount, account_reference,
+                                             transaction_desc, callback_url)
             
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json'
-            }
+            headers = self._bearer_headers(token)
             
-            logger.info(f"Initiating STK Push for {phone_number}, Amount: {amount} KES")
+            logger.info(f"Initiating STK Push for {payload['PhoneNumber']}, Amount: {amount} KES")
             
-            response = requests.post(self.stk_push_url, json=payload, headers=headers)
+            response = self._http.post(self.stk_push_url, data=_dumps(payload), headers=headers)
             response.raise_for_status()
             
-            stk_response = response.json()
+            return self._stk_push_result(_loads(response.content), payload, amount)
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"STK Push request failed: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'error_code': 'REQUEST_ERROR'
+            }
+        except Exception as e:
+            logger.error(f"STK Push unexpected error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'error_code': 'UNEXPECTED_ERROR'
+            }
+    
+    async def initiate_stk_push_async(self,
+                                      phone_number: str,
+                                      amount: int,
+                                      account_reference: str,
+                                      transaction_desc: str = "Energy Trading Payment",
+                                      callback_url: Optional[str] = None) -> Dict:
+        """
+        Async version of initiate_stk_push for issuing many payments concurrently
+        
+        Returns:
+            Dict containing STK push response
+        """
+        if not AIOHTTP_AVAILABLE:
+            return await self._run_sync(self.initiate_stk_push, phone_number, amount, account_reference,
+                                        transaction_desc, callback_url)
+        
+        try:
+            msisdn = normalize_phone(phone_number)
+            if not msisdn:
+                return self._invalid_phone_result(phone_number)
             
-            if stk_response.get('ResponseCode') == '0':
-                logger.info(f"STK Push initiated successfully: {stk_response.get('CheckoutRequestID')}")
-                return {
-                    'success': True,
-                    'checkout_request_id': stk_response.get('CheckoutRequestID'),
-                    'merchant_request_id': stk_response.get('MerchantRequestID'),
-                    'response_code': stk_response.get('ResponseCode'),
-                    'response_description': stk_response.get('ResponseDescription'),
-                    'customer_message': stk_response.get('CustomerMessage'),
-                    'timestamp': timestamp,
-                    'amount': amount,
-                    'phone_number': phone_number,
-                    'account_reference': account_reference
-                }
-            else:
-                logger.error(f"STK Push failed: {stk_response}")
+            token = await self._get_access_token_async()
+            if not token:
                 return {
                     'success': False,
-                    'error': stk_response.get('ResponseDescription', 'Unknown error'),
-                    'error_code': stk_response.get('ResponseCode', 'UNKNOWN'),
-                    'response': stk_response
+                    'error': 'Failed to get access token',
+                    'error_code': 'TOKEN_ERROR'
                 }
-                
-        except requests.exceptions.RequestException as e:
+            
+            payload = self._stk_push_payload(msisdn, amount, account_reference,
+                                             transaction_desc, callback_url)
+            
+            headers = self._bearer_headers(token)
+            
+            logger.info(f"Initiating STK Push for {payload['PhoneNumber']}, Amount: {amount} KES")
+            
+            session = await self._get_session()
+            async with session.post(self.stk_push_url, data=_dumps(payload), headers=headers) as response:
+                response.raise_for_status()
+                stk_response = _loads(await response.read())
+            
+            return self._stk_push_result(stk_response, payload, amount)
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"STK Push request failed: {e}")
             return {
                 'success': False,
@@ -216,6 +420,65 @@ class MPesaDarajaAPI:
                 'error_code': 'UNEXPECTED_ERROR'
             }
     
+    def _invalid_phone_result(self, phone_number: str) -> Dict:
+        """Result for an STK Push rejected before any request is made"""
+        logger.error(f"STK Push rejected, invalid phone number: {phone_number}")
+        return {
+            'success': False,
+            'error': f'Invalid phone number: {phone_number}',
+            'error_code': 'INVALID_PHONE'
+        }
+    
+    def _stk_push_payload(self, phone_number: str, amount: int, account_reference: str,
+                          transaction_desc: str, callback_url: Optional[str]) -> Dict:
+        """Build the STK Push request body for a normalized 254XXXXXXXXX phone number"""
+        # Generate timestamp and password
+        timestamp = self._timestamp()
+        password = self._generate_password(timestamp)
+        
+        # Default callback URL if not provided
+        if not callback_url:
+            callback_url = 'https://mydomain.com/path'  # You'll need to update this
+        
+        # STK Push payload
+        payload = self._stk_template.copy()
+        payload.update(
+            Password=password,
+            Timestamp=timestamp,
+            Amount=amount,
+            PartyA=phone_number,
+            PhoneNumber=phone_number,
+            CallBackURL=callback_url,
+            AccountReference=account_reference,
+            TransactionDesc=transaction_desc
+        )
+        return payload
+    
+    def _stk_push_result(self, stk_response: Dict, payload: Dict, amount: int) -> Dict:
+        """Translate an STK Push response into the client's result format"""
+        if stk_response.get('ResponseCode') == '0':
+            logger.info(f"STK Push initiated successfully: {stk_response.get('CheckoutRequestID')}")
+            return {
+                'success': True,
+                'checkout_request_id': stk_response.get('CheckoutRequestID'),
+                'merchant_request_id': stk_response.get('MerchantRequestID'),
+                'response_code': stk_response.get('ResponseCode'),
+                'response_description': stk_response.get('ResponseDescription'),
+                'customer_message': stk_response.get('CustomerMessage'),
+                'timestamp': payload['Timestamp'],
+                'amount': amount,
+                'phone_number': payload['PhoneNumber'],
+                'account_reference': payload['AccountReference']
+            }
+        else:
+            logger.error(f"STK Push failed: {stk_response}")
+            return {
+                'success': False,
+                'error': stk_response.get('ResponseDescription', 'Unknown error'),
+                'error_code': stk_response.get('ResponseCode', 'UNKNOWN'),
+                'response': stk_response
+            }
+    
     def query_stk_status(self, checkout_request_id: str) -> Dict:
         """
         Query STK Push payment status
@@ -235,44 +498,61 @@ class MPesaDarajaAPI:
                     'error_code': 'TOKEN_ERROR'
                 }
             
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            password = self._generate_password(
-                self.business_shortcode,
-                self.lipa_na_mpesa_online_passkey,
-                timestamp
-            )
-            
-            payload = {
-                'BusinessShortCode': self.business_shortcode,
-                'Password': password,
-                'Timestamp': timestamp,
-                'CheckoutRequestID': checkout_request_id
-            }
+            payload = self._stk_query_payload(checkout_request_id)
             
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json'
-            }
+            headers = self._bearer_headers(token)
             
-            response = requests.post(self.stk_query_url, json=payload, headers=headers)
+            response = self._http.post(self.stk_query_url, data=_dumps(payload), headers=headers)
             response.raise_for_status()
             
-            query_response = response.json()
-            
-            logger.info(f"STK Query response: {query_response}")
+            return self._stk_query_result(_loads(response.content))
             
+        except requests.exceptions.RequestException as e:
+            logger.error(f"STK Query request failed: {e}")
             return {
-                'success': True,
-                'response_code': query_response.get('ResponseCode'),
-                'response_description': query_response.get('ResponseDescription'),
-                'merchant_request_id': query_response.get('MerchantRequestID'),
-                'checkout_request_id': query_response.get('CheckoutRequestID'),
-                'result_code': query_response.get('ResultCode'),
-                'result_desc': query_response.get('ResultDesc'),
-                'raw_response': query_response
+                'success': False,
+                'error': str(e),
+                'error_code': 'REQUEST_ERROR'
             }
+        except Exception as e:
+            logger.error(f"STK Query unexpected error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'error_code': 'UNEXPECTED_ERROR'
+            }
+    
+    async def query_stk_status_async(self, checkout_request_id: str) -> Dict:
+        """
+        Async version of query_stk_status
+        
+        Returns:
+            Dict containing payment status
+        """
+        if not AIOHTTP_AVAILABLE:
+            return await self._run_sync(self.query_stk_status, checkout_request_id)
+        
+        try:
+            token = await self._get_access_token_async()
+            if not token:
+                return {
+                    'success': False,
+                    'error': 'Failed to get access token',
+                    'error_code': 'TOKEN_ERROR'
+                }
             
-        except requests.exceptions.RequestException as e:
+            payload = self._stk_query_payload(checkout_request_id)
+            
+            headers = self._bearer_headers(token)
+            
+            session = await self._get_session()
+            async with session.post(self.stk_query_url, data=_dumps(payload), headers=headers) as response:
+                response.raise_for_status()
+                query_response = _loads(await response.read())
+            
+            return self._stk_query_result(query_response)
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"STK Query request failed: {e}")
             return {
                 'success': False,
@@ -287,17 +567,44 @@ class MPesaDarajaAPI:
                 'error_code': 'UNEXPECTED_ERROR'
             }
     
-    def process_callback(self, callback_data: Dict) -> Dict:
+    def _stk_query_payload(self, checkout_request_id: str) -> Dict:
+        """Build the STK Push query request body"""
+        timestamp = self._timestamp()
+        password = self._generate_password(timestamp)
+        
+        payload = self._stk_query_template.copy()
+        payload.update(Password=password, Timestamp=timestamp, CheckoutRequestID=checkout_request_id)
+        return payload
+    
+    def _stk_query_result(self, query_response: Dict) -> Dict:
+        """Translate an STK Push query response into the client's result format"""
+        logger.info(f"STK Query response: {query_response}")
+        
+        return {
+            'success': True,
+            'response_code': query_response.get('ResponseCode'),
+            'response_description': query_response.get('ResponseDescription'),
+            'merchant_request_id': query_response.get('MerchantRequestID'),
+            'checkout_request_id': query_response.get('CheckoutRequestID'),
+            'result_code': query_response.get('ResultCode'),
+            'result_desc': query_response.get('ResultDesc'),
+            'raw_response': query_response
+        }
+    
+    def process_callback(self, callback_data: Union[Dict, bytes, bytearray, memoryview]) -> Dict:
         """
         Process M-Pesa payment callback
         
         Args:
-            callback_data: Callback data from M-Pesa
+            callback_data: Callback data from M-Pesa, parsed or as the raw request body
             
         Returns:
             Dict containing processed callback information
         """
         try:
+            if isinstance(callback_data, (bytes, bytearray, memoryview)):
+                callback_data = _loads(callback_data)
+            
             # Extract callback information
             stk_callback = callback_data.get('Body', {}).get('stkCallback', {})
             
@@ -310,12 +617,7 @@ class MPesaDarajaAPI:
             items = callback_metadata.get('Item', [])
             
             # Parse callback metadata
-            metadata = {}
-            for item in items:
-                name = item.get('Name')
-                value = item.get('Value')
-                if name:
-                    metadata[name] = value
+            metadata = {item['Name']: item.get('Value') for item in items if item.get('Name')}
             
             # Determine payment status
             if result_code == 0:
@@ -349,6 +651,9 @@ class MPesaDarajaAPI:
                 'raw_callback': callback_data
             }
 
+# Payment record times are kept as epoch seconds and only formatted on the way out
+_PAYMENT_TIME_FIELDS = ('initiated_at', 'completed_at', 'failed_at')
+
 # Energy Trading specific M-Pesa integration
 class EnergyTradingMPesa(MPesaDarajaAPI):
     """
@@ -356,10 +661,11 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
     Handles energy token payments and blockchain integration
     """
     
-    def __init__(self, consumer_key: str, consumer_secret: str, environment: str = 'sandbox'):
+    def __init__(self, consumer_key: str, consumer_secret: str, environment: str = 'sandbox',
+                 store=None):
         super().__init__(consumer_key, consumer_secret, environment)
-        self.pending_payments = {}  # Track pending payments
-        self.completed_payments = {}  # Track completed payments
+        # Pending/completed payment records (in-memory, or Redis when REDIS_URL is set)
+        self.store = store or create_payment_store()
     
     def initiate_energy_payment(self, 
                               trade_id: str,
@@ -367,7 +673,8 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
                               seller_phone: str,
                               amount_kwh: float,
                               price_per_kwh: float,
-                              callback_url: str = None) -> Dict:
+                              callback_url: Optional[str] = None,
+                              total_amount: Optional[int] = None) -> Dict:
         """
         Initiate payment for energy trading
         
@@ -378,40 +685,92 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
             amount_kwh: Amount of energy in kWh
             price_per_kwh: Price per kWh in KES
             callback_url: URL for payment confirmation
+            total_amount: Whole KES amount, if already validated by the caller
             
         Returns:
             Dict containing payment initiation result
         """
-        total_amount = amount_kwh * price_per_kwh
-        
-        # Create account reference for energy trading
-        account_ref = f"ENERGY_{trade_id}"
-        
-        # Create transaction description
-        transaction_desc = f"Energy purchase: {amount_kwh} kWh at {price_per_kwh} KES/kWh"
+        if total_amount is None:
+            total_amount = int(round(amount_kwh * price_per_kwh))
         
         # Initiate STK push
         stk_result = self.initiate_stk_push(
             phone_number=buyer_phone,
             amount=total_amount,
-            account_reference=account_ref,
-            transaction_desc=transaction_desc,
+            account_reference=f"ENERGY_{trade_id}",
+            transaction_desc=f"Energy purchase: {amount_kwh} kWh at {price_per_kwh} KES/kWh",
             callback_url=callback_url
         )
         
+        return self._record_energy_payment(stk_result, trade_id, buyer_phone, seller_phone,
+                                           amount_kwh, price_per_kwh, total_amount)
+    
+    async def initiate_energy_payment_async(self,
+                                            trade_id: str,
+                                            buyer_phone: str,
+                                            seller_phone: str,
+                                            amount_kwh: float,
+                                            price_per_kwh: float,
+                                            callback_url: Optional[str] = None,
+                                            total_amount: Optional[int] = None) -> Dict:
+        """
+        Async version of initiate_energy_payment, so many trades can be issued
+        together with asyncio.gather
+        
+        Returns:
+            Dict containing payment initiation result
+        """
+        if total_amount is None:
+            total_amount = int(round(amount_kwh * price_per_kwh))
+        
+        stk_result = await self.initiate_stk_push_async(
+            phone_number=buyer_phone,
+            amount=total_amount,
+            account_reference=f"ENERGY_{trade_id}",
+            transaction_desc=f"Energy purchase: {amount_kwh} kWh at {price_per_kwh} KES/kWh",
+            callback_url=callback_url
+        )
+        
+        return self._record_energy_payment(stk_result, trade_id, buyer_phone, seller_phone,
+                                           amount_kwh, price_per_kwh, total_amount)
+    
+    async def initiate_energy_payments_batch(self, trades: List[Dict], concurrency: int = 20) -> List:
+        """
+        Initiate payments for several energy trades concurrently
+        
+        Args:
+            trades: Keyword arguments for initiate_energy_payment_async, one dict per trade
+            concurrency: Maximum number of STK pushes in flight at once
+            
+        Returns:
+            Results in trade order; a trade whose call raised has the exception in its place
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(trade: Dict) -> Dict:
+            async with semaphore:
+                return await self.initiate_energy_payment_async(**trade)
+        
+        return await asyncio.gather(*[run(trade) for trade in trades], return_exceptions=True)
+    
+    def _record_energy_payment(self, stk_result: Dict, trade_id: str, buyer_phone: str,
+                               seller_phone: str, amount_kwh: float, price_per_kwh: float,
+                               total_amount: int) -> Dict:
+        """Track an initiated energy payment as pending and add the trade details to the result"""
         if stk_result.get('success'):
             # Store payment details
             checkout_request_id = stk_result.get('checkout_request_id')
-            self.pending_payments[checkout_request_id] = {
+            payment = {
                 'trade_id': trade_id,
                 'buyer_phone': buyer_phone,
                 'seller_phone': seller_phone,
                 'amount_kwh': amount_kwh,
                 'price_per_kwh': price_per_kwh,
                 'total_amount': total_amount,
-                'initiated_at': datetime.now().isoformat(),
+                'initiated_at': time.time(),
                 'status': 'pending'
             }
+            self.store.add_pending(checkout_request_id, payment)
             
             logger.info(f"Energy payment initiated for trade {trade_id}: {total_amount} KES")
             
@@ -425,12 +784,12 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
         
         return stk_result
     
-    def complete_energy_payment(self, callback_data: Dict) -> Dict:
+    def complete_energy_payment(self, callback_data: Union[Dict, bytes, bytearray, memoryview]) -> Dict:
         """
         Complete energy payment processing after M-Pesa confirmation
         
         Args:
-            callback_data: M-Pesa callback data
+            callback_data: M-Pesa callback data, parsed or as the raw request body
             
         Returns:
             Dict containing completion result
@@ -440,23 +799,24 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
         if callback_result.get('success'):
             checkout_request_id = callback_result.get('checkout_request_id')
             
-            # Get pending payment details
-            pending_payment = self.pending_payments.get(checkout_request_id)
+            # Get pending payment details - a successful payment takes its pending record with it
+            if callback_result.get('payment_status') == 'completed':
+                pending_payment = self.store.pop_pending(checkout_request_id)
+            else:
+                pending_payment = self.store.get_pending(checkout_request_id)
             
             if pending_payment:
                 # Update payment status
                 if callback_result.get('payment_status') == 'completed':
                     # Move to completed payments
-                    self.completed_payments[checkout_request_id] = {
+                    completed = {
                         **pending_payment,
                         'status': 'completed',
-                        'completed_at': datetime.now().isoformat(),
+                        'completed_at': time.time(),
                         'mpesa_receipt': callback_result.get('receipt_number'),
                         'mpesa_transaction_date': callback_result.get('transaction_date')
                     }
-                    
-                    # Remove from pending
-                    del self.pending_payments[checkout_request_id]
+                    self.store.complete(checkout_request_id, completed)
                     
                     logger.info(f"Energy payment completed for trade {pending_payment['trade_id']}")
                     
@@ -476,8 +836,9 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
                 else:
                     # Payment failed
                     pending_payment['status'] = 'failed'
-                    pending_payment['failed_at'] = datetime.now().isoformat()
+                    pending_payment['failed_at'] = time.time()
                     pending_payment['failure_reason'] = callback_result.get('result_desc')
+                    self.store.save_pending(checkout_request_id, pending_payment)
                     
                     logger.warning(f"Energy payment failed for trade {pending_payment['trade_id']}: {callback_result.get('result_desc')}")
                     
@@ -507,14 +868,14 @@ class EnergyTradingMPesa(MPesaDarajaAPI):
         Returns:
             Payment status information
         """
-        # Check completed payments
-        for payment in self.completed_payments.values():
-            if payment['trade_id'] == trade_id:
-                return payment
-        
-        # Check pending payments
-        for payment in self.pending_payments.values():
-            if payment['trade_id'] == trade_id:
-                return payment
-        
-        return None
\ No newline at end of file
+        payment = self.store.get_by_trade(trade_id)
+        return self.to_dict(payment) if payment else None
+    
+    @staticmethod
+    def to_dict(payment: Dict) -> Dict:
+        """Copy of a payment record for callers, with its epoch *_at times as ISO strings"""
+        record = dict(payment)
+        for key in _PAYMENT_TIME_FIELDS:
+            if key in record:
+                record[key] = datetime.fromtimestamp(record[key]).isoformat()
+        return record
\ No newline at end of file
@@ -3,17 +3,43 @@ Payment Integration Factory for Energy Trading Platform
 Provides unified interface for different payment providers
 """
 
-from typing import Optional, Dict, Any
-from .mpesa_daraja import EnergyTradingMPesa
+from typing import Optional, Dict, Any, Tuple
+from .mpesa_daraja import EnergyTradingMPesa, normalize_phone
+import functools
+import math
 import os
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _validate_energy_payment(buyer_phone: str, amount_kwh: float, price_per_kwh: float) -> Tuple[str, int]:
+    """
+    Check an energy payment's inputs before anything is sent to the provider
+    
+    Returns:
+        Buyer phone in 254XXXXXXXXX format and the total in whole KES
+        
+    Raises:
+        ValueError: If the phone number or the amount is not valid
+    """
+    msisdn = normalize_phone(buyer_phone)
+    if not msisdn:
+        raise ValueError(f"Invalid phone number: {buyer_phone}")
+    
+    total = amount_kwh * price_per_kwh
+    if not math.isfinite(total) or round(total) < 1:
+        raise ValueError(f"Invalid payment amount: {total} KES (minimum 1 KES)")
+    
+    return msisdn, int(round(total))
+
 class PaymentIntegrator:
     """
     Unified payment interface for the energy trading platform
     Supports M-Pesa Daraja API and can be extended for other providers
+    
+    Async servers (e.g. FastAPI handlers) should await the *_async methods;
+    the sync methods are for threaded callers such as the Flask app.
     """
     
     def __init__(self, provider: str = 'mpesa', environment: str = 'sandbox'):
@@ -73,14 +99,48 @@ class PaymentIntegrator:
         Returns:
             Dict containing payment processing result
         """
+        try:
+            buyer_msisdn, total_amount = _validate_energy_payment(buyer_phone, amount_kwh, price_per_kwh)
+        except ValueError as e:
+            logger.error(f"Energy payment rejected for trade {trade_id}: {e}")
+            return {'success': False, 'error': str(e), 'error_code': 'VALIDATION_ERROR'}
+        
         if self.provider == 'mpesa':
             return self.client.initiate_energy_payment(
                 trade_id=trade_id,
-                buyer_phone=buyer_phone,
+                buyer_phone=buyer_msisdn,
+                seller_phone=seller_phone,
+                amount_kwh=amount_kwh,
+                price_per_kwh=price_per_kwh,
+                callback_url=callback_url,
+                total_amount=total_amount
+            )
+        
+        raise NotImplementedError(f"Payment processing not implemented for {self.provider}")
+    
+    async def process_energy_payment_async(self,
+                                           trade_id: str,
+                                           buyer_phone: str,
+                                           seller_phone: str,
+                                           amount_kwh: float,
+                                           price_per_kwh: float,
+                                           callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of process_energy_payment"""
+        try:
+            buyer_msisdn, total_amount = _validate_energy_payment(buyer_phone, amount_kwh, price_per_kwh)
+        except ValueError as e:
+            logger.error(f"Energy payment rejected for trade {trade_id}: {e}")
+            return {'success': False, 'error': str(e), 'error_code': 'VALIDATION_ERROR'}
+        
+        if self.provider == 'mpesa':
+            return await self.client.initiate_energy_payment_async(
+                trade_id=trade_id,
+                buyer_phone=buyer_msisdn,
                 seller_phone=seller_phone,
                 amount_kwh=amount_kwh,
                 price_per_kwh=price_per_kwh,
-                callback_url=callback_url
+                callback_url=callback_url,
+                total_amount=total_amount
             )
         
         raise NotImplementedError(f"Payment processing not implemented for {self.provider}")
@@ -100,6 +160,10 @@ class PaymentIntegrator:
         
         raise NotImplementedError(f"Payment confirmation not implemented for {self.provider}")
     
+    async def confirm_payment_async(self, callback_data: Dict) -> Dict[str, Any]:
+        """Async version of confirm_payment (callback handling does no network I/O)"""
+        return self.confirm_payment(callback_data)
+    
     def get_payment_status(self, trade_id: str) -> Optional[Dict]:
         """
         Get payment status for a trade
@@ -129,9 +193,20 @@ class PaymentIntegrator:
             return self.client.query_stk_status(transaction_ref)
         
         raise NotImplementedError(f"Transaction query not implemented for {self.provider}")
+    
+    async def query_transaction_status_async(self, transaction_ref: str) -> Dict[str, Any]:
+        """Async version of query_transaction_status"""
+        if self.provider == 'mpesa':
+            return await self.client.query_stk_status_async(transaction_ref)
+        
+        raise NotImplementedError(f"Transaction query not implemented for {self.provider}")
 
-# Global payment integrator instance
-payment_integrator = None
+# One payment integrator per (provider, environment), created on first request
+_integrator_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=8)
+def _cached_integrator(provider: str, environment: str) -> PaymentIntegrator:
+    return PaymentIntegrator(provider=provider, environment=environment)
 
 def get_payment_integrator(provider: str = 'mpesa', environment: str = 'sandbox') -> PaymentIntegrator:
     """
@@ -144,9 +219,6 @@ def get_payment_integrator(provider: str = 'mpesa', environment: str = 'sandbox'
     Returns:
         PaymentIntegrator instance
     """
-    global payment_integrator
-    
-    if payment_integrator is None:
-        payment_integrator = PaymentIntegrator(provider=provider, environment=environment)
-    
-    return payment_integrator
\ No newline at end of file
+    # lru_cache alone may run the factory twice for concurrent first calls
+    with _integrator_lock:
+        return _cached_integrator(provider, environment)
\ No newline at end of file
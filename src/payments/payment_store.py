@@ -0,0 +1,166 @@
+"""
+Payment record storage for the Energy Trading Platform
+Keeps pending/completed M-Pesa payments in process memory, or in Redis so
+that every API worker sees the same payments
+"""
+
+import json
+import threading
+import logging
+from typing import Dict, Optional
+
+from config.settings import settings
+
+# Time-bounded in-memory bookkeeping - plain (unbounded) dicts if not available
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
+# Shared payment store for multi-worker deployments - in-memory store if not available
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Fast JSON for stored records - falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Payment record retention: STK pushes expire within minutes, completed payments are kept a day
+PENDING_TTL = 15 * 60
+PENDING_MAX = 10_000
+COMPLETED_TTL = 24 * 3600
+COMPLETED_MAX = 100_000
+
+
+class MemoryPaymentStore:
+    """
+    Payment records in this process's memory
+    Bounded by TTL caches when cachetools is installed
+    """
+
+    def __init__(self):
+        if CACHETOOLS_AVAILABLE:
+            self.pending = TTLCache(maxsize=PENDING_MAX, ttl=PENDING_TTL)
+            self.completed = TTLCache(maxsize=COMPLETED_MAX, ttl=COMPLETED_TTL)
+            self.trades = TTLCache(maxsize=COMPLETED_MAX, ttl=COMPLETED_TTL)  # trade_id -> checkout_request_id
+        else:
+            self.pending = {}
+            self.completed = {}
+            self.trades: Dict[str, str] = {}
+        # TTLCache is not thread-safe; guards all three maps
+        self._lock = threading.Lock()
+
+    def add_pending(self, checkout_request_id: str, payment: Dict):
+        """Store a newly initiated payment and index it by its trade id"""
+        with self._lock:
+            self.pending[checkout_request_id] = payment
+            self.trades[payment['trade_id']] = checkout_request_id
+
+    def get_pending(self, checkout_request_id: str) -> Optional[Dict]:
+        """Pending payment for a checkout request, if any"""
+        with self._lock:
+            return self.pending.get(checkout_request_id)
+
+    def save_pending(self, checkout_request_id: str, payment: Dict):
+        """Write back an updated pending payment"""
+        with self._lock:
+            self.pending[checkout_request_id] = payment
+
+    def pop_pending(self, checkout_request_id: str) -> Optional[Dict]:
+        """Remove and return a pending payment, if any"""
+        with self._lock:
+            return self.pending.pop(checkout_request_id, None)
+
+    def complete(self, checkout_request_id: str, payment: Dict):
+        """Store a completed payment"""
+        with self._lock:
+            self.completed[checkout_request_id] = payment
+
+    def get_by_trade(self, trade_id: str) -> Optional[Dict]:
+        """Latest payment for a trade, completed before pending"""
+        with self._lock:
+            checkout_request_id = self.trades.get(trade_id)
+            if checkout_request_id is None:
+                return None
+            return self.completed.get(checkout_request_id) or self.pending.get(checkout_request_id)
+
+
+class RedisPaymentStore:
+    """
+    Payment records in Redis, shared by every worker process
+    Keys expire on their own, so Redis does the retention
+    """
+
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _dumps(payment: Dict) -> bytes:
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(payment)
+        return json.dumps(payment).encode()
+
+    @staticmethod
+    def _loads(raw: Optional[bytes]) -> Optional[Dict]:
+        if raw is None:
+            return None
+        if ORJSON_AVAILABLE:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+    def add_pending(self, checkout_request_id: str, payment: Dict):
+        """Store a newly initiated payment and index it by its trade id"""
+        pipe = self._redis.pipeline()
+        pipe.set(f'mpesa:pending:{checkout_request_id}', self._dumps(payment), ex=PENDING_TTL)
+        pipe.set(f"mpesa:trade:{payment['trade_id']}", checkout_request_id, ex=COMPLETED_TTL)
+        pipe.execute()
+
+    def get_pending(self, checkout_request_id: str) -> Optional[Dict]:
+        """Pending payment for a checkout request, if any"""
+        return self._loads(self._redis.get(f'mpesa:pending:{checkout_request_id}'))
+
+    def save_pending(self, checkout_request_id: str, payment: Dict):
+        """Write back an updated pending payment, keeping its remaining TTL"""
+        self._redis.set(f'mpesa:pending:{checkout_request_id}', self._dumps(payment), keepttl=True, xx=True)
+
+    def pop_pending(self, checkout_request_id: str) -> Optional[Dict]:
+        """Remove and return a pending payment, if any"""
+        key = f'mpesa:pending:{checkout_request_id}'
+        pipe = self._redis.pipeline()  # MULTI/EXEC, so only one caller gets the record
+        pipe.get(key)
+        pipe.delete(key)
+        raw, _ = pipe.execute()
+        return self._loads(raw)
+
+    def complete(self, checkout_request_id: str, payment: Dict):
+        """Store a completed payment"""
+        self._redis.set(f'mpesa:completed:{checkout_request_id}', self._dumps(payment), ex=COMPLETED_TTL)
+
+    def get_by_trade(self, trade_id: str) -> Optional[Dict]:
+        """Latest payment for a trade, completed before pending"""
+        checkout_request_id = self._redis.get(f'mpesa:trade:{trade_id}')
+        if checkout_request_id is None:
+            return None
+        checkout_request_id = checkout_request_id.decode()
+        completed, pending = self._redis.mget(f'mpesa:completed:{checkout_request_id}',
+                                              f'mpesa:pending:{checkout_request_id}')
+        return self._loads(completed or pending)
+
+
+def create_payment_store():
+    """Redis-backed store when REDIS_URL is set and redis is installed, in-memory otherwise"""
+    if settings.REDIS_URL:
+        if REDIS_AVAILABLE:
+            logger.info("Using Redis payment store")
+            return RedisPaymentStore(settings.REDIS_URL)
+        logger.warning("REDIS_URL is set but redis is not installed - using in-memory payment store")
+    return MemoryPaymentStore()
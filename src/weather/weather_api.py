@@ -4,16 +4,171 @@ Handles real weather data fetching and forecasting using Open-Meteo API (free, n
 """
 
 import requests
+import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import functools
+import math
+import random
+import threading
 import time
 
 from config.settings import settings
 
+# Size-bounded weather cache - falls back to an unbounded dict if not available
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
+# Non-blocking HTTP for the async methods - they run the sync methods in a thread if not available
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Request rate limiting for the async methods - falls back to fixed spacing between requests
+try:
+    from aiolimiter import AsyncLimiter
+    AIOLIMITER_AVAILABLE = True
+except ImportError:
+    AIOLIMITER_AVAILABLE = False
+
+# Fast JSON decoding of API responses - falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Weather cache shared by every API worker, used when REDIS_URL is set - per-process cache if not available
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Compact binary encoding for the shared weather cache - required alongside redis
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+
+def _loads(data: bytes) -> Any:
+    """Parse a JSON response body"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Open-Meteo variables requested for current conditions and the hourly forecast
+_CURRENT_FIELDS = ','.join([
+    'temperature_2m',
+    'relative_humidity_2m',
+    'apparent_temperature',
+    'weather_code',
+    'surface_pressure',
+    'wind_speed_10m',
+    'wind_direction_10m',
+    'cloud_cover',
+    'visibility',
+    'uv_index'
+])
+_HOURLY_FIELDS = ','.join([
+    'temperature_2m',
+    'relative_humidity_2m',
+    'apparent_temperature',
+    'precipitation',
+    'weather_code',
+    'surface_pressure',
+    'cloud_cover',
+    'visibility',
+    'wind_speed_10m',
+    'wind_direction_10m',
+    'uv_index'
+])
+
+# WMO weather code descriptions
+_WMO_DESCRIPTION = {
+    0: "Clear sky",
+    1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Fog", 48: "Depositing rime fog",
+    51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
+    56: "Light freezing drizzle", 57: "Dense freezing drizzle",
+    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
+    66: "Light freezing rain", 67: "Heavy freezing rain",
+    71: "Slight snow", 73: "Moderate snow", 75: "Heavy snow",
+    77: "Snow grains",
+    80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
+    85: "Slight snow showers", 86: "Heavy snow showers",
+    95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
+}
+
+# Main weather category for every WMO code 0-99, indexed by code
+_WMO_MAIN = tuple(
+    "Clear" if code == 0 else
+    "Clouds" if 1 <= code <= 3 else
+    "Mist" if code in (45, 48) else
+    "Rain" if 51 <= code <= 67 else
+    "Snow" if 71 <= code <= 86 else
+    "Thunderstorm" if code >= 95 else
+    "Unknown"
+    for code in range(100)
+)
+
+# Daily (by hour, peaking at noon) and seasonal (by day of year) temperature cycles for simulated weather
+_DIURNAL_SIN = tuple(math.sin((hour - 6) * math.pi / 12) for hour in range(24))
+_SEASONAL_SIN = tuple(math.sin((day - 80) * 2 * math.pi / 365) for day in range(367))
+
+def _column(values: List[Any], integer: bool = False) -> np.ndarray:
+    """One forecast field as an array; integer fields stay int64 unless they have gaps (NaN)"""
+    if integer and None not in values:
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=float)
+
+def _arrays_to_records(arrays: Dict[str, np.ndarray], data_source: str) -> List[Dict[str, Any]]:
+    """Turn forecast columns back into one dict per hour, for callers of the list API"""
+    columns = {name: (np.datetime_as_string(column, unit='m') if column.dtype.kind == 'M' else column).tolist()
+               for name, column in arrays.items()}
+    return [dict(zip(columns, values), data_source=data_source) for values in zip(*columns.values())]
+
+def _records_to_arrays(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Turn one dict per hour into forecast columns (data_source is dropped)"""
+    arrays = {name: np.array([record[name] for record in records])
+              for name in records[0] if name != 'data_source'}
+    arrays['timestamp'] = arrays['timestamp'].astype('datetime64[m]')
+    return arrays
+
+@functools.lru_cache(maxsize=64)
+def _location(city_name: Optional[str], lat: float, lon: float) -> Dict[str, Any]:
+    """Location block for weather data, shared by every reading for the same place - do not modify"""
+    return {
+        'city': city_name or f"Location ({lat:.2f}, {lon:.2f})",
+        'coordinates': (lat, lon)
+    }
+
+@functools.lru_cache(maxsize=2048)
+def _sun_times(lat_bucket: int, day_of_year: int) -> Tuple[int, int]:
+    """
+    Approximate (sunrise, sunset) hours for a latitude in hundredths of a degree
+    Raises ValueError where the sun does not rise or set (polar day/night)
+    """
+    lat = lat_bucket / 100
+    solar_declination = 23.45 * math.sin(math.radians(360 * (284 + day_of_year) / 365))
+    hour_angle = math.degrees(math.acos(-math.tan(math.radians(lat)) * math.tan(math.radians(solar_declination))))
+    return int(12 - hour_angle / 15), int(12 + hour_angle / 15)
+
 class WeatherService:
     """
     Enhanced weather service using Open-Meteo API (free, no API key required)
@@ -23,30 +178,194 @@ class WeatherService:
         self.base_url = "https://api.open-meteo.com/v1"
         self.geocoding_url = "https://geocoding-api.open-meteo.com/v1"
         self.default_coordinates = settings.DEFAULT_COORDINATES  # Nairobi: (-1.2921, 36.8219)
-        self.last_request_time = 0
-        self.rate_limit_delay = 0.1  # 100ms between requests (Open-Meteo is more generous)
+        # Token bucket: up to 10 requests/second, bursting to 10 (Open-Meteo is more generous)
+        self.rate_limit = 10.0
+        self._tokens = self.rate_limit
+        self._last_refill = time.monotonic()
+        self._rate_lock = threading.Lock()
+        
+        # Circuit breaker: after repeated request failures, skip the API for a while
+        # and go straight to the fallback instead of waiting on timeouts
+        self._failure_count = 0
+        self._circuit_open_until = 0.0
         
-        # Cache for reducing API calls
-        self.weather_cache = {}
+        # Cache for reducing API calls: key -> (data, time.monotonic() when stored)
         self.cache_duration = 600  # 10 minutes cache (longer since it's free)
+        if CACHETOOLS_AVAILABLE:
+            self.weather_cache = TTLCache(maxsize=256, ttl=self.cache_duration)
+        else:
+            self.weather_cache = {}
+        self._cache_lock = threading.Lock()  # TTLCache is not thread-safe
+        # Shared cache in Redis; backs off for a minute when Redis is unreachable
+        self._redis = self._create_redis()
+        self._redis_down_until = 0.0
+        
+        # Pooled keep-alive connections to the Open-Meteo hosts, retrying only 429/5xx responses.
+        # Connect and read failures are not retried: each one counts toward the circuit breaker
+        # straight away instead of holding the request through several timeouts first
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                              max_retries=Retry(total=3, connect=0, read=0, other=0, backoff_factor=0.3,
+                                                status_forcelist=[429, 500, 502, 503, 504]))
+        self.session.mount('https://api.open-meteo.com', adapter)
+        self.session.mount('https://geocoding-api.open-meteo.com', adapter)
+        self.session.headers.update({
+            # gzip/deflate, plus br when a brotli decoder is installed (forecasts compress ~8x)
+            'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING,
+            'User-Agent': 'WattChain/1.0'
+        })
+        
+        # aiohttp sessions for the async methods, one per event loop: a session only works in the
+        # loop it was created in, and callers using asyncio.run() get a new loop for every call
+        self._sessions = {}
+        # Rate limiter for the async methods, created on first use
+        self._async_limiter = None
+    
+    def close(self):
+        """Close pooled HTTP connections used by the sync methods"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    async def _get_session(self) -> 'aiohttp.ClientSession':
+        """aiohttp session with keep-alive connections to the Open-Meteo hosts, for the running event loop"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # Sessions of event loops that have since closed can't be used again
+            for old_loop in [old_loop for old_loop in list(self._sessions) if old_loop.is_closed()]:
+                self._sessions.pop(old_loop, None)
+            connector = aiohttp.TCPConnector(limit_per_host=8, keepalive_timeout=60)
+            session = self._sessions[loop] = aiohttp.ClientSession(connector=connector,
+                                                                   headers={'User-Agent': 'WattChain/1.0'})
+        return session
+    
+    async def aclose(self):
+        """Close the aiohttp session the async methods use in the running event loop"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+    
+    async def _run_sync(self, func, *args, **kwargs):
+        """Run a blocking service method in the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
+    def _take_request_token(self) -> float:
+        """Take a token from the rate limit bucket; returns how long to wait before sending"""
+        with self._rate_lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._last_refill) * self.rate_limit)
+            self._last_refill = now
+            # Tokens may go negative: later callers queue up behind earlier ones
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate_limit)
     
     def _rate_limit(self):
-        """Implement rate limiting for API calls"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+        """Implement rate limiting for API calls, only sleeping when the bucket is empty"""
+        wait = self._take_request_token()
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def _rate_limit_async(self):
+        """Rate limiting for the async API calls, allowing short bursts of up to 10 requests/second"""
+        if AIOLIMITER_AVAILABLE:
+            if self._async_limiter is None:
+                self._async_limiter = AsyncLimiter(max_rate=self.rate_limit, time_period=1.0)
+            await self._async_limiter.acquire()
+            return
+        
+        wait = self._take_request_token()
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def _circuit_open(self) -> bool:
+        """True while API requests are being skipped after repeated failures"""
+        return time.monotonic() < self._circuit_open_until
+    
+    def _record_failure(self):
+        """Count a failed API request, opening the circuit for 60s after 3 in a row"""
+        self._failure_count += 1
+        if self._failure_count >= 3:
+            logger.warning("Open-Meteo unreachable, using fallback weather data for 60s")
+            self._circuit_open_until = time.monotonic() + 60
+            self._failure_count = 0
+    
+    def _record_success(self):
+        """Reset the failure count after a successful API request"""
+        self._failure_count = 0
+    
+    @staticmethod
+    def _create_redis() -> Optional['redis.Redis']:
+        """Redis client for the shared weather cache, or None to cache per process"""
+        if not settings.REDIS_URL:
+            return None
+        if not (REDIS_AVAILABLE and MSGPACK_AVAILABLE):
+            logger.warning("REDIS_URL is set but redis/msgpack is not installed - using per-process weather cache")
+            return None
+        try:
+            return redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.1,
+                                        socket_timeout=0.1, decode_responses=False)
+        except ValueError as e:
+            logger.warning(f"Invalid REDIS_URL ({e}) - using per-process weather cache")
+            return None
+    
+    def _redis_usable(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+    
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"Shared weather cache unavailable: {e}, using per-process cache for 60s")
+        self._redis_down_until = time.monotonic() + 60
+    
+    def _get_cached(self, cache_key: str) -> Optional[Any]:
+        """Cached data for a key, or None if missing or expired"""
+        with self._cache_lock:
+            entry = self.weather_cache.get(cache_key)
+        if entry is not None:
+            data, cached_at = entry
+            if time.monotonic() - cached_at < self.cache_duration:
+                return data
         
-        if time_since_last < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - time_since_last)
+        if not self._redis_usable():
+            return None
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.get(f'weather:{cache_key}')
+            pipe.ttl(f'weather:{cache_key}')
+            raw, ttl = pipe.execute()
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return None
+        if raw is None or ttl <= 0:
+            return None
         
-        self.last_request_time = time.time()
+        # Keep a local copy for the rest of the entry's shared lifetime (tuples come back as lists)
+        data = msgpack.unpackb(raw, raw=False)
+        with self._cache_lock:
+            self.weather_cache[cache_key] = (data, time.monotonic() - (self.cache_duration - ttl))
+        return data
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """Check if cached data is still valid"""
-        if cache_key not in self.weather_cache:
-            return False
+    def _set_cached(self, cache_key: str, data: Any):
+        """Cache data under a key, in Redis too when the shared cache is enabled"""
+        with self._cache_lock:
+            self.weather_cache[cache_key] = (data, time.monotonic())
         
-        cache_time = self.weather_cache[cache_key]['timestamp']
-        return (time.time() - cache_time) < self.cache_duration
+        if not self._redis_usable():
+            return
+        try:
+            self._redis.setex(f'weather:{cache_key}', self.cache_duration, msgpack.packb(data, use_bin_type=True))
+        except redis.RedisError as e:
+            self._redis_failed(e)
     
     def get_current_weather(self, city: str = None, coordinates: tuple = None) -> Dict[str, Any]:
         """
@@ -57,34 +376,57 @@ class WeatherService:
             coordinates: (latitude, longitude) tuple
         """
         # Get coordinates
-        if coordinates:
-            lat, lon = coordinates
-            cache_key = f"current_{lat}_{lon}"
-        elif city:
-            coords = self._geocode_city(city)
-            if not coords:
-                logger.warning(f"Could not geocode city {city}, using default location")
-                lat, lon = self.default_coordinates
-            else:
-                lat, lon = coords
-            cache_key = f"current_{city}"
-        else:
-            lat, lon = self.default_coordinates
-            cache_key = "current_default"
+        geocoded = self._geocode_city(city) if city and not coordinates else None
+        lat, lon, cache_key = self._resolve_location('current', city, coordinates, geocoded)
         
         # Check cache first
-        if self._is_cache_valid(cache_key):
+        cached = self._get_cached(cache_key)
+        if cached is not None:
             logger.info(f"Using cached weather data for coordinates ({lat}, {lon})")
-            return self.weather_cache[cache_key]['data']
+            return cached
         
         # Get real weather data
         weather_data = self._get_open_meteo_current(lat, lon, city)
+        return self._current_or_fallback(cache_key, weather_data, city)
+    
+    async def get_current_weather_async(self, city: str = None, coordinates: tuple = None) -> Dict[str, Any]:
+        """Async version of get_current_weather, so several locations can be fetched concurrently"""
+        if not AIOHTTP_AVAILABLE:
+            return await self._run_sync(self.get_current_weather, city, coordinates)
+        
+        geocoded = await self._geocode_city_async(city) if city and not coordinates else None
+        lat, lon, cache_key = self._resolve_location('current', city, coordinates, geocoded)
+        
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached weather data for coordinates ({lat}, {lon})")
+            return cached
+        
+        weather_data = await self._get_open_meteo_current_async(lat, lon, city)
+        return self._current_or_fallback(cache_key, weather_data, city)
+    
+    def _resolve_location(self, kind: str, city: Optional[str], coordinates: Optional[tuple],
+                          geocoded: Optional[tuple], suffix: str = '') -> Tuple[float, float, str]:
+        """Coordinates and cache key for a request, given the geocoding result for city (if any)"""
+        if coordinates:
+            lat, lon = coordinates
+            return lat, lon, f"{kind}_{lat}_{lon}{suffix}"
+        if city:
+            if not geocoded:
+                logger.warning(f"Could not geocode city {city}, using default location")
+                lat, lon = self.default_coordinates
+            else:
+                lat, lon = geocoded
+            return lat, lon, f"{kind}_{city}{suffix}"
+        lat, lon = self.default_coordinates
+        return lat, lon, f"{kind}_default{suffix}"
+    
+    def _current_or_fallback(self, cache_key: str, weather_data: Optional[Dict[str, Any]],
+                             city: Optional[str]) -> Dict[str, Any]:
+        """Cache fetched current weather, or fall back to simulated data if the fetch failed"""
         if weather_data:
             # Cache the result
-            self.weather_cache[cache_key] = {
-                'data': weather_data,
-                'timestamp': time.time()
-            }
+            self._set_cached(cache_key, weather_data)
             return weather_data
         
         # Fallback to simulated data
@@ -94,97 +436,148 @@ class WeatherService:
     
     def _geocode_city(self, city: str) -> Optional[tuple]:
         """Convert city name to coordinates using Open-Meteo geocoding"""
+        if self._circuit_open():
+            return None
+        
         try:
             self._rate_limit()
             
             params = {
                 'name': city,
                 'count': 1,
-                'language': 'en',
-                'format': 'json'
+                'language': 'en'
             }
             
-            response = requests.get(f"{self.geocoding_url}/search", params=params, timeout=10)
+            response = self.session.get(f"{self.geocoding_url}/search", params=params, timeout=(3, 7))
             response.raise_for_status()
-            data = response.json()
+            self._record_success()
+            data = _loads(response.content)
             
             if data.get('results'):
                 result = data['results'][0]
                 return (result['latitude'], result['longitude'])
                 
+        except requests.exceptions.RequestException as e:
+            self._record_failure()
+            logger.error(f"Geocoding failed for {city}: {e}")
         except Exception as e:
             logger.error(f"Geocoding failed for {city}: {e}")
         
         return None
     
-    def _get_open_meteo_current(self, lat: float, lon: float, city_name: str = None) -> Optional[Dict[str, Any]]:
-        """Get current weather from Open-Meteo API"""
+    async def _geocode_city_async(self, city: str) -> Optional[tuple]:
+        """Async version of _geocode_city"""
+        if self._circuit_open():
+            return None
+        
         try:
-            self._rate_limit()
+            await self._rate_limit_async()
             
-            url = f"{self.base_url}/forecast"
             params = {
-                'latitude': lat,
-                'longitude': lon,
-                'current': [
-                    'temperature_2m',
-                    'relative_humidity_2m', 
-                    'apparent_temperature',
-                    'weather_code',
-                    'surface_pressure',
-                    'wind_speed_10m',
-                    'wind_direction_10m',
-                    'cloud_cover',
-                    'visibility',
-                    'uv_index'
-                ],
-                'timezone': 'auto',
-                'format': 'json'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            current = data['current']
-            
-            # Transform to our standard format
-            weather_data = {
-                'temperature': round(current['temperature_2m'], 1),
-                'humidity': current['relative_humidity_2m'],
-                'pressure': current['surface_pressure'],
-                'wind_speed': current['wind_speed_10m'],
-                'wind_direction': current['wind_direction_10m'],
-                'cloud_percentage': current['cloud_cover'],
-                'weather_code': current['weather_code'],
-                'weather_desc': self._get_weather_description(current['weather_code']),
-                'weather_main': self._get_weather_main(current['weather_code']),
-                'visibility': current['visibility'] / 1000 if current['visibility'] else 10,  # Convert to km
-                'uv_index': current['uv_index'] or 0,
-                'apparent_temperature': round(current['apparent_temperature'], 1),
-                'location': {
-                    'city': city_name or f"Location ({lat:.2f}, {lon:.2f})",
-                    'coordinates': [lat, lon]
-                },
-                'timestamp': datetime.now().isoformat(),
-                'data_source': 'open-meteo'
+                'name': city,
+                'count': 1,
+                'language': 'en'
             }
             
-            # Calculate sunlight hours (sunrise/sunset data requires separate API call)
-            weather_data.update(self._calculate_sun_times(lat, lon))
+            session = await self._get_session()
+            async with session.get(f"{self.geocoding_url}/search", params=params,
+                                   timeout=aiohttp.ClientTimeout(total=10, sock_connect=3)) as response:
+                response.raise_for_status()
+                data = _loads(await response.read())
+            self._record_success()
             
-            # Calculate effective sunlight hours
-            weather_data['sunlight_hours'] = self._calculate_effective_sunlight_hours(
-                weather_data['sunrise'], weather_data['sunset'], 
-                weather_data['cloud_percentage']
-            )
-            
-            logger.info(f"Retrieved real weather data: "
-                       f"{weather_data['temperature']}°C, "
-                       f"{weather_data['cloud_percentage']}% clouds, "
-                       f"UV: {weather_data['uv_index']}")
-            
-            return weather_data
+            if data.get('results'):
+                result = data['results'][0]
+                return (result['latitude'], result['longitude'])
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._record_failure()
+            logger.error(f"Geocoding failed for {city}: {e}")
+        except Exception as e:
+            logger.error(f"Geocoding failed for {city}: {e}")
+        
+        return None
+    
+    def _get_open_meteo_bundle(self, lat: float, lon: float, hours: int = 24) -> Optional[Dict[str, Any]]:
+        """
+        Get current conditions, hourly forecast and sunrise/sunset in a single Open-Meteo request
+        
+        The response is cached per location, so current weather and forecast
+        lookups for the same place share one round-trip. Returns None without
+        a request while the circuit breaker is open.
+        """
+        cache_key = f"bundle_{lat}_{lon}"
+        forecast_days = min(7, (hours // 24) + 1)  # Max 7 days
+        
+        cached = self._get_cached(cache_key)
+        if cached is not None and cached[0] >= forecast_days:
+            return cached[1]
+        
+        if self._circuit_open():
+            return None
+        
+        self._rate_limit()
+        
+        try:
+            response = self.session.get(f"{self.base_url}/forecast",
+                                        params=self._bundle_params(lat, lon, forecast_days), timeout=(3, 7))
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            self._record_failure()
+            raise
+        self._record_success()
+        data = _loads(response.content)
+        
+        self._set_cached(cache_key, (forecast_days, data))
+        return data
+    
+    async def _get_open_meteo_bundle_async(self, lat: float, lon: float, hours: int = 24) -> Optional[Dict[str, Any]]:
+        """Async version of _get_open_meteo_bundle, sharing its cache"""
+        cache_key = f"bundle_{lat}_{lon}"
+        forecast_days = min(7, (hours // 24) + 1)  # Max 7 days
+        
+        cached = self._get_cached(cache_key)
+        if cached is not None and cached[0] >= forecast_days:
+            return cached[1]
+        
+        if self._circuit_open():
+            return None
+        
+        await self._rate_limit_async()
+        
+        session = await self._get_session()
+        try:
+            async with session.get(f"{self.base_url}/forecast",
+                                   params=self._bundle_params(lat, lon, forecast_days),
+                                   timeout=aiohttp.ClientTimeout(total=10, sock_connect=3)) as response:
+                response.raise_for_status()
+                raw = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._record_failure()
+            raise
+        self._record_success()
+        data = _loads(raw)
+        
+        self._set_cached(cache_key, (forecast_days, data))
+        return data
+    
+    def _bundle_params(self, lat: float, lon: float, forecast_days: int) -> Dict[str, Any]:
+        """Query parameters for the combined current/hourly/daily Open-Meteo request"""
+        return {
+            'latitude': lat,
+            'longitude': lon,
+            'current': _CURRENT_FIELDS,
+            'hourly': _HOURLY_FIELDS,
+            'daily': 'sunrise,sunset',
+            'forecast_days': forecast_days,
+            'timezone': 'auto'
+        }
+    
+    def _get_open_meteo_current(self, lat: float, lon: float, city_name: str = None) -> Optional[Dict[str, Any]]:
+        """Get current weather from Open-Meteo API"""
+        try:
+            data = self._get_open_meteo_bundle(lat, lon)
+            return self._parse_current(data, lat, lon, city_name) if data is not None else None
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Open-Meteo API request failed: {e}")
@@ -195,62 +588,81 @@ class WeatherService:
         
         return None
     
+    async def _get_open_meteo_current_async(self, lat: float, lon: float,
+                                            city_name: str = None) -> Optional[Dict[str, Any]]:
+        """Async version of _get_open_meteo_current"""
+        try:
+            data = await self._get_open_meteo_bundle_async(lat, lon)
+            return self._parse_current(data, lat, lon, city_name) if data is not None else None
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Open-Meteo API request failed: {e}")
+        except KeyError as e:
+            logger.error(f"Unexpected API response format: {e}")
+        except Exception as e:
+            logger.error(f"Weather API error: {e}")
+        
+        return None
+    
+    def _parse_current(self, data: Dict[str, Any], lat: float, lon: float,
+                       city_name: Optional[str]) -> Dict[str, Any]:
+        """Transform the current conditions of an Open-Meteo response into our standard format"""
+        current = data['current']
+        
+        # Transform to our standard format
+        weather_data = {
+            'temperature': round(current['temperature_2m'], 1),
+            'humidity': current['relative_humidity_2m'],
+            'pressure': current['surface_pressure'],
+            'wind_speed': current['wind_speed_10m'],
+            'wind_direction': current['wind_direction_10m'],
+            'cloud_percentage': current['cloud_cover'],
+            'weather_code': current['weather_code'],
+            'weather_desc': self._get_weather_description(current['weather_code']),
+            'weather_main': self._get_weather_main(current['weather_code']),
+            'visibility': current['visibility'] / 1000 if current['visibility'] else 10,  # Convert to km
+            'uv_index': current['uv_index'] or 0,
+            'apparent_temperature': round(current['apparent_temperature'], 1),
+            'location': _location(city_name, lat, lon),
+            'timestamp': datetime.now().isoformat(),
+            'data_source': 'open-meteo'
+        }
+        
+        # Today's sunrise/sunset hours ("YYYY-MM-DDTHH:MM" local time), estimated if missing
+        daily = data.get('daily')
+        if daily and daily.get('sunrise') and daily.get('sunset'):
+            weather_data['sunrise'] = int(daily['sunrise'][0][11:13])
+            weather_data['sunset'] = int(daily['sunset'][0][11:13])
+        else:
+            weather_data.update(self._calculate_sun_times(lat, lon))
+        
+        # Calculate effective sunlight hours
+        weather_data['sunlight_hours'] = self._calculate_effective_sunlight_hours(
+            weather_data['sunrise'], weather_data['sunset'], 
+            weather_data['cloud_percentage']
+        )
+        
+        logger.info(f"Retrieved real weather data: "
+                   f"{weather_data['temperature']}°C, "
+                   f"{weather_data['cloud_percentage']}% clouds, "
+                   f"UV: {weather_data['uv_index']}")
+        
+        return weather_data
+    
     def _get_weather_description(self, weather_code: int) -> str:
         """Convert WMO weather code to description"""
-        weather_codes = {
-            0: "Clear sky",
-            1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-            45: "Fog", 48: "Depositing rime fog",
-            51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
-            56: "Light freezing drizzle", 57: "Dense freezing drizzle",
-            61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
-            66: "Light freezing rain", 67: "Heavy freezing rain",
-            71: "Slight snow", 73: "Moderate snow", 75: "Heavy snow",
-            77: "Snow grains",
-            80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
-            85: "Slight snow showers", 86: "Heavy snow showers",
-            95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
-        }
-        return weather_codes.get(weather_code, "Unknown")
+        return _WMO_DESCRIPTION.get(weather_code, "Unknown")
     
     def _get_weather_main(self, weather_code: int) -> str:
         """Convert WMO weather code to main category"""
-        if weather_code == 0:
-            return "Clear"
-        elif 1 <= weather_code <= 3:
-            return "Clouds"
-        elif weather_code in [45, 48]:
-            return "Mist"
-        elif 51 <= weather_code <= 67:
-            return "Rain"
-        elif 71 <= weather_code <= 86:
-            return "Snow"
-        elif weather_code >= 95:
-            return "Thunderstorm"
-        else:
-            return "Unknown"
+        return _WMO_MAIN[weather_code] if 0 <= weather_code < 100 else "Unknown"
     
     def _calculate_sun_times(self, lat: float, lon: float) -> Dict[str, Any]:
         """Calculate sunrise and sunset times for given coordinates"""
         try:
-            # Simple astronomical calculation for sunrise/sunset
-            from datetime import date
-            import math
-            
-            today = date.today()
-            day_of_year = today.timetuple().tm_yday
-            
-            # Approximate solar calculations
-            solar_declination = 23.45 * math.sin(math.radians(360 * (284 + day_of_year) / 365))
-            hour_angle = math.degrees(math.acos(-math.tan(math.radians(lat)) * math.tan(math.radians(solar_declination))))
-            
-            sunrise_hour = 12 - hour_angle / 15
-            sunset_hour = 12 + hour_angle / 15
-            
-            return {
-                'sunrise': max(5, min(8, int(sunrise_hour))),  # Clamp between 5-8 AM
-                'sunset': max(17, min(20, int(sunset_hour)))   # Clamp between 5-8 PM
-            }
+            day_of_year = datetime.now().timetuple().tm_yday
+            sunrise, sunset = _sun_times(int(lat * 100), day_of_year)
+            return {'sunrise': sunrise, 'sunset': sunset}
             
         except Exception as e:
             logger.warning(f"Sun time calculation failed: {e}, using defaults")
@@ -264,11 +676,12 @@ class WeatherService:
         effective_hours = daylight_hours * (1 - cloud_reduction)
         return max(0, round(effective_hours, 1))
     
-    def _estimate_uv_index(self, lat: float, lon: float) -> float:
-        """Estimate UV index based on location and time"""
+    def _estimate_uv_index(self, lat: float, lon: float, hour: Optional[int] = None) -> float:
+        """Estimate UV index based on location and time (hour of day, now if not given)"""
         # Simplified UV index estimation
         # In production, would use UV API or more sophisticated calculation
-        hour = datetime.now().hour
+        if hour is None:
+            hour = datetime.now().hour
         
         if 6 <= hour <= 18:
             # Higher UV near equator, peak at solar noon
@@ -290,34 +703,42 @@ class WeatherService:
             coordinates: (latitude, longitude) tuple
         """
         # Get coordinates
-        if coordinates:
-            lat, lon = coordinates
-            cache_key = f"forecast_{lat}_{lon}_{hours}"
-        elif city:
-            coords = self._geocode_city(city)
-            if not coords:
-                logger.warning(f"Could not geocode city {city}, using default location")
-                lat, lon = self.default_coordinates
-            else:
-                lat, lon = coords
-            cache_key = f"forecast_{city}_{hours}"
-        else:
-            lat, lon = self.default_coordinates
-            cache_key = f"forecast_default_{hours}"
+        geocoded = self._geocode_city(city) if city and not coordinates else None
+        lat, lon, cache_key = self._resolve_location('forecast', city, coordinates, geocoded, f"_{hours}")
         
         # Check cache
-        if self._is_cache_valid(cache_key):
+        cached = self._get_cached(cache_key)
+        if cached is not None:
             logger.info(f"Using cached forecast data")
-            return self.weather_cache[cache_key]['data']
+            return cached
         
         # Get real forecast data
         forecast_data = self._get_open_meteo_forecast(lat, lon, hours)
+        return self._forecast_or_fallback(cache_key, forecast_data, city, hours)
+    
+    async def get_forecast_async(self, city: str = None, hours: int = 24,
+                                 coordinates: tuple = None) -> List[Dict[str, Any]]:
+        """Async version of get_forecast, so several locations can be fetched concurrently"""
+        if not AIOHTTP_AVAILABLE:
+            return await self._run_sync(self.get_forecast, city, hours, coordinates)
+        
+        geocoded = await self._geocode_city_async(city) if city and not coordinates else None
+        lat, lon, cache_key = self._resolve_location('forecast', city, coordinates, geocoded, f"_{hours}")
+        
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached forecast data")
+            return cached
+        
+        forecast_data = await self._get_open_meteo_forecast_async(lat, lon, hours)
+        return self._forecast_or_fallback(cache_key, forecast_data, city, hours)
+    
+    def _forecast_or_fallback(self, cache_key: str, forecast_data: Optional[List[Dict[str, Any]]],
+                              city: Optional[str], hours: int) -> List[Dict[str, Any]]:
+        """Cache a fetched forecast, or fall back to a simulated one if the fetch failed"""
         if forecast_data:
             # Cache the result
-            self.weather_cache[cache_key] = {
-                'data': forecast_data,
-                'timestamp': time.time()
-            }
+            self._set_cached(cache_key, forecast_data)
             return forecast_data
         
         # Fallback to simulated forecast
@@ -328,63 +749,8 @@ class WeatherService:
     def _get_open_meteo_forecast(self, lat: float, lon: float, hours: int) -> Optional[List[Dict[str, Any]]]:
         """Get forecast from Open-Meteo API"""
         try:
-            self._rate_limit()
-            
-            url = f"{self.base_url}/forecast"
-            params = {
-                'latitude': lat,
-                'longitude': lon,
-                'hourly': [
-                    'temperature_2m',
-                    'relative_humidity_2m',
-                    'apparent_temperature',
-                    'precipitation',
-                    'weather_code',
-                    'surface_pressure',
-                    'cloud_cover',
-                    'visibility',
-                    'wind_speed_10m',
-                    'wind_direction_10m',
-                    'uv_index'
-                ],
-                'forecast_days': min(7, (hours // 24) + 1),  # Max 7 days
-                'timezone': 'auto',
-                'format': 'json'
-            }
-            
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            hourly_data = data['hourly']
-            forecasts = []
-            
-            for i in range(min(hours, len(hourly_data['time']))):
-                forecast_time = datetime.fromisoformat(hourly_data['time'][i])
-                weather_code = hourly_data['weather_code'][i]
-                
-                forecast = {
-                    'timestamp': forecast_time.isoformat(),
-                    'temperature': round(hourly_data['temperature_2m'][i], 1),
-                    'humidity': hourly_data['relative_humidity_2m'][i],
-                    'pressure': hourly_data['surface_pressure'][i],
-                    'wind_speed': hourly_data['wind_speed_10m'][i],
-                    'wind_direction': hourly_data['wind_direction_10m'][i],
-                    'cloud_percentage': hourly_data['cloud_cover'][i],
-                    'weather_code': weather_code,
-                    'weather_desc': self._get_weather_description(weather_code),
-                    'weather_main': self._get_weather_main(weather_code),
-                    'precipitation': hourly_data['precipitation'][i],
-                    'visibility': hourly_data['visibility'][i] / 1000 if hourly_data['visibility'][i] else 10,
-                    'uv_index': hourly_data['uv_index'][i] or 0,
-                    'apparent_temperature': round(hourly_data['apparent_temperature'][i], 1),
-                    'data_source': 'open-meteo'
-                }
-                
-                forecasts.append(forecast)
-            
-            logger.info(f"Retrieved {len(forecasts)} hours of forecast data from Open-Meteo")
-            return forecasts
+            data = self._get_open_meteo_bundle(lat, lon, hours)
+            return self._parse_forecast(data, hours) if data is not None else None
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Open-Meteo forecast API request failed: {e}")
@@ -395,31 +761,105 @@ class WeatherService:
         
         return None
     
-    def _generate_realistic_weather(self, city: str) -> Dict[str, Any]:
+    async def _get_open_meteo_forecast_async(self, lat: float, lon: float,
+                                             hours: int) -> Optional[List[Dict[str, Any]]]:
+        """Async version of _get_open_meteo_forecast"""
+        try:
+            data = await self._get_open_meteo_bundle_async(lat, lon, hours)
+            return self._parse_forecast(data, hours) if data is not None else None
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Open-Meteo forecast API request failed: {e}")
+        except (KeyError, IndexError) as e:
+            logger.error(f"Unexpected forecast API response format: {e}")
+        except Exception as e:
+            logger.error(f"Weather forecast error: {e}")
+        
+        return None
+    
+    def _parse_forecast(self, data: Dict[str, Any], hours: int) -> List[Dict[str, Any]]:
+        """Transform the hourly block of an Open-Meteo response into our forecast format"""
+        forecasts = _arrays_to_records(self._parse_forecast_arrays(data, hours), 'open-meteo')
+        logger.info(f"Retrieved {len(forecasts)} hours of forecast data from Open-Meteo")
+        return forecasts
+    
+    def _parse_forecast_arrays(self, data: Dict[str, Any], hours: int) -> Dict[str, np.ndarray]:
+        """Decode the hourly block of an Open-Meteo response one column at a time"""
+        hourly_data = data['hourly']
+        n = min(hours, len(hourly_data['time']))
+        
+        visibility = _column(hourly_data['visibility'][:n])
+        weather_code = _column(hourly_data['weather_code'][:n], integer=True)
+        return {
+            'timestamp': np.array(hourly_data['time'][:n], dtype='datetime64[m]'),  # local time
+            'temperature': np.round(_column(hourly_data['temperature_2m'][:n]), 1),
+            'humidity': _column(hourly_data['relative_humidity_2m'][:n], integer=True),
+            'pressure': _column(hourly_data['surface_pressure'][:n]),
+            'wind_speed': _column(hourly_data['wind_speed_10m'][:n]),
+            'wind_direction': _column(hourly_data['wind_direction_10m'][:n], integer=True),
+            'cloud_percentage': _column(hourly_data['cloud_cover'][:n], integer=True),
+            'weather_code': weather_code,
+            'weather_desc': np.array([self._get_weather_description(code) for code in weather_code.tolist()], dtype=object),
+            'weather_main': np.array([self._get_weather_main(code) for code in weather_code.tolist()], dtype=object),
+            'precipitation': _column(hourly_data['precipitation'][:n]),
+            'visibility': np.where(np.isnan(visibility) | (visibility == 0), 10, visibility / 1000),  # km
+            'uv_index': np.nan_to_num(_column(hourly_data['uv_index'][:n])),
+            'apparent_temperature': np.round(_column(hourly_data['apparent_temperature'][:n]), 1)
+        }
+    
+    def get_forecast_arrays(self, city: str = None, hours: int = 24,
+                            coordinates: tuple = None) -> Dict[str, np.ndarray]:
+        """
+        Get weather forecast as columns: one NumPy array per field instead of one dict per hour
+        
+        Same fields as get_forecast, minus data_source; 'timestamp' is datetime64[m]
+        local time and missing numeric values are NaN. Meant for vectorized consumers
+        such as the prediction service, which can use the columns without copying.
+        Falls back to a simulated forecast (with its own fields) if the API is unavailable.
+        """
+        geocoded = self._geocode_city(city) if city and not coordinates else None
+        lat, lon, _ = self._resolve_location('forecast', city, coordinates, geocoded)
+        
+        try:
+            data = self._get_open_meteo_bundle(lat, lon, hours)
+            if data is not None:
+                return self._parse_forecast_arrays(data, hours)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Open-Meteo forecast API request failed: {e}")
+        except (KeyError, IndexError, ValueError) as e:
+            logger.error(f"Unexpected forecast API response format: {e}")
+        
+        city_name = city or "Default Location"
+        logger.warning(f"Using simulated forecast data for {city_name}")
+        return _records_to_arrays(self._generate_realistic_forecast(city_name, hours))
+    
+    def _generate_realistic_weather(self, city: str, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Generate realistic weather data for fallback"""
-        hour = datetime.now().hour
-        day_of_year = datetime.now().timetuple().tm_yday
+        # Read the clock once for the whole reading
+        now = now or datetime.now()
+        hour = now.hour
+        day_of_year = now.timetuple().tm_yday
         
         # Base temperature varies by location and season
         if city.lower() in ['nairobi', 'kenya']:
             # Nairobi climate: mild, around equator
-            base_temp = 20 + 5 * np.sin((day_of_year - 80) * 2 * np.pi / 365)  # Seasonal variation
-            base_temp += 8 * np.sin((hour - 6) * np.pi / 12)  # Daily variation
+            base_temp = 20 + 5 * _SEASONAL_SIN[day_of_year]  # Seasonal variation
+            base_temp += 8 * _DIURNAL_SIN[hour]  # Daily variation
         else:
             # Generic temperate climate
-            base_temp = 15 + 10 * np.sin((day_of_year - 80) * 2 * np.pi / 365)
-            base_temp += 10 * np.sin((hour - 6) * np.pi / 12)
+            base_temp = 15 + 10 * _SEASONAL_SIN[day_of_year]
+            base_temp += 10 * _DIURNAL_SIN[hour]
         
         # Add random variation
-        temperature = base_temp + np.random.uniform(-3, 3)
+        temperature = base_temp + random.uniform(-3, 3)
         temperature = max(-10, min(45, temperature))  # Reasonable bounds
         
         # Cloud percentage with weather patterns
-        cloud_base = np.random.uniform(20, 70)
-        if np.random.random() < 0.3:  # 30% chance of very cloudy
-            cloud_percentage = np.random.uniform(70, 95)
-        elif np.random.random() < 0.2:  # 20% chance of clear skies
-            cloud_percentage = np.random.uniform(5, 25)
+        cloud_base = random.uniform(20, 70)
+        if random.random() < 0.3:  # 30% chance of very cloudy
+            cloud_percentage = random.uniform(70, 95)
+        elif random.random() < 0.2:  # 20% chance of clear skies
+            cloud_percentage = random.uniform(5, 25)
         else:
             cloud_percentage = cloud_base
         
@@ -432,15 +872,15 @@ class WeatherService:
         
         return {
             'temperature': round(temperature, 1),
-            'humidity': int(np.random.uniform(40, 85)),
-            'pressure': int(np.random.uniform(1010, 1025)),
-            'wind_speed': round(np.random.uniform(0, 15), 1),
+            'humidity': int(random.uniform(40, 85)),
+            'pressure': int(random.uniform(1010, 1025)),
+            'wind_speed': round(random.uniform(0, 15), 1),
             'cloud_percentage': round(cloud_percentage, 1),
             'sunlight_hours': sunlight_hours,
             'weather_desc': self._get_simulated_weather_description(cloud_percentage, temperature),
             'weather_main': self._get_simulated_weather_main(cloud_percentage),
-            'visibility': int(np.random.uniform(8000, 12000)),
-            'uv_index': self._estimate_uv_index(0, 0),  # Approximate for equator
+            'visibility': int(random.uniform(8000, 12000)),
+            'uv_index': self._estimate_uv_index(0, 0, hour),  # Approximate for equator
             'sunrise': sunrise,
             'sunset': sunset,
             'location': {
@@ -448,50 +888,56 @@ class WeatherService:
                 'country': 'Unknown',
                 'coordinates': [0, 0]
             },
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'data_source': 'simulated'
         }
     
     def _generate_realistic_forecast(self, city: str, hours: int) -> List[Dict[str, Any]]:
         """Generate realistic forecast data"""
-        forecasts = []
-        current_weather = self._generate_realistic_weather(city)
+        base_time = datetime.now()
+        current_weather = self._generate_realistic_weather(city, base_time)
         
-        for i in range(0, hours, 3):  # Generate every 3 hours like real API
-            forecast_time = datetime.now() + timedelta(hours=i)
-            hour = forecast_time.hour
-            
-            # Evolve weather gradually
-            if i == 0:
-                temp = current_weather['temperature']
-                clouds = current_weather['cloud_percentage']
-            else:
-                # Gradual changes
-                temp = forecasts[-1]['temperature'] + np.random.uniform(-2, 2)
-                clouds = forecasts[-1]['cloud_percentage'] + np.random.uniform(-10, 10)
-                clouds = max(0, min(100, clouds))
-            
-            # Add daily temperature cycle
-            daily_temp_variation = 8 * np.sin((hour - 6) * np.pi / 12)
-            temp += daily_temp_variation * 0.3  # Reduced impact for forecast
-            
-            forecast = {
-                'timestamp': forecast_time.isoformat(),
-                'temperature': round(max(-10, min(45, temp)), 1),
-                'humidity': int(np.random.uniform(40, 85)),
-                'pressure': int(np.random.uniform(1010, 1025)),
-                'wind_speed': round(np.random.uniform(0, 12), 1),
-                'cloud_percentage': round(clouds, 1),
-                'weather_desc': self._get_simulated_weather_description(clouds, temp),
-                'weather_main': self._get_simulated_weather_main(clouds),
-                'precipitation': round(max(0, np.random.uniform(-0.5, 2) if clouds > 70 else 0), 1),
-                'sunlight_hours': max(0, 3 - (clouds / 100 * 2)) if 6 <= hour <= 18 else 0,
+        # Every 3 hours like real API; temperature and clouds drift as clipped random walks
+        offsets = np.arange(0, hours, 3)
+        n = len(offsets)
+        hour_of_day = (base_time.hour + offsets) % 24
+        
+        temp_steps = np.random.uniform(-2, 2, n)
+        temp_steps[:1] = 0  # Start from the current weather
+        cloud_steps = np.random.uniform(-10, 10, n)
+        cloud_steps[:1] = 0
+        
+        # Daily temperature cycle, with reduced impact for forecast
+        daily_temp_variation = 8 * np.asarray(_DIURNAL_SIN)[hour_of_day] * 0.3
+        temps = np.round(np.clip(current_weather['temperature'] + np.cumsum(temp_steps) + daily_temp_variation,
+                                 -10, 45), 1)
+        clouds = np.round(np.clip(current_weather['cloud_percentage'] + np.cumsum(cloud_steps), 0, 100), 1)
+        precipitation = np.round(np.where(clouds > 70, np.maximum(0, np.random.uniform(-0.5, 2, n)), 0), 1)
+        daytime = (hour_of_day >= 6) & (hour_of_day <= 18)
+        sunlight_hours = np.where(daytime, np.maximum(0, 3 - clouds / 100 * 2), 0)
+        humidity = np.random.uniform(40, 85, n).astype(int)
+        pressure = np.random.uniform(1010, 1025, n).astype(int)
+        wind_speed = np.round(np.random.uniform(0, 12, n), 1)
+        
+        return [
+            {
+                'timestamp': (base_time + timedelta(hours=offset)).isoformat(),
+                'temperature': temp,
+                'humidity': hum,
+                'pressure': press,
+                'wind_speed': wind,
+                'cloud_percentage': cloud,
+                'weather_desc': self._get_simulated_weather_description(cloud, temp),
+                'weather_main': self._get_simulated_weather_main(cloud),
+                'precipitation': rain,
+                'sunlight_hours': sun,
                 'data_source': 'simulated'
             }
-            
-            forecasts.append(forecast)
-        
-        return forecasts
+            for offset, temp, hum, press, wind, cloud, rain, sun in zip(
+                offsets.tolist(), temps.tolist(), humidity.tolist(), pressure.tolist(),
+                wind_speed.tolist(), clouds.tolist(), precipitation.tolist(), sunlight_hours.tolist()
+            )
+        ]
     
     def _get_simulated_weather_description(self, cloud_percentage: float, temperature: float) -> str:
         """Generate weather description based on conditions"""
@@ -524,6 +970,7 @@ class WeatherService:
         alerts = []
         
         current_weather = self.get_current_weather(city)
+        now_iso = datetime.now().isoformat()
         
         # Temperature alerts
         if current_weather['temperature'] > 35:
@@ -532,7 +979,7 @@ class WeatherService:
                 'severity': 'high',
                 'message': 'High temperature may reduce solar panel efficiency',
                 'impact': 'Potential 5-10% reduction in solar generation',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now_iso
             })
         
         # Cloud cover alerts
@@ -542,7 +989,7 @@ class WeatherService:
                 'severity': 'medium',
                 'message': 'Heavy cloud coverage expected',
                 'impact': 'Solar generation may be reduced by 30-50%',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now_iso
             })
         
         # Wind alerts
@@ -552,7 +999,7 @@ class WeatherService:
                 'severity': 'medium',
                 'message': 'High wind speeds detected',
                 'impact': 'Monitor solar panel stability',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now_iso
             })
         
         return alerts
@@ -6,92 +6,114 @@ Test script for the AI Energy Trading System API
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # API base URL
 BASE_URL = "http://localhost:5000/api"
 
-def test_prediction_api():
+# One keep-alive connection pool shared by all tests
+SESSION = requests.Session()
+
+def report(lines, passed):
+    """Print a test's output in one write, so tests running in parallel don't interleave"""
+    print("\n".join(lines) + "\n", end="", flush=True)
+    return passed
+
+def wait_for_server(session, timeout=10.0):
+    """Poll the API home endpoint until the server answers (or timeout seconds pass)"""
+    home_url = BASE_URL.rsplit('/api', 1)[0] + '/'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if session.get(home_url, timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    return False
+
+def test_prediction_api(session=SESSION):
     """Test the prediction endpoint"""
-    print("\n=== Testing Prediction API ===")
+    out = ["\n=== Testing Prediction API ==="]
     
     try:
-        response = requests.get(f"{BASE_URL}/predict", 
-                              params={"household_id": "HH_001"})
+        response = session.get(f"{BASE_URL}/predict", 
+                             params={"household_id": "HH_001"})
         
         if response.status_code == 200:
             data = response.json()
-            print("✓ Prediction API working!")
-            print(f"  - Energy production prediction: {data.get('predicted_production', 'N/A')} kWh")
-            print(f"  - Energy consumption prediction: {data.get('predicted_consumption', 'N/A')} kWh")
-            print(f"  - Trading recommendation: {data.get('recommendation', 'N/A')}")
-            print(f"  - Market conditions: {data.get('market_conditions', 'N/A')}")
-            return True
+            out.append("✓ Prediction API working!")
+            out.append(f"  - Energy production prediction: {data.get('predicted_production', 'N/A')} kWh")
+            out.append(f"  - Energy consumption prediction: {data.get('predicted_consumption', 'N/A')} kWh")
+            out.append(f"  - Trading recommendation: {data.get('recommendation', 'N/A')}")
+            out.append(f"  - Market conditions: {data.get('market_conditions', 'N/A')}")
+            return report(out, True)
         else:
-            print(f"✗ Prediction API failed: {response.status_code}")
-            return False
+            out.append(f"✗ Prediction API failed: {response.status_code}")
+            return report(out, False)
             
     except Exception as e:
-        print(f"✗ Connection error: {e}")
-        return False
+        out.append(f"✗ Connection error: {e}")
+        return report(out, False)
 
-def test_forecast_api():
+def test_forecast_api(session=SESSION):
     """Test the forecast endpoint"""
-    print("\n=== Testing Forecast API ===")
+    out = ["\n=== Testing Forecast API ==="]
     
     try:
-        response = requests.get(f"{BASE_URL}/forecast", 
-                              params={"household_id": "HH_001", "hours": 24})
+        response = session.get(f"{BASE_URL}/forecast", 
+                             params={"household_id": "HH_001", "hours": 24})
         
         if response.status_code == 200:
             data = response.json()
-            print("✓ Forecast API working!")
+            out.append("✓ Forecast API working!")
             forecast_data = data.get('forecast', [])
-            print(f"  - Forecast periods: {len(forecast_data)}")
+            out.append(f"  - Forecast periods: {len(forecast_data)}")
             if forecast_data:
                 first_forecast = forecast_data[0]
-                print(f"  - Next hour production: {first_forecast.get('production', 'N/A')} kWh")
-                print(f"  - Next hour consumption: {first_forecast.get('consumption', 'N/A')} kWh")
-            return True
+                out.append(f"  - Next hour production: {first_forecast.get('production', 'N/A')} kWh")
+                out.append(f"  - Next hour consumption: {first_forecast.get('consumption', 'N/A')} kWh")
+            return report(out, True)
         else:
-            print(f"✗ Forecast API failed: {response.status_code}")
-            return False
+            out.append(f"✗ Forecast API failed: {response.status_code}")
+            return report(out, False)
             
     except Exception as e:
-        print(f"✗ Connection error: {e}")
-        return False
+        out.append(f"✗ Connection error: {e}")
+        return report(out, False)
 
-def test_analytics_api():
+def test_analytics_api(session=SESSION):
     """Test the analytics endpoint"""
-    print("\n=== Testing Analytics API ===")
+    out = ["\n=== Testing Analytics API ==="]
     
     try:
-        response = requests.get(f"{BASE_URL}/analytics", 
-                              params={"household_id": "HH_001"})
+        response = session.get(f"{BASE_URL}/analytics", 
+                             params={"household_id": "HH_001"})
         
         if response.status_code == 200:
             data = response.json()
-            print("✓ Analytics API working!")
-            print(f"  - Total households: {data.get('total_households', 'N/A')}")
-            print(f"  - Active households: {data.get('active_households', 'N/A')}")
+            out.append("✓ Analytics API working!")
+            out.append(f"  - Total households: {data.get('total_households', 'N/A')}")
+            out.append(f"  - Active households: {data.get('active_households', 'N/A')}")
             
             household_data = data.get('household_data', {})
             if household_data:
-                print(f"  - Current production: {household_data.get('current_production', 'N/A')} kWh")
-                print(f"  - Current consumption: {household_data.get('current_consumption', 'N/A')} kWh")
-                print(f"  - Battery level: {household_data.get('battery_level', 'N/A')}%")
-            return True
+                out.append(f"  - Current production: {household_data.get('current_production', 'N/A')} kWh")
+                out.append(f"  - Current consumption: {household_data.get('current_consumption', 'N/A')} kWh")
+                out.append(f"  - Battery level: {household_data.get('battery_level', 'N/A')}%")
+            return report(out, True)
         else:
-            print(f"✗ Analytics API failed: {response.status_code}")
-            return False
+            out.append(f"✗ Analytics API failed: {response.status_code}")
+            return report(out, False)
             
     except Exception as e:
-        print(f"✗ Connection error: {e}")
-        return False
+        out.append(f"✗ Connection error: {e}")
+        return report(out, False)
 
-def test_trade_execution():
+def test_trade_execution(session=SESSION):
     """Test trade execution endpoint"""
-    print("\n=== Testing Trade Execution API ===")
+    out = ["\n=== Testing Trade Execution API ==="]
     
     trade_request = {
         "household_id": "HH_001",
@@ -101,24 +123,24 @@ def test_trade_execution():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/execute_trade", 
-                               json=trade_request)
+        response = session.post(f"{BASE_URL}/execute_trade", 
+                              json=trade_request)
         
         if response.status_code == 200:
             data = response.json()
-            print("✓ Trade execution API working!")
-            print(f"  - Trade status: {data.get('status', 'N/A')}")
-            print(f"  - Trade ID: {data.get('trade_id', 'N/A')}")
-            print(f"  - Amount: {data.get('amount', 'N/A')} kWh")
-            print(f"  - Price: {data.get('price', 'N/A')} KES/kWh")
-            return True
+            out.append("✓ Trade execution API working!")
+            out.append(f"  - Trade status: {data.get('status', 'N/A')}")
+            out.append(f"  - Trade ID: {data.get('trade_id', 'N/A')}")
+            out.append(f"  - Amount: {data.get('amount', 'N/A')} kWh")
+            out.append(f"  - Price: {data.get('price', 'N/A')} KES/kWh")
+            return report(out, True)
         else:
-            print(f"✗ Trade execution API failed: {response.status_code}")
-            return False
+            out.append(f"✗ Trade execution API failed: {response.status_code}")
+            return report(out, False)
             
     except Exception as e:
-        print(f"✗ Connection error: {e}")
-        return False
+        out.append(f"✗ Connection error: {e}")
+        return report(out, False)
 
 def main():
     print("🔋 AI Energy Trading System API Test")
@@ -126,25 +148,18 @@ def main():
     print(f"Testing API at: {BASE_URL}")
     print(f"Test time: {datetime.now()}")
     
-    # Wait a moment for server to be ready
+    # Wait for server to be ready
     print("\nWaiting for server to be ready...")
-    time.sleep(2)
-    
-    # Run tests
-    tests_passed = 0
-    total_tests = 4
-    
-    if test_prediction_api():
-        tests_passed += 1
-    
-    if test_forecast_api():
-        tests_passed += 1
+    if not wait_for_server(SESSION):
+        print("⚠️  Server did not answer yet, running tests anyway")
     
-    if test_analytics_api():
-        tests_passed += 1
+    # Run tests in parallel over the shared session
+    tests = [test_prediction_api, test_forecast_api, test_analytics_api, test_trade_execution]
+    total_tests = len(tests)
     
-    if test_trade_execution():
-        tests_passed += 1
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda test: test(SESSION), tests))
+    tests_passed = sum(results)
     
     # Summary
     print("\n" + "=" * 50)
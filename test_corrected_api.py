@@ -5,11 +5,57 @@ Tests sell/buy predictions and consumption forecasting
 """
 
 import requests
+import numpy as np
+import argparse
 import json
+import random
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import itemgetter
 
-BASE_URL = "http://localhost:5000/api"
+from _http import create_session, resolve_host
+from _test_common import buffered_output, json_items
+
+HOST_IP = resolve_host('localhost')
+SERVER_URL = f"http://{HOST_IP}:5000"
+BASE_URL = f"{SERVER_URL}/api"
+
+# One keep-alive connection pool shared by all tests, retrying transient failures
+SESSION = create_session()
+
+# Responses of endpoints that don't change during a run: url -> (time.monotonic() when fetched, response)
+_CACHE = {}
+
+def cached_probe(url, ttl=10):
+    """GET a URL, reusing the response for ttl seconds"""
+    now = time.monotonic()
+    cached = _CACHE.get(url)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+    response = SESSION.get(url, timeout=5)
+    _CACHE[url] = (now, response)
+    return response
+
+# Forecast timestamps may end in 'Z', which datetime.fromisoformat accepts from Python 3.11
+if sys.version_info >= (3, 11):
+    parse_timestamp = datetime.fromisoformat
+else:
+    def parse_timestamp(timestamp):
+        """Parse an ISO 8601 timestamp for display; a trailing 'Z' is dropped rather than turned into a tzinfo"""
+        if timestamp.endswith('Z'):
+            timestamp = timestamp[:-1]
+        return datetime.fromisoformat(timestamp)
+
+TIME_FORMAT = '%H:%M'
+
+# One line of the forecast table
+FORECAST_ROW = ("   {time_str}: {temp}°C, {clouds}% clouds, "
+                "{production:.1f}kWh prod, {consumption:.1f}kWh cons, Rec: {recommendation}")
+
+# Sections of each /api/forecast entry (the server always sends all four)
+forecast_sections = itemgetter('timestamp', 'weather', 'iot_data', 'prediction')
 
 def print_header(title):
     """Print a formatted header"""
@@ -22,6 +68,23 @@ def print_section(title):
     print(f"\n📊 {title}")
     print("-" * 40)
 
+def probe_household(household_id):
+    """Fetch the prediction for one household"""
+    return SESSION.get(f"{BASE_URL}/predict", 
+                       params={"household": household_id}, 
+                       timeout=10)
+
+def trading_decisions(surplus, battery):
+    """Trading decision for each household, from arrays of energy surplus (kWh) and battery level (%)"""
+    surplus = np.asarray(surplus, dtype=float)
+    battery = np.asarray(battery, dtype=float)
+    return np.select(
+        [(surplus > 1) & (battery > 80), (surplus < -1) & (battery < 30)],
+        ["SELL - Excess energy available", "BUY - Energy deficit and low battery"],
+        default="HOLD - Balanced energy state"
+    )
+
+@buffered_output()
 def test_actual_api_structure():
     """Test the actual API structure and format"""
     print_header("TESTING ACTUAL API STRUCTURE")
@@ -30,15 +93,20 @@ def test_actual_api_structure():
         # Test prediction with correct household format
         household_ids = ["HH001_Nairobi_Central", "HH_001", "HH_002", "HH_003"]
         
-        for household_id in household_ids:
+        # Probe all households concurrently over the shared session, then report in order
+        with ThreadPoolExecutor(max_workers=len(household_ids)) as executor:
+            responses = list(executor.map(probe_household, household_ids))
+        payloads = [response.json() if response.status_code == 200 else {} for response in responses]
+        
+        # Trading decisions for all households at once
+        iot_readings = [data.get('iot_data', {}) for data in payloads]
+        decisions = trading_decisions([iot.get('surplus_deficit_kwh', 0) for iot in iot_readings],
+                                      [iot.get('battery_level', 0) for iot in iot_readings])
+        
+        for household_id, response, data, trading_decision in zip(household_ids, responses, payloads, decisions):
             print_section(f"Testing {household_id}")
             
-            response = requests.get(f"{BASE_URL}/predict", 
-                                  params={"household": household_id}, 
-                                  timeout=10)
-            
             if response.status_code == 200:
-                data = response.json()
                 print(f"✅ Response Structure for {household_id}:")
                 
                 # Extract prediction data
@@ -69,17 +137,6 @@ def test_actual_api_structure():
                     print(f"      - Cloud Cover: {weather.get('cloud_percentage', 'N/A')}%")
                     print(f"      - Data Source: {weather.get('data_source', 'N/A')}")
                 
-                # Trading decision logic
-                surplus = iot_data.get('surplus_deficit_kwh', 0)
-                battery = iot_data.get('battery_level', 0)
-                
-                if surplus > 1 and battery > 80:
-                    trading_decision = "SELL - Excess energy available"
-                elif surplus < -1 and battery < 30:
-                    trading_decision = "BUY - Energy deficit and low battery"
-                else:
-                    trading_decision = "HOLD - Balanced energy state"
-                
                 print(f"   💡 Trading Decision: {trading_decision}")
                 
             else:
@@ -87,19 +144,19 @@ def test_actual_api_structure():
                 print(f"   Response: {response.text}")
             
             print()
-            break  # Test first successful one
             
     except Exception as e:
         print(f"❌ Error in API structure test: {e}")
 
+@buffered_output()
 def test_forecast_structure():
     """Test forecast API structure"""
     print_header("FORECAST API STRUCTURE TEST")
     
     try:
-        response = requests.get(f"{BASE_URL}/forecast", 
-                              params={"household": "HH001_Nairobi_Central", "hours": 12}, 
-                              timeout=15)
+        response = SESSION.get(f"{BASE_URL}/forecast", 
+                             params={"household": "HH001_Nairobi_Central", "hours": 12}, 
+                             timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -112,27 +169,25 @@ def test_forecast_structure():
             
             if forecasts:
                 print(f"\n🕐 First Few Forecast Periods:")
+                rows = []
                 for i, forecast in enumerate(forecasts[:6]):  # Show first 6
-                    timestamp = forecast.get('timestamp', 'N/A')
-                    weather_info = forecast.get('weather', {})
-                    iot_info = forecast.get('iot_data', {})
-                    prediction = forecast.get('prediction', {})
+                    timestamp, weather_info, iot_info, prediction = forecast_sections(forecast)
                     
                     try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        time_str = dt.strftime('%H:%M')
+                        time_str = parse_timestamp(timestamp).strftime(TIME_FORMAT)
                     except:
                         time_str = f"Period {i+1}"
                     
-                    temp = weather_info.get('temperature', 'N/A')
-                    clouds = weather_info.get('cloud_percentage', 'N/A')
-                    production = iot_info.get('solar_generation_kwh', 0)
-                    consumption = iot_info.get('consumption_kwh', 0)
-                    recommendation = prediction.get('recommendation', 'N/A')
-                    
-                    print(f"   {time_str}: {temp}°C, {clouds}% clouds, "
-                          f"{production:.1f}kWh prod, {consumption:.1f}kWh cons, "
-                          f"Rec: {recommendation}")
+                    rows.append({
+                        'time_str': time_str,
+                        'temp': weather_info.get('temperature', 'N/A'),
+                        'clouds': weather_info.get('cloud_percentage', 'N/A'),
+                        'production': iot_info.get('solar_generation_kwh', 0),
+                        'consumption': iot_info.get('consumption_kwh', 0),
+                        'recommendation': prediction.get('recommendation', 'N/A')
+                    })
+                
+                print("\n".join(FORECAST_ROW.format_map(row) for row in rows))
                     
         else:
             print(f"❌ Forecast failed: Status {response.status_code}")
@@ -141,6 +196,7 @@ def test_forecast_structure():
     except Exception as e:
         print(f"❌ Error in forecast test: {e}")
 
+@buffered_output()
 def test_corrected_trade_execution():
     """Test trade execution with correct API format"""
     print_header("CORRECTED TRADE EXECUTION TEST")
@@ -165,37 +221,39 @@ def test_corrected_trade_execution():
         }
     ]
     
+    # Send both trades in one batch request; older servers without the batch endpoint get them one by one
+    try:
+        response = SESSION.post(f"{BASE_URL}/execute_trade_batch", 
+                               json={"trades": test_trades}, 
+                               timeout=15)
+        
+        if response.status_code == 404:
+            print("ℹ️  Batch endpoint not available, executing trades one by one")
+        elif response.status_code == 200:
+            print("📦 Batch mode: all trades sent in one request")
+            for i, (trade, data) in enumerate(zip(test_trades, response.json().get('results', [])), 1):
+                print_section(f"Trade Test {i}: {trade['scenario']}")
+                print_trade_result(data)
+            return
+        else:
+            print(f"❌ Trade batch failed: Status {response.status_code}")
+            print(f"   Response: {response.text}")
+            return
+            
+    except Exception as e:
+        print(f"❌ Error executing trade batch: {e}")
+        return
+    
     for i, trade in enumerate(test_trades, 1):
         print_section(f"Trade Test {i}: {trade['scenario']}")
         
         try:
-            response = requests.post(f"{BASE_URL}/execute_trade", 
-                                   json=trade, 
-                                   timeout=10)
+            response = SESSION.post(f"{BASE_URL}/execute_trade", 
+                                  json=trade, 
+                                  timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
-                
-                print(f"✅ Trade executed successfully:")
-                print(f"   📊 Status: {data.get('status', 'N/A')}")
-                print(f"   🏠 Household: {data.get('household_id', 'N/A')}")
-                print(f"   💰 Total Value: {data.get('total_value', 'N/A')} KES")
-                
-                # Trade details
-                trade_info = data.get('trade', {})
-                if trade_info:
-                    print(f"   🔄 Trade ID: {trade_info.get('id', 'N/A')}")
-                    print(f"   📈 Type: {trade_info.get('trade_type', 'N/A')}")
-                    print(f"   ⚡ Amount: {trade_info.get('amount', 'N/A')} kWh")
-                    print(f"   💲 Price: {trade_info.get('price', 'N/A')} KES/kWh")
-                
-                # Payment details
-                payment_info = data.get('payment', {})
-                if payment_info:
-                    print(f"   📱 Payment Status: {payment_info.get('status', 'N/A')}")
-                    print(f"   🆔 Payment ID: {payment_info.get('tx_id', 'N/A')}")
-                    print(f"   📞 Phone: {payment_info.get('phone', 'N/A')}")
-                
+                print_trade_result(response.json())
             else:
                 print(f"❌ Trade failed: Status {response.status_code}")
                 print(f"   Response: {response.text}")
@@ -203,12 +261,75 @@ def test_corrected_trade_execution():
         except Exception as e:
             print(f"❌ Error executing trade: {e}")
 
+def print_trade_result(data):
+    """Print the outcome of one executed trade"""
+    print(f"✅ Trade executed successfully:")
+    print(f"   📊 Status: {data.get('status', 'N/A')}")
+    print(f"   🏠 Household: {data.get('household_id', 'N/A')}")
+    print(f"   💰 Total Value: {data.get('total_value', 'N/A')} KES")
+    
+    # Trade details
+    trade_info = data.get('trade', {})
+    if trade_info:
+        print(f"   🔄 Trade ID: {trade_info.get('id', 'N/A')}")
+        print(f"   📈 Type: {trade_info.get('trade_type', 'N/A')}")
+        print(f"   ⚡ Amount: {trade_info.get('amount', 'N/A')} kWh")
+        print(f"   💲 Price: {trade_info.get('price', 'N/A')} KES/kWh")
+    
+    # Payment details
+    payment_info = data.get('payment', {})
+    if payment_info:
+        print(f"   📱 Payment Status: {payment_info.get('status', 'N/A')}")
+        print(f"   🆔 Payment ID: {payment_info.get('tx_id', 'N/A')}")
+        print(f"   📞 Phone: {payment_info.get('phone', 'N/A')}")
+
+@buffered_output()
+def test_trade_stress(count, concurrency=10):
+    """Execute count randomized trades, concurrency at a time, and report latency percentiles"""
+    print_header(f"TRADE STRESS TEST ({count} trades, {concurrency} concurrent)")
+    
+    trades = [
+        {
+            "type": random.choice(["buy", "sell"]),
+            "amount": round(random.uniform(0.5, 10.0), 1),
+            "price": round(random.uniform(8.0, 16.0), 1),
+            "household": random.choice(["HH001_Nairobi_Central", "HH_001", "HH_002", "HH_003"]),
+            "phone": "+254700123456"
+        }
+        for _ in range(count)
+    ]
+    
+    def execute(trade):
+        start = time.perf_counter()
+        try:
+            ok = SESSION.post(f"{BASE_URL}/execute_trade", json=trade, timeout=30).status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(execute, trades))
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(latency for _, latency in results)
+    succeeded = sum(ok for ok, _ in results)
+    
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    
+    print(f"{'✅' if succeeded == count else '❌'} {succeeded}/{count} trades succeeded in {elapsed:.2f}s "
+          f"({count / elapsed:.1f} trades/s)")
+    print(f"   ⏱️  Latency p50: {percentile(0.50):.0f} ms, p95: {percentile(0.95):.0f} ms, "
+          f"max: {latencies[-1] * 1000:.0f} ms")
+
+@buffered_output()
 def test_households_api():
     """Test households/IoT network API"""
     print_header("IoT NETWORK & HOUSEHOLDS TEST")
     
     try:
-        response = requests.get(f"{BASE_URL}/households", timeout=10)
+        response = SESSION.get(f"{BASE_URL}/households", timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -238,37 +359,39 @@ def test_households_api():
     except Exception as e:
         print(f"❌ Error in households test: {e}")
 
+@buffered_output()
 def test_analytics_api():
     """Test analytics API"""
     print_header("ANALYTICS API TEST")
     
     try:
-        response = requests.get(f"{BASE_URL}/analytics", timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            print(f"✅ Analytics Retrieved:")
-            
-            # Print all available keys
-            print(f"   📊 Available Data Fields:")
-            for key in data.keys():
-                value = data[key]
-                if isinstance(value, dict):
-                    print(f"      - {key}: {len(value)} items")
-                elif isinstance(value, list):
-                    print(f"      - {key}: {len(value)} entries")
-                else:
-                    print(f"      - {key}: {value}")
-                    
-        else:
-            print(f"❌ Analytics API failed: Status {response.status_code}")
+        with SESSION.get(f"{BASE_URL}/analytics", stream=True, timeout=10) as response:
+            if response.status_code == 200:
+                print(f"✅ Analytics Retrieved:")
+                
+                # Print all available keys
+                print(f"   📊 Available Data Fields:")
+                for key, value in json_items(response):
+                    if isinstance(value, dict):
+                        print(f"      - {key}: {len(value)} items")
+                    elif isinstance(value, list):
+                        print(f"      - {key}: {len(value)} entries")
+                    else:
+                        print(f"      - {key}: {value}")
+                        
+            else:
+                print(f"❌ Analytics API failed: Status {response.status_code}")
             
     except Exception as e:
         print(f"❌ Error in analytics test: {e}")
 
 def main():
     """Run corrected comprehensive tests"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stress', type=int, metavar='N', default=0,
+                        help='also execute N randomized trades concurrently and report latencies')
+    args = parser.parse_args()
+    
     print("🌞 AI ENERGY TRADING SYSTEM - CORRECTED API TESTS")
     print("=" * 80)
     print(f"🕒 Test Time: {datetime.now()}")
@@ -276,25 +399,27 @@ def main():
     
     # Check server
     try:
-        response = requests.get("http://localhost:5000", timeout=5)
+        response = cached_probe(SERVER_URL)
         print("✅ Server is responding")
     except:
         print("❌ Server not responding")
         return
     
-    # Run tests
+    # Run tests: predictions first (warms the server's caches), then the independent
+    # read-only tests in parallel; trades stay serial since their order may matter
     test_actual_api_structure()
-    test_forecast_structure()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(lambda test: test(), [test_forecast_structure, test_households_api, test_analytics_api]))
     test_corrected_trade_execution()
-    test_households_api()
-    test_analytics_api()
+    if args.stress > 0:
+        test_trade_stress(args.stress)
     
     # Summary
     print_header("CORRECTED TEST SUMMARY")
     print("✅ TESTED CAPABILITIES:")
     print("   🔮 AI prediction API structure")
     print("   📈 Forecast API with hourly data")
-    print("   💰 Corrected trade execution (using 'type' field)")
+    print("   💰 Corrected trade execution (using 'type' field, batched when supported)")
     print("   🏠 IoT network and households data")
     print("   📊 System analytics")
     print("   🌤️  Real weather integration")
@@ -7,6 +7,13 @@ from flask import Flask, jsonify
 import sys
 import os
 
+# Production WSGI server with a worker thread pool - falls back to Flask's development server
+try:
+    from waitress import serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
@@ -28,4 +35,8 @@ def status():
 
 if __name__ == '__main__':
     print("🔧 Starting basic test server...")
-    app.run(host='0.0.0.0', port=5001, debug=False)  # Use port 5001 to avoid conflicts
\ No newline at end of file
+    # Use port 5001 to avoid conflicts
+    if WAITRESS_AVAILABLE:
+        serve(app, host='0.0.0.0', port=5001, threads=8, connection_limit=200)
+    else:
+        app.run(host='0.0.0.0', port=5001, debug=False, threaded=True)
\ No newline at end of file
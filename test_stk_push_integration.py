@@ -4,27 +4,72 @@ M-Pesa STK Push Integration Test for Energy Trading Platform
 Tests the complete flow: Energy Trade → STK Push → Payment Confirmation → Token Transfer
 """
 
-import requests
 import json
 import time
 import sys
 import os
 from datetime import datetime
 
+from _http import create_session, resolve_host
+from _test_common import buffered_output
+
+# Fast JSON for the simulated callback - falls back to the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 # Test configuration
-API_BASE_URL = 'http://localhost:5000'
+API_BASE_URL = f"http://{resolve_host('localhost')}:5000"
 TEST_PHONE_NUMBER = '254708374149'  # Safaricom sandbox test number
 TEST_SELLER_PHONE = '254700123456'
 
+def json_dumps(data, indent=False):
+    """Serialize to JSON bytes, optionally indented by two spaces"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(data, indent=2 if indent else None).encode()
+
+def json_loads(data):
+    """Parse a JSON body"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class STKPushTester:
     """Test class for M-Pesa STK Push integration"""
     
-    def __init__(self):
+    def __init__(self, results_file=None):
         self.api_url = API_BASE_URL
         self.results = []
+        self.api_up = False  # set by test_api_status
+        # Each result is also appended to an NDJSON file as it happens (opened on the first result)
+        self.results_file = results_file or f"stk_push_test_report_{int(time.time())}.ndjson"
+        self._results_fp = None
+        # One keep-alive connection for status -> trade -> status query -> callback, retrying transient failures
+        self.session = create_session()
+        # Responses of endpoints that don't change during a run: url -> (time.monotonic() when fetched, response)
+        self._cache = {}
+    
+    def close(self):
+        """Close the HTTP session and the results file"""
+        self.session.close()
+        if self._results_fp is not None:
+            self._results_fp.close()
+    
+    def cached_get(self, url, ttl=10, timeout=10):
+        """GET a URL, reusing the response for ttl seconds"""
+        now = time.monotonic()
+        cached = self._cache.get(url)
+        if cached and now - cached[0] < ttl:
+            return cached[1]
+        response = self.session.get(url, timeout=timeout)
+        self._cache[url] = (now, response)
+        return response
     
     def log_result(self, test_name, success, details):
         """Log test result"""
@@ -36,16 +81,23 @@ class STKPushTester:
         }
         self.results.append(result)
         
+        if self._results_fp is None:
+            self._results_fp = open(self.results_file, 'ab')
+        self._results_fp.write(json_dumps(result) + b"\n")
+        self._results_fp.flush()
+        
         status = "✅ PASS" if success else "❌ FAIL"
         print(f"{status} {test_name}")
         if details:
             print(f"    Details: {details}")
     
+    @buffered_output()
     def test_api_status(self):
-        """Test if API is running"""
+        """Test if API is running (sets api_up)"""
         try:
-            response = requests.get(f"{self.api_url}/api/status", timeout=10)
-            if response.status_code == 200:
+            response = self.cached_get(f"{self.api_url}/api/status")
+            self.api_up = response.status_code == 200
+            if self.api_up:
                 data = response.json()
                 mpesa_status = data.get('integrations', {}).get('mpesa', 'unknown')
                 self.log_result(
@@ -61,6 +113,7 @@ class STKPushTester:
             self.log_result("API Status Check", False, str(e))
             return None
     
+    @buffered_output()
     def test_energy_trade_with_stk(self):
         """Test energy trade execution with STK Push"""
         try:
@@ -81,7 +134,7 @@ class STKPushTester:
             print(f"   Buyer Phone: {trade_data['phone']}")
             print(f"   Seller Phone: {trade_data['seller_phone']}")
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/api/execute_trade", 
                 json=trade_data,
                 timeout=30
@@ -141,16 +194,34 @@ class STKPushTester:
             self.log_result("Energy Trade with STK Push", False, str(e))
             return None
     
+    def poll_stk_status(self, checkout_request_id, deadline=15.0):
+        """
+        Query STK Push status with exponential backoff (0.5s, 1s, 2s, 4s, 4s...)
+        until the payment has a result code, the server rejects the query, or
+        deadline seconds pass; returns the last response
+        """
+        give_up_at = time.monotonic() + deadline
+        delay = 0.5
+        while True:
+            response = self.session.get(
+                f"{self.api_url}/api/stk/status/{checkout_request_id}",
+                timeout=10
+            )
+            if response.status_code == 200 and response.json().get('result_code') is not None:
+                return response
+            if 400 <= response.status_code < 500 or time.monotonic() + delay > give_up_at:
+                return response
+            time.sleep(delay)
+            delay = min(delay * 2, 4)
+    
+    @buffered_output()
     def test_stk_status_query(self, checkout_request_id):
         """Test STK Push status query"""
         try:
             print(f"\n🔍 Querying STK Push status...")
             print(f"   Checkout Request ID: {checkout_request_id}")
             
-            response = requests.get(
-                f"{self.api_url}/api/stk/status/{checkout_request_id}",
-                timeout=10
-            )
+            response = self.poll_stk_status(checkout_request_id)
             
             if response.status_code == 200:
                 result = response.json()
@@ -192,6 +263,7 @@ class STKPushTester:
             self.log_result("STK Status Query", False, str(e))
             return None
     
+    @buffered_output()
     def test_payment_callback_simulation(self):
         """Test payment callback processing (simulate success)"""
         try:
@@ -217,14 +289,15 @@ class STKPushTester:
                 }
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/api/payment/callback",
-                json=callback_data,
+                data=json_dumps(callback_data),
+                headers={'Content-Type': 'application/json'},
                 timeout=10
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 self.log_result(
                     "Payment Callback Simulation",
                     True,
@@ -264,11 +337,7 @@ class STKPushTester:
         trade_result = self.test_energy_trade_with_stk()
         
         if trade_result and trade_result.get('checkout_request_id'):
-            # Wait a moment before querying status
-            print("\n⏳ Waiting 3 seconds before status query...")
-            time.sleep(3)
-            
-            # Test 3: STK Status Query
+            # Test 3: STK Status Query (polls until the payment has a result)
             print("\n📋 Test 3: STK Push Status Query")
             self.test_stk_status_query(trade_result['checkout_request_id'])
         
@@ -278,6 +347,7 @@ class STKPushTester:
         
         return self.generate_report()
     
+    @buffered_output()
     def generate_report(self):
         """Generate test report"""
         print("\n" + "=" * 80)
@@ -326,27 +396,25 @@ def main():
     print("⚡ Energy Trading Platform - M-Pesa STK Push Test")
     print("This will test the complete energy trading → payment → confirmation flow")
     
-    # Check if API is running
-    try:
-        response = requests.get(f"{API_BASE_URL}/", timeout=5)
-        if response.status_code != 200:
-            raise Exception(f"API returned status {response.status_code}")
-    except Exception as e:
+    # Run comprehensive test (its first step, the API status check, doubles as the server check)
+    report = tester.run_comprehensive_test()
+    tester.close()
+    
+    if not tester.api_up:
         print(f"\n❌ ERROR: Cannot connect to API at {API_BASE_URL}")
-        print(f"   Details: {e}")
         print(f"\n💡 Make sure to start the API server first:")
         print(f"   python main_app.py")
         return
     
-    # Run comprehensive test
-    report = tester.run_comprehensive_test()
-    
-    # Save report
-    report_file = f"stk_push_test_report_{int(time.time())}.json"
-    with open(report_file, 'w') as f:
-        json.dump(report, f, indent=2)
+    # Save summary (per-test results are already in the NDJSON file)
+    summary = {key: value for key, value in report.items() if key != 'results'}
+    summary['results_file'] = tester.results_file
+    report_file = tester.results_file[:-len('.ndjson')] + '.json'
+    with open(report_file, 'wb') as f:
+        f.write(json_dumps(summary, indent=True))
     
-    print(f"\n📄 Detailed report saved to: {report_file}")
+    print(f"\n📄 Report summary saved to: {report_file}")
+    print(f"📄 Detailed results saved to: {tester.results_file}")
     
     if report['failed'] == 0:
         print("\n🎉 All tests passed! STK Push integration is working correctly.")
@@ -1,30 +1,45 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+from _http import create_session
+from _test_common import AnalyticsResult, PredictResult, analytics, forecast, predict, rjson
+
+BASE_URL = "http://localhost:5000/api"
+
+# One keep-alive connection pool for all three probes
+SESSION = create_session()
 
 print("Testing AI Energy Trading System API...")
 print("=" * 50)
 
 try:
+    # Send the three probes at once, then check them in order
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        predict_future = executor.submit(predict, SESSION, BASE_URL, "HH_001")
+        forecast_future = executor.submit(forecast, SESSION, BASE_URL, "HH_001", 24)
+        analytics_future = executor.submit(analytics, SESSION, BASE_URL, "HH_001")
+    
     # Test prediction endpoint
     print("\n1. Testing Energy Predictions...")
-    response = requests.get("http://localhost:5000/api/predict?household_id=HH_001", timeout=10)
+    response = predict_future.result()
     if response.status_code == 200:
-        data = response.json()
+        result = PredictResult.from_json(rjson(response))
         print("✅ SUCCESS! Prediction API working")
-        print(f"   - Predicted production: {data.get('predicted_production', 'N/A')} kWh")
-        print(f"   - Predicted consumption: {data.get('predicted_consumption', 'N/A')} kWh") 
-        print(f"   - Trading recommendation: {data.get('recommendation', 'N/A')}")
-        print(f"   - Weather source: {data.get('weather_data', {}).get('data_source', 'N/A')}")
-        print(f"   - Current temp: {data.get('weather_data', {}).get('temperature', 'N/A')}°C")
+        print(f"   - Predicted production: {result.production} kWh")
+        print(f"   - Predicted consumption: {result.consumption} kWh") 
+        print(f"   - Trading recommendation: {result.recommendation}")
+        print(f"   - Weather source: {result.weather.get('data_source', 'N/A')}")
+        print(f"   - Current temp: {result.weather.get('temperature', 'N/A')}°C")
     else:
         print(f"❌ FAILED: Status {response.status_code}")
         print(f"   Response: {response.text}")
 
     # Test forecast endpoint  
     print("\n2. Testing 24-Hour Forecast...")
-    response = requests.get("http://localhost:5000/api/forecast?household_id=HH_001&hours=24", timeout=15)
+    response = forecast_future.result()
     if response.status_code == 200:
-        data = response.json()
+        data = rjson(response)
         print("✅ SUCCESS! Forecast API working")
         forecast_count = len(data.get('forecast', []))
         print(f"   - Forecast periods: {forecast_count}")
@@ -37,12 +52,12 @@ try:
 
     # Test analytics
     print("\n3. Testing System Analytics...")  
-    response = requests.get("http://localhost:5000/api/analytics?household_id=HH_001", timeout=10)
+    response = analytics_future.result()
     if response.status_code == 200:
-        data = response.json()
+        result = AnalyticsResult.from_json(rjson(response))
         print("✅ SUCCESS! Analytics API working")
-        print(f"   - Active households: {data.get('active_households', 'N/A')}")
-        household_data = data.get('household_data', {})
+        print(f"   - Active households: {result.active_households}")
+        household_data = result.household_data
         if household_data:
             print(f"   - Current production: {household_data.get('current_production', 'N/A')} kWh")
             print(f"   - Battery level: {household_data.get('battery_level', 'N/A')}%")